@@ -0,0 +1,98 @@
+"""
+Agregacja giełd po stronie event loop - wiersz COMBINED i migawki dla GUI.
+
+Handlery tylko oznaczają coin jako zmieniony (mark). publish() co AGGREGATE_INTERVAL
+przelicza states[coin]["combined"] wyłącznie dla zmienionych coinów i publikuje
+migawkę: słownik coin -> niezmienna krotka wierszy. Publikacja to podmiana
+referencji self.snapshot, więc wątek GUI czyta starą albo nową migawkę w całości -
+nigdy stanu w połowie aktualizacji i nigdy nic nie liczy.
+"""
+
+import asyncio
+
+from config import AGGREGATE_INTERVAL
+from state import EXCHANGES
+
+# Kolejność wierszy w migawce coina: giełdy + suma
+SNAPSHOT_ROWS = EXCHANGES + ("combined",)
+
+
+def _row(current_vol: float, avg_vol: float, delta: float, total_vol: float) -> tuple:
+    """(wolumen, średnia, delta, delta % wolumenu transakcji)"""
+    delta_percent = (delta / total_vol * 100) if total_vol > 0 else 0
+    return (current_vol, avg_vol, delta, delta_percent)
+
+
+class CombinedAggregator:
+    """
+    Przyrostowa suma giełd per coin i wersjonowana migawka do odczytu przez GUI.
+
+    Koszt publikacji zależy od liczby zmienionych coinów, nie od liczby
+    wyświetlanych. version rośnie przy każdej publikacji - GUI pomija
+    odświeżenie, gdy nic się nie zmieniło.
+    """
+
+    def __init__(self, states: dict, interval: float = AGGREGATE_INTERVAL):
+        self.states = states
+        self.interval = interval
+        self.dirty = set()
+        self.snapshot = {}  # coin -> (wiersz binance, bybit, gate, okx, combined)
+        self.version = 0
+
+    def mark(self, coin: str) -> None:
+        """Wołane przez handlery po każdej zmianie stanu coina"""
+        self.dirty.add(coin)
+
+    def remove(self, coin: str) -> None:
+        """Usuwa coin z migawki (coin usunięty z listy)"""
+        self.dirty.discard(coin)
+        if coin in self.snapshot:
+            snapshot = dict(self.snapshot)
+            del snapshot[coin]
+            self.snapshot = snapshot
+            self.version += 1
+
+    def aggregate(self, coin: str) -> tuple:
+        """Przelicza states[coin]["combined"] i zwraca wiersze migawki coina"""
+        coin_state = self.states[coin]
+        rows = []
+        current_vol = avg_vol = delta = buy_vol = sell_vol = 0.0
+        for exchange in EXCHANGES:
+            state = coin_state[exchange]
+            # Każde pole czytane raz - wiersz giełdy i suma z tych samych wartości
+            vol, avg, dlt, buy, sell = (state.current_vol, state.avg_vol, state.delta,
+                                        state.buy_vol, state.sell_vol)
+            current_vol += vol
+            avg_vol += avg
+            delta += dlt
+            buy_vol += buy
+            sell_vol += sell
+            rows.append(_row(vol, avg, dlt, buy + sell))
+
+        combined = coin_state["combined"]
+        combined.current_vol = current_vol
+        combined.avg_vol = avg_vol
+        combined.delta = delta
+        combined.buy_vol = buy_vol
+        combined.sell_vol = sell_vol
+        rows.append(_row(current_vol, avg_vol, delta, buy_vol + sell_vol))
+        return tuple(rows)
+
+    def publish(self) -> None:
+        """Agreguje zmienione coiny i podmienia migawkę (kopia przy zapisie)"""
+        if not self.dirty:
+            return
+
+        dirty, self.dirty = self.dirty, set()
+        snapshot = dict(self.snapshot)
+        for coin in dirty:
+            snapshot[coin] = self.aggregate(coin)
+        # Jedno przypisanie referencji - atomowe względem wątku GUI
+        self.snapshot = snapshot
+        self.version += 1
+
+    async def run(self) -> None:
+        """Publikacja co `interval` sekund"""
+        while True:
+            await asyncio.sleep(self.interval)
+            self.publish()
@@ -0,0 +1,128 @@
+"""
+Wektorowy silnik alertów - reguła alertu liczona dla wszystkich coinów i giełd naraz (NumPy).
+
+Stan jest kopiowany z obiektów ExchangeState do tablicy (sync - całość albo tylko
+wiersze zmienionych coinów, wiersze indeksowane id coina z universe), a sama reguła to kilka operacji na całych kolumnach.
+Tablicę można też podać z zewnątrz (np. pamięć współdzielona) - wtedy kopiowanie odpada.
+"""
+
+import operator
+
+import numpy as np
+
+from config import ALERT_DELTA_PCT, ALERT_WARMUP_SECONDS, COINS
+from state import EXCHANGES
+from universe import SymbolUniverse
+
+# Kolejność kolumn w tablicy stanu
+_FIELDS = (
+    "current_vol", "baseline.threshold", "baseline.full", "alert_triggered",
+    "buy_vol", "sell_vol", "delta", "candle_open", "candle_close", "start_time",
+)
+(COL_VOL, COL_THRESHOLD, COL_READY, COL_TRIGGERED, COL_BUY, COL_SELL,
+ COL_DELTA, COL_OPEN, COL_CLOSE, COL_START) = range(len(_FIELDS))
+
+
+class AlertEngine:
+    """
+    Tablice [coin x giełda] z polami reguły alertu i ich wektorowa ocena.
+
+    Wiersz = id coina z universe (COINS.ids) * liczba giełd + giełda - bez słowników
+    per coin; coiny dodane w trakcie działania (add_coin) powiększają tablicę,
+    usunięte zostawiają zerowe wiersze (nigdy nie spełniają reguły), a ich id
+    wraca do universe dla kolejnego coina.
+
+    Reguła (ta sama co w check_binance_alert):
+    1. Wolumen > próg z RollingBaseline (7.5x średnia), okno pełne
+    2. Delta >= 30% na świecy wzrostowej LUB <= -30% na spadkowej
+    3. Co najmniej ALERT_WARMUP_SECONDS od startu
+    4. Alert nie był jeszcze wysłany w tej świecy
+    """
+
+    def __init__(self, states: dict, coins, exchanges=EXCHANGES, data: np.ndarray = None,
+                 universe: SymbolUniverse = COINS):
+        self.states = states
+        self.exchanges = tuple(exchanges)
+        self.universe = universe
+        self.coins = set()
+        self._flat = []  # stan ExchangeState dla każdego wiersza (None = wolny)
+        self._getter = operator.attrgetter(*_FIELDS)
+        self.data = np.zeros((0, len(_FIELDS))) if data is None else data
+        for coin in coins:
+            self.add_coin(coin)
+
+    def _coin_rows(self, coin: str) -> range:
+        start = self.universe.ids[coin] * len(self.exchanges)
+        return range(start, start + len(self.exchanges))
+
+    def add_coin(self, coin: str) -> None:
+        """Dodaje wiersze coina (tablica rośnie do id coina) i kopiuje jego stan"""
+        rows = self._coin_rows(coin)
+        if rows.stop > len(self._flat):
+            self._flat.extend([None] * (rows.stop - len(self._flat)))
+        if rows.stop > len(self.data):
+            # Podwajanie - seria dodanych coinów nie kopiuje tablicy za każdym razem
+            grown = np.zeros((max(rows.stop, 2 * len(self.data)), len(_FIELDS)))
+            grown[:len(self.data)] = self.data
+            self.data = grown
+        coin_state = self.states[coin]
+        for row, exchange in zip(rows, self.exchanges):
+            self._flat[row] = coin_state[exchange]
+        self.coins.add(coin)
+        self.sync((coin,))
+
+    def remove_coin(self, coin: str) -> None:
+        """Zeruje wiersze coina (wołać przed COINS.remove - potrzebne id)"""
+        if coin not in self.coins:
+            return
+        rows = self._coin_rows(coin)
+        self.data[rows.start:rows.stop] = 0.0
+        for row in rows:
+            self._flat[row] = None
+        self.coins.discard(coin)
+
+    def load(self) -> None:
+        """Kopiuje bieżący stan wszystkich coinów/giełd do tablicy"""
+        self.sync(self.coins)
+
+    def sync(self, coins) -> None:
+        """Kopiuje tylko wiersze podanych coinów (wszystkie giełdy; coiny spoza silnika pomijane)"""
+        engine_coins = self.coins
+        rows = [row for coin in coins if coin in engine_coins for row in self._coin_rows(coin)]
+        if rows:
+            flat = self._flat
+            self.data[rows] = [self._getter(flat[row]) for row in rows]
+
+    def evaluate(self, now: float) -> set:
+        """Zwraca zbiór (coin, giełda), dla których alert właśnie się spełnił"""
+        d = self.data
+        vol = d[:, COL_VOL]
+        buy_sell = d[:, COL_BUY] + d[:, COL_SELL]
+        delta_pct = np.divide(
+            d[:, COL_DELTA] * 100.0, buy_sell, out=np.zeros_like(buy_sell), where=buy_sell > 0
+        )
+        n_exchanges = len(self.exchanges)
+        if "binance" in self.exchanges:
+            # Kierunek świecy z klines Binance coina - Bybit/Gate.io/OKX nie mają open/close
+            candles = d.reshape(-1, n_exchanges, len(_FIELDS))[:, self.exchanges.index("binance")]
+            open_ = np.repeat(candles[:, COL_OPEN], n_exchanges)
+            close = np.repeat(candles[:, COL_CLOSE], n_exchanges)
+        else:
+            open_, close = d[:, COL_OPEN], d[:, COL_CLOSE]
+        is_bullish = close > open_
+        is_bearish = close < open_
+
+        fire = (
+            (d[:, COL_READY] > 0)
+            & (d[:, COL_TRIGGERED] == 0)
+            & (vol > d[:, COL_THRESHOLD])
+            & (now - d[:, COL_START] >= ALERT_WARMUP_SECONDS)
+            & ((is_bullish & (delta_pct >= ALERT_DELTA_PCT))
+               | (is_bearish & (delta_pct <= -ALERT_DELTA_PCT)))
+        )
+
+        names = self.universe.names
+        return {
+            (names[i // n_exchanges], self.exchanges[i % n_exchanges])
+            for i in np.flatnonzero(fire).tolist()
+        }
@@ -3,102 +3,432 @@ Logika alertów - sprawdzanie warunków i wysyłanie na Telegram
 """
 
 import asyncio
+import functools
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, HISTORY
+import clock
+from alert_engine import AlertEngine
+from config import (
+    ALERT_DELTA_PCT,
+    ALERT_EVAL_INTERVAL,
+    ALERT_EXCHANGES,
+    ALERT_IMMEDIATE_RATIO,
+    ALERT_WARMUP_SECONDS,
+    TELEGRAM_API_URL,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_CHAT_ID,
+    TELEGRAM_MAX_RETRIES,
+    TELEGRAM_MIN_INTERVAL,
+    TELEGRAM_QUEUE_SIZE,
+    TELEGRAM_RETRY_BACKOFF,
+)
+from metrics import metrics
+from state import ExchangeState
+from timeframes import MultiTimeframe
 
 
-async def send_telegram_alert(message: str) -> None:
-    """Wysyła alert na Telegram"""
+async def send_telegram_alert(message: str, session=None,
+                              api_url: str = TELEGRAM_API_URL, executor=None):
+    """
+    Wysyła alert na Telegram (jedna próba, bez blokowania event loop).
+    Zwraca odpowiedź HTTP albo None przy błędzie połączenia.
+    """
     if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         print("⚠️ Brak konfiguracji Telegram.")
-        return
+        return None
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    url = f"{api_url}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
         "chat_id": TELEGRAM_CHAT_ID,
         "text": message,
         "parse_mode": "HTML"
     }
 
+    http = session or requests
+    loop = asyncio.get_running_loop()
+
     try:
-        response = requests.post(url, json=payload, timeout=5)
+        response = await loop.run_in_executor(
+            executor, functools.partial(http.post, url, json=payload, timeout=5)
+        )
         if response.status_code == 200:
             print(f"✅ Alert wysłany: {message[:50]}...")
         else:
             print(f"❌ Błąd wysyłania alertu: {response.status_code}")
+        return response
     except Exception as e:
         print(f"❌ Błąd Telegram: {e}")
+        return None
 
 
-def check_binance_alert(coin: str, state_binance: dict, sent_alerts: set) -> None:
+class TelegramSender:
     """
-    Sprawdza warunki alertu dla Binance.
+    Kolejka wychodzących alertów z jednym workerem.
+
+    - enqueue() nie blokuje - wykrywanie alertu nie czeka na wysyłkę
+    - worker używa jednej sesji HTTP (keep-alive) w dedykowanym wątku,
+      sesja i wątek powstają przy starcie workera i są zamykane w close()
+    - ponowienia z wykładniczym backoffem, 429 respektuje retry_after
+    - minimalny odstęp między wiadomościami (limit Telegrama na czat)
+    - czas od wykrycia (enqueue) do dostarczenia trafia do spike_alert_send_seconds
+    """
+
+    def __init__(self, api_url: str = TELEGRAM_API_URL,
+                 queue_size: int = TELEGRAM_QUEUE_SIZE,
+                 min_interval: float = TELEGRAM_MIN_INTERVAL,
+                 max_retries: int = TELEGRAM_MAX_RETRIES,
+                 backoff: float = TELEGRAM_RETRY_BACKOFF):
+        self.api_url = api_url
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = None
+        self.executor = None
+        self.last_sent = 0.0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.send_latency = metrics.histogram(
+            "spike_alert_send_seconds", "Wykrycie alertu -> dostarczenie na Telegram")
+
+    def enqueue(self, message: str) -> bool:
+        """Dodaje alert do kolejki. Przy pełnej kolejce alert jest odrzucany."""
+        try:
+            self.queue.put_nowait((message, time.monotonic()))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"⚠️ Kolejka Telegram pełna - odrzucono alert ({self.dropped} łącznie)")
+            return False
+
+    def close(self) -> None:
+        """Zamyka sesję HTTP i wątek wysyłki (można wołać wielokrotnie)"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def run(self) -> None:
+        """Worker - wysyła alerty z kolejki jeden po drugim"""
+        self.session = requests.Session()
+        # Jeden wątek = sesja nigdy nie jest używana współbieżnie
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telegram")
+        for name, help_text in (("sent", "wysłane"), ("dropped", "odrzucone przy pełnej kolejce"),
+                                ("failed", "niedostarczone po ponowieniach")):
+            metrics.gauge(f"spike_alerts_{name}_total", f"Alerty Telegram - {help_text}",
+                          functools.partial(getattr, self, name), kind="counter")
+
+        try:
+            while True:
+                message, enqueued_at = await self.queue.get()
+                try:
+                    delivered = await self._deliver(message)
+                except Exception as e:
+                    # Worker nie może umrzeć - inaczej kolejka zapełni się po cichu
+                    print(f"❌ Błąd workera Telegram: {e}")
+                    delivered = False
+                finally:
+                    self.queue.task_done()
+
+                if delivered:
+                    self.sent += 1
+                    self.send_latency.observe(time.monotonic() - enqueued_at)
+                else:
+                    self.failed += 1
+        finally:
+            self.close()
+
+    async def _deliver(self, message: str) -> bool:
+        delay = self.backoff
+
+        for attempt in range(self.max_retries):
+            wait = self.last_sent + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            response = await send_telegram_alert(message, self.session, self.api_url, self.executor)
+            self.last_sent = time.monotonic()
+
+            if response is not None:
+                if response.status_code == 200:
+                    return True
+                if response.status_code == 429:
+                    delay = max(delay, self._retry_after(response))
+                elif response.status_code < 500:
+                    return False  # Błąd klienta (np. zły token) - ponowienie nic nie da
+
+            if attempt == self.max_retries - 1:
+                break  # Bez czekania po ostatniej próbie - nie blokuj kolejnych alertów
+
+            await asyncio.sleep(delay)
+            delay *= 2
+
+        print(f"❌ Alert porzucony po {self.max_retries} próbach: {message[:50]}...")
+        return False
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except Exception:
+            return 0.0
+
+
+telegram_sender = TelegramSender()
+
+
+EXCHANGE_LABELS = {"binance": "Binance", "bybit": "Bybit", "gate": "Gate.io", "okx": "OKX"}
+
+
+def check_binance_alert(coin: str, state_binance: ExchangeState, sent_alerts: set,
+                        exchange: str = "binance", sender=None,
+                        candle_state: ExchangeState | None = None) -> None:
+    """
+    Sprawdza warunki alertu dla Binance (lub innej giełdy z ALERT_EXCHANGES).
+    Kierunek świecy z candle_state (stan Binance coina) - Bybit/Gate.io/OKX nie mają open/close.
     
     Warunki:
-    1. Wolumen > 7.5x średnia
+    1. Wolumen > 7.5x średnia (ALERT_VOLUME_MULTIPLIER)
     2. Delta >= 30% (wzrost) LUB Delta <= -30% (spadek)
     3. Co najmniej 6 minut historii
+
+    Próg wolumenu jest liczony w RollingBaseline tylko przy zamknięciu świecy,
+    więc dla zdecydowanej większości transakcji wystarcza jedno porównanie.
     """
-    # Sprawdź czy minęło co najmniej 6 minut od startu
-    if time.time() - state_binance["start_time"] < 360:
+    baseline = state_binance.baseline
+
+    # Sprawdź czy mamy wystarczające dane historyczne (HISTORY świec)
+    if not baseline.full:
         return
 
-    # Sprawdź czy mamy wystarczające dane historyczne
-    if len(state_binance["last_volumes"]) < HISTORY:
+    # Warunek 1: Volume > 7.5x średnia (próg policzony przy zamknięciu świecy)
+    if state_binance.current_vol <= baseline.threshold:
+        return
+
+    # Sprawdź czy minęło co najmniej 6 minut od startu
+    if clock.now() - state_binance.start_time < ALERT_WARMUP_SECONDS:
         return
 
-    # Oblicz średnią z ostatnich 5 świec
-    avg_volume = sum(state_binance["last_volumes"]) / len(state_binance["last_volumes"])
-    
     # Bezpieczne obliczenie ratio wolumenu (zabezpieczenie przed dzieleniem przez zero)
-    if avg_volume and avg_volume != 0:
-        volume_ratio = state_binance['current_vol'] / avg_volume
+    if baseline.avg:
+        volume_ratio = state_binance.current_vol / baseline.avg
     else:
         volume_ratio = 0
 
-    # Warunek 1: Volume > 7.5x średnia
-    volume_condition = state_binance["current_vol"] > 7.5 * avg_volume
-
-    if volume_condition:
-        # Określ kierunek świecy
-        is_bullish = state_binance["current_candle_close"] > state_binance["current_candle_open"]
-        is_bearish = state_binance["current_candle_close"] < state_binance["current_candle_open"]
-
-        # Oblicz procent delty
-        total_volume = state_binance["buy_vol"] + state_binance["sell_vol"]
-        delta_percent = (state_binance["delta"] / total_volume * 100) if total_volume > 0 else 0
-
-        # Warunek 2: Delta >= 30% dla świecy wzrostowej lub Delta <= -30% dla świecy spadkowej
-        delta_condition = False
-        alert_type = ""
-
-        if is_bullish and delta_percent >= 30:
-            delta_condition = True
-            alert_type = "WZROSTOWY"
-        elif is_bearish and delta_percent <= -30:
-            delta_condition = True
-            alert_type = "SPADKOWY"
-
-        if delta_condition and not state_binance["alert_triggered"]:
-            # Stwórz unikalny identyfikator alertu
-            alert_id = f"{coin}_{state_binance['candle_id']}"
-
-            if alert_id not in sent_alerts:
-                # Przygotuj wiadomość
-                message = (
-                    f"🚨 <b>ALERT {alert_type} - {coin}</b> 🚨\n"
-                    f"📊 Giełda: <b>Binance</b>\n"
-                    f"💰 Skok: <b>{volume_ratio:.1f}</b>\n"
-                    f"📈 Delta: <b>{state_binance['delta']:+.1f}</b> ({delta_percent:+.1f}%)\n"
-                    f"🎯 Kierunek: {'🟢 WZROST' if is_bullish else '🔴 SPADEK'}\n"
-                    f"⏰ Czas: {time.strftime('%H:%M:%S')}"
-                )
-
-                # Wyślij alert
-                asyncio.create_task(send_telegram_alert(message))
-
-                # Oznacz jako wysłany
-                sent_alerts.add(alert_id)
-                state_binance["alert_triggered"] = True
+    # Określ kierunek świecy
+    candle = state_binance if candle_state is None else candle_state
+    is_bullish = candle.candle_close > candle.candle_open
+    is_bearish = candle.candle_close < candle.candle_open
+
+    # Oblicz procent delty
+    total_volume = state_binance.buy_vol + state_binance.sell_vol
+    delta_percent = (state_binance.delta / total_volume * 100) if total_volume > 0 else 0
+
+    # Warunek 2: Delta >= 30% dla świecy wzrostowej lub Delta <= -30% dla świecy spadkowej
+    delta_condition = False
+    alert_type = ""
+
+    if is_bullish and delta_percent >= ALERT_DELTA_PCT:
+        delta_condition = True
+        alert_type = "WZROSTOWY"
+    elif is_bearish and delta_percent <= -ALERT_DELTA_PCT:
+        delta_condition = True
+        alert_type = "SPADKOWY"
+
+    if delta_condition and not state_binance.alert_triggered:
+        # Stwórz unikalny identyfikator alertu
+        if exchange == "binance":
+            alert_id = f"{coin}_{state_binance.candle_id}"
+        else:
+            alert_id = f"{coin}_{exchange}_{state_binance.candle_id}"
+
+        if alert_id not in sent_alerts:
+            # Przygotuj wiadomość
+            message = _format_alert(alert_type, coin, exchange, volume_ratio,
+                                    state_binance.delta, delta_percent, is_bullish)
+
+            # Wyślij alert (kolejka - wysyłka nie blokuje sprawdzania)
+            (sender or telegram_sender).enqueue(message)
+
+            # Oznacz jako wysłany
+            sent_alerts.add(alert_id)
+            state_binance.alert_triggered = True
+
+
+def _format_alert(alert_type: str, coin: str, exchange: str, volume_ratio: float, delta: float,
+                  delta_percent: float, is_bullish: bool, timeframe: str | None = None) -> str:
+    """Treść wiadomości alertu (HTML Telegrama)"""
+    timeframe_line = f"⏱️ Interwał: <b>{timeframe}</b>\n" if timeframe else ""
+    return (
+        f"🚨 <b>ALERT {alert_type} - {coin}</b> 🚨\n"
+        f"📊 Giełda: <b>{EXCHANGE_LABELS[exchange]}</b>\n"
+        f"{timeframe_line}"
+        f"💰 Skok: <b>{volume_ratio:.1f}</b>\n"
+        f"📈 Delta: <b>{delta:+.1f}</b> ({delta_percent:+.1f}%)\n"
+        f"🎯 Kierunek: {'🟢 WZROST' if is_bullish else '🔴 SPADEK'}\n"
+        f"⏰ Czas: {clock.strftime('%H:%M:%S')}"
+    )
+
+
+def check_timeframe_alert(coin: str, state: ExchangeState, frames: MultiTimeframe, timeframe: str,
+                          sent_alerts: set, exchange: str = "binance", sender=None) -> None:
+    """
+    Ta sama reguła co check_binance_alert, ale dla bieżącej świecy wyższego interwału
+    (zamknięte minuty + bieżąca minuta). Mnożnik, okno i próg delty z ALERT_TIMEFRAMES.
+    Jeden alert na świecę interwału (sent_alerts).
+    """
+    candle = frames.get(state, timeframe)
+    if candle is None or state.candle_id is None:
+        return
+
+    baseline = candle.baseline
+    if not baseline.full:
+        return
+
+    volume, buy_vol, sell_vol, open_ = candle.current(
+        state.candle_id, state.buy_vol, state.sell_vol, state.candle_open
+    )
+    if volume <= baseline.threshold or volume <= 0:
+        return
+
+    if clock.now() - state.start_time < ALERT_WARMUP_SECONDS:
+        return
+
+    delta = buy_vol - sell_vol
+    delta_percent = delta / volume * 100
+    min_delta_pct = frames.rules.get(timeframe, {}).get("delta_pct", ALERT_DELTA_PCT)
+    is_bullish = state.candle_close > open_
+    is_bearish = state.candle_close < open_
+
+    if is_bullish and delta_percent >= min_delta_pct:
+        alert_type = "WZROSTOWY"
+    elif is_bearish and delta_percent <= -min_delta_pct:
+        alert_type = "SPADKOWY"
+    else:
+        return
+
+    # Identyfikator z pierwszą minutą świecy interwału (checkpoint rozpoznaje świeżość)
+    start = candle.start_minute(state.candle_id)
+    if exchange == "binance":
+        alert_id = f"{coin}_{timeframe}_{start}"
+    else:
+        alert_id = f"{coin}_{exchange}_{timeframe}_{start}"
+    if alert_id in sent_alerts:
+        return
+
+    volume_ratio = volume / baseline.avg if baseline.avg else 0
+    message = _format_alert(alert_type, coin, exchange, volume_ratio, delta, delta_percent,
+                            is_bullish, timeframe)
+    (sender or telegram_sender).enqueue(message)
+    sent_alerts.add(alert_id)
+
+
+class AlertScheduler:
+    """
+    Koalescencja sprawdzania alertów Binance.
+
+    Handlery nie sprawdzają alertu po każdej wiadomości - tylko oznaczają coin
+    jako zmieniony (mark_dirty). Zadanie run() co ALERT_EVAL_INTERVAL sprawdza
+    wszystkie zmienione coiny naraz, więc przy tysiącach transakcji/s na coin
+    check_binance_alert wykonuje się najwyżej raz na interwał.
+
+    Gdy wolumen świecy po raz pierwszy przekroczy próg (ALERT_IMMEDIATE_RATIO x
+    próg z RollingBaseline), coin jest sprawdzany od razu, bez czekania na tick.
+
+    Maksymalne opóźnienie wykrycia alertu = ALERT_EVAL_INTERVAL + opóźnienie
+    pętli asyncio (czas najdłuższego handlera wykonywanego w tym czasie).
+
+    Z podanym AlertEngine (ALERT_VECTORIZED) tick kopiuje wiersze zmienionych
+    coinów do tablic NumPy i ocenia regułę dla wszystkich coinów i giełd jednym
+    przebiegiem; pełne sprawdzenie (wiadomość, sent_alerts) tylko dla spełnionych.
+
+    Z podanym CombinedAggregator każda zmiana stanu Binance oznacza też coin do agregacji.
+    Z podanym MultiTimeframe (frames) tick sprawdza też reguły wyższych interwałów
+    (ALERT_TIMEFRAMES) dla zmienionych coinów.
+    """
+
+    def __init__(self, states: dict, sent_alerts: set,
+                 interval: float = ALERT_EVAL_INTERVAL,
+                 immediate_ratio: float = ALERT_IMMEDIATE_RATIO,
+                 engine: AlertEngine | None = None, sender=None, aggregator=None,
+                 frames: MultiTimeframe | None = None):
+        self.states = states
+        self.engine = engine
+        self.frames = frames
+        self.aggregator = aggregator
+        self.sender = sender  # None = telegram_sender (odtwarzanie podaje własny odbiornik)
+        self.sent_alerts = sent_alerts
+        self.interval = interval
+        self.immediate_ratio = immediate_ratio
+        self.dirty = set()
+        self.crossed = {}  # coin -> candle_id, w której wolumen przekroczył próg
+        self.evaluations = 0
+
+    def mark_dirty(self, coin: str, state: ExchangeState) -> None:
+        """Wołane przez handlery po każdej zmianie stanu Binance"""
+        if self.aggregator is not None:
+            self.aggregator.mark(coin)
+
+        baseline = state.baseline
+        if (baseline.full and not state.alert_triggered
+                and state.current_vol > baseline.threshold * self.immediate_ratio
+                and self.crossed.get(coin) != state.candle_id):
+            # Pierwsze przekroczenie progu w tej świecy - sprawdź natychmiast
+            self.crossed[coin] = state.candle_id
+            self.evaluate(coin, state)
+        else:
+            self.dirty.add(coin)
+
+    def remove(self, coin: str) -> None:
+        """Zapomina coin usunięty z listy"""
+        self.dirty.discard(coin)
+        self.crossed.pop(coin, None)
+
+    def evaluate(self, coin: str, state: ExchangeState, exchange: str = "binance") -> None:
+        self.evaluations += 1
+        candle_state = None if exchange == "binance" else self.states[coin]["binance"]
+        check_binance_alert(coin, state, self.sent_alerts, exchange, self.sender, candle_state)
+
+    def evaluate_dirty(self) -> None:
+        """Sprawdza wszystkie coiny oznaczone od ostatniego ticku"""
+        if not self.dirty:
+            return
+
+        dirty, self.dirty = self.dirty, set()
+        if self.engine is not None:
+            self.engine.sync(dirty)
+            for coin, exchange in self.engine.evaluate(clock.now()):
+                if exchange in ALERT_EXCHANGES:
+                    self.evaluate(coin, self.states[coin][exchange], exchange)
+        else:
+            for coin in dirty:
+                try:
+                    coin_state = self.states[coin]
+                    for exchange in ALERT_EXCHANGES:
+                        self.evaluate(coin, coin_state[exchange], exchange)
+                except Exception as e:
+                    print(f"❌ Błąd sprawdzania alertu dla {coin}: {e}")
+
+        if self.frames is not None and self.frames.rules:
+            for coin in dirty:
+                self.evaluate_timeframes(coin, self.states[coin]["binance"])
+
+    def evaluate_timeframes(self, coin: str, state: ExchangeState) -> None:
+        for timeframe in self.frames.rules:
+            try:
+                check_timeframe_alert(coin, state, self.frames, timeframe, self.sent_alerts,
+                                      sender=self.sender)
+            except Exception as e:
+                print(f"❌ Błąd sprawdzania alertu {timeframe} dla {coin}: {e}")
+
+    async def run(self) -> None:
+        """Tick sprawdzania alertów co `interval` sekund"""
+        while True:
+            await asyncio.sleep(self.interval)
+            self.evaluate_dirty()
@@ -0,0 +1,247 @@
+"""
+Historia zamkniętych świec 1m - kolumnowy zapis o stałej szerokości, podział na dni.
+
+Układ na dysku (czas UTC):
+    <CANDLE_DIR>/<RRRR-MM-DD>/<giełda>/<kolumna>.bin
+
+Każda kolumna to surowa tablica little-endian (typy w COLUMNS) - wiersz i to i-ty
+element każdej kolumny. Odczyt przez numpy.memmap, bez parsowania:
+    cols = read_day("candles", "binance", "2025-01-31")
+    btc = cols["coin"] == b"BTC"
+    cols["volume"][btc].mean()
+
+Świeca jest zapisywana, gdy handler transakcji przechodzi do nowej minuty (przed
+wyzerowaniem buy/sell), więc wolumen to suma transakcji zamkniętej świecy. OHLC ma
+tylko Binance - z zamkniętej kline (x=true) tej samej minuty (pole t), która może
+przyjść przed albo po pierwszej transakcji nowej minuty; wiersz czeka wtedy na nią
+do następnego zamknięcia. Bez zamkniętej kline (zerwane połączenie) i na pozostałych
+giełdach OHLC to NaN. Zapis odbywa się w osobnym wątku, jak nagrywanie ramek.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from config import ALERT_WARMUP_SECONDS, CANDLE_DIR, CANDLE_SEED_MAX_GAP
+from state import EXCHANGES, CoinStates
+
+# Kolumny i ich typy (stała szerokość wiersza)
+COLUMNS = (
+    ("minute", "<i8"),  # numer świecy: timestamp_ms // 60000
+    ("coin", "S16"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("buy_vol", "<f8"),
+    ("sell_vol", "<f8"),
+    ("delta", "<f8"),
+)
+_STOP = None
+_NAN = float("nan")
+
+
+def day_of(minute: int) -> str:
+    """Partycja (dzień UTC) dla numeru świecy"""
+    return time.strftime("%Y-%m-%d", time.gmtime(minute * 60))
+
+
+class CandleStore:
+    """
+    Zapis zamkniętych świec w tle.
+
+    close(state) wołają handlery przy zmianie minuty - tylko krotka do kolejki.
+    Wątek zapisujący grupuje wiersze po (dzień, giełda) i dopisuje każdą kolumnę
+    jednym write. Po przerwanym zapisie kolumny mogą mieć różną długość -
+    read_day czyta wspólną liczbę wierszy.
+    """
+
+    def __init__(self, directory: str = CANDLE_DIR):
+        self.directory = directory
+        self.enabled = False  # True po start() - bez wątku zapisu nic nie trafia do kolejki
+        self.names = {}  # ExchangeState -> (coin, giełda)
+        self.klines = {}  # ExchangeState Binance -> (minuta, OHLC) ostatniej zamkniętej kline
+        self.pending = {}  # ExchangeState Binance -> wiersz czekający na zamkniętą kline swojej minuty
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.written = 0
+
+    def start(self, states: dict) -> None:
+        """Rejestruje stany coinów i uruchamia wątek zapisu (gdy ustawiono katalog)"""
+        if not self.directory or self.thread is not None:
+            return
+        for coin, coin_state in states.items():
+            self.add(coin, coin_state)
+        if isinstance(states, CoinStates):
+            states.listeners.append(self.add)
+        self.thread = threading.Thread(target=self._writer, name="candle-store", daemon=True)
+        self.thread.start()
+        self.enabled = True
+        print(f"🕯️ Zapis historii świec do {self.directory}")
+
+    def add(self, coin: str, coin_state: dict) -> None:
+        """Rejestruje stany coina (też tworzone po starcie - CoinStates.listeners)"""
+        for exchange in EXCHANGES:
+            self.names[coin_state[exchange]] = (coin, exchange)
+
+    def remove(self, coin_state: dict) -> None:
+        """Wyrejestrowuje stany coina usuniętego z listy (zapisane pliki zostają)"""
+        for exchange in EXCHANGES:
+            self.names.pop(coin_state[exchange], None)
+        binance = coin_state["binance"]
+        self.klines.pop(binance, None)
+        row = self.pending.pop(binance, None)
+        if row is not None:
+            self.queue.put(row)
+
+    def close(self, state) -> None:
+        """Zapisuje bieżącą (właśnie zamkniętą) świecę stanu - przed wyzerowaniem"""
+        name = self.names.get(state)
+        if name is None or state.candle_id is None:
+            return
+        coin, exchange = name
+        row = (exchange, state.candle_id, coin.encode(), _NAN, _NAN, _NAN, _NAN,
+               state.buy_vol + state.sell_vol, state.buy_vol, state.sell_vol,
+               state.buy_vol - state.sell_vol)
+        if exchange != "binance":
+            self.queue.put(row)
+            return
+
+        stale = self.pending.pop(state, None)
+        if stale is not None:
+            self.queue.put(stale)  # zamknięta kline tamtej minuty nie przyszła - OHLC zostaje NaN
+        kline = self.klines.get(state)
+        if kline is not None and kline[0] == state.candle_id:
+            self.queue.put(row[:3] + kline[1] + row[7:])
+        else:
+            self.pending[state] = row
+
+    def close_kline(self, state, minute: int, ohlc: tuple) -> None:
+        """OHLC zamkniętej kline Binance (x=true) - uzupełnia czekający wiersz tej minuty"""
+        row = self.pending.get(state)
+        if row is not None and row[1] == minute:
+            del self.pending[state]
+            self.queue.put(row[:3] + ohlc + row[7:])
+        else:
+            self.klines[state] = (minute, ohlc)
+
+    def stop(self) -> None:
+        """Zapisuje zaległe świece i kończy wątek"""
+        if self.thread is None:
+            return
+        self.enabled = False
+        for row in self.pending.values():
+            self.queue.put(row)
+        self.pending.clear()
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+
+    def _writer(self) -> None:
+        get = self.queue.get
+        get_nowait = self.queue.get_nowait
+        while True:
+            batch = [get()]
+            try:
+                while True:
+                    batch.append(get_nowait())
+            except queue.Empty:
+                pass
+
+            stop = _STOP in batch
+            rows = [row for row in batch if row is not _STOP]
+            try:
+                self._append(rows)
+            except OSError as e:
+                print(f"❌ Błąd zapisu historii świec: {e}")
+            if stop:
+                return
+
+    def _append(self, rows: list) -> None:
+        groups = {}
+        for row in rows:
+            groups.setdefault((day_of(row[1]), row[0]), []).append(row[1:])
+
+        for (day, exchange), group in groups.items():
+            folder = os.path.join(self.directory, day, exchange)
+            os.makedirs(folder, exist_ok=True)
+            for (name, dtype), values in zip(COLUMNS, zip(*group)):
+                with open(os.path.join(folder, f"{name}.bin"), "ab") as f:
+                    f.write(np.asarray(values, dtype=dtype).tobytes())
+            self.written += len(group)
+
+
+# ======================== ODCZYT ========================
+
+def read_day(directory: str, exchange: str, day: str) -> dict | None:
+    """Kolumny jednego dnia jako numpy.memmap (tylko odczyt) albo None, gdy brak danych"""
+    folder = os.path.join(directory, day, exchange)
+    sizes = {}
+    for name, dtype in COLUMNS:
+        path = os.path.join(folder, f"{name}.bin")
+        if not os.path.exists(path):
+            return None
+        sizes[name] = os.path.getsize(path) // np.dtype(dtype).itemsize
+
+    rows = min(sizes.values())
+    if rows == 0:
+        return None
+    return {
+        name: np.memmap(os.path.join(folder, f"{name}.bin"), dtype=dtype, mode="r", shape=(rows,))
+        for name, dtype in COLUMNS
+    }
+
+
+def history(directory: str, coin: str, exchange: str, first_minute: int, last_minute: int) -> dict:
+    """Świece coina z zakresu minut [first, last], posortowane po minucie (kopie, nie memmap)"""
+    days = sorted({day_of(m) for m in (first_minute, last_minute)}
+                  | {day_of(m) for m in range(first_minute, last_minute + 1, 1440)})
+    parts = []
+    key = coin.encode()
+    for day in days:
+        columns = read_day(directory, exchange, day)
+        if columns is None:
+            continue
+        minutes = columns["minute"]
+        mask = (columns["coin"] == key) & (minutes >= first_minute) & (minutes <= last_minute)
+        parts.append({name: np.asarray(col[mask]) for name, col in columns.items()})
+
+    if not parts:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+    merged = {name: np.concatenate([part[name] for part in parts]) for name, _ in COLUMNS}
+    order = np.argsort(merged["minute"], kind="stable")
+    return {name: col[order] for name, col in merged.items()}
+
+
+def seed_baselines(states: dict, directory: str, now: float,
+                   max_gap: int = CANDLE_SEED_MAX_GAP) -> int:
+    """
+    Wypełnia RollingBaseline wolumenami ostatnich zapisanych świec (zimny start bez checkpointu).
+    Tylko gdy ostatnia zapisana świeca jest najwyżej `max_gap` minut przed bieżącą -
+    starsza historia nie opisuje obecnego rynku. Stan z pełnym oknem nie czeka na rozgrzewkę.
+    Zwraca liczbę stanów z pełnym oknem.
+    """
+    current = int(now // 60)
+    seeded = 0
+    for coin, coin_state in states.items():
+        for exchange in EXCHANGES:
+            state = coin_state[exchange]
+            baseline = state.baseline
+            candles = history(directory, coin, exchange, current - baseline.maxlen - max_gap, current - 1)
+            minutes = candles["minute"]
+            if len(minutes) == 0 or minutes[-1] < current - max_gap:
+                continue
+            for volume in candles["volume"][-baseline.maxlen:]:
+                baseline.push(float(volume))
+            if baseline.full:
+                state.start_time = min(state.start_time, now - ALERT_WARMUP_SECONDS)
+                seeded += 1
+    return seeded
+
+
+# Wspólna instancja dla handlerów (start() w main.py)
+candle_store = CandleStore()
@@ -0,0 +1,175 @@
+"""
+Checkpointy stanu - ciepły restart bez 6-minutowej rozgrzewki alertów.
+
+Co CHECKPOINT_INTERVAL sekund stan wszystkich coinów i giełd (okna wolumenu,
+bieżąca świeca, wolumen kupna/sprzedaży, flagi alertów, start_time) oraz świeże
+sent_alerts są zapisywane do jednego pliku JSON. Zapis jest atomowy: plik
+tymczasowy + os.replace, więc przerwany zapis nigdy nie psuje poprzedniego checkpointu.
+
+Przy starcie checkpoint młodszy niż CHECKPOINT_MAX_AGE jest wczytywany do states -
+okna są pełne, a start_time pochodzi z poprzedniego uruchomienia, więc alerty
+działają od pierwszej ramki. Świece zamknięte w czasie przerwy są pominięte
+w oknie, dlatego starszy checkpoint jest ignorowany (zimny start).
+"""
+
+import asyncio
+import json
+import os
+
+import clock
+from config import CHECKPOINT_INTERVAL, CHECKPOINT_MAX_AGE, CHECKPOINT_PATH
+from state import EXCHANGES, RollingBaseline
+
+FORMAT_VERSION = 1
+
+# Pola ExchangeState w kolejności zapisu (lista zamiast słownika - mniejszy plik)
+_FIELDS = (
+    "candle_id", "current_vol", "buy_vol", "sell_vol", "delta",
+    "candle_open", "candle_close", "candle_high", "candle_low",
+    "alert_triggered", "start_time",
+)
+
+
+def _alert_candle(alert_id: str) -> int | None:
+    """Numer świecy z identyfikatora alertu ("BTC_28333333", "BTC_bybit_28333333")"""
+    try:
+        return int(alert_id.rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def snapshot(states: dict, sent_alerts: set, now: float, max_age: float = CHECKPOINT_MAX_AGE) -> dict:
+    """
+    Stan do zapisu. sent_alerts tylko ze świec, które mogą być jeszcze otwarte
+    przy ciepłym restarcie - starsze nie blokują już żadnego alertu.
+    """
+    oldest_candle = int((now - max_age) // 60) - 1
+    coins = {}
+    for coin, coin_state in states.items():
+        coins[coin] = {
+            exchange: [getattr(coin_state[exchange], name) for name in _FIELDS]
+            + [list(coin_state[exchange].baseline.window)]
+            for exchange in EXCHANGES
+        }
+    alerts = sorted(
+        alert_id for alert_id in sent_alerts
+        if (_alert_candle(alert_id) or 0) >= oldest_candle
+    )
+    return {"version": FORMAT_VERSION, "saved_at": now, "coins": coins, "sent_alerts": alerts}
+
+
+def restore(data: dict, states: dict, sent_alerts: set, now: float,
+            max_age: float = CHECKPOINT_MAX_AGE) -> int:
+    """
+    Wczytuje checkpoint do istniejących states. Zwraca liczbę przywróconych stanów
+    (0 = checkpoint za stary albo z innej wersji - zostaje zimny start).
+    Coiny spoza listy są pomijane, nowe coiny startują od zera (CoinStates tworzy
+    stan coina z checkpointu przy pierwszym states[coin]).
+    """
+    if data.get("version") != FORMAT_VERSION or now - data.get("saved_at", 0) > max_age:
+        return 0
+
+    restored = 0
+    for coin, exchanges in data["coins"].items():
+        try:
+            coin_state = states[coin]
+        except KeyError:
+            continue
+        for exchange, values in exchanges.items():
+            state = coin_state.get(exchange)
+            if state is None or len(values) != len(_FIELDS) + 1:
+                continue
+            for name, value in zip(_FIELDS, values):
+                setattr(state, name, value)
+            # Nowy RollingBaseline - średnia i próg liczone od nowa (także przy zmianie HISTORY)
+            state.baseline = RollingBaseline(state.baseline.maxlen, state.baseline.multiplier)
+            for volume in values[-1]:
+                state.baseline.push(volume)
+            restored += 1
+
+    sent_alerts.update(data.get("sent_alerts", ()))
+    return restored
+
+
+def save(path: str, data: dict) -> None:
+    """Atomowy zapis: plik tymczasowy, fsync, podmiana"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load(path: str) -> dict | None:
+    """Checkpoint z pliku albo None (brak pliku / uszkodzony)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Nie można wczytać checkpointu {path}: {e}")
+        return None
+
+
+class Checkpointer:
+    """
+    Okresowy zapis i odtworzenie stanu dla main.py.
+
+    Migawka stanu jest robiona w event loop (spójna - żaden handler nie działa
+    w trakcie), a zapis na dysk w wątku, żeby pętla nie czekała na fsync.
+    """
+
+    def __init__(self, states: dict, sent_alerts: set, path: str = CHECKPOINT_PATH,
+                 interval: float = CHECKPOINT_INTERVAL, max_age: float = CHECKPOINT_MAX_AGE):
+        self.states = states
+        self.sent_alerts = sent_alerts
+        self.path = path
+        self.enabled = bool(path)
+        self.interval = interval
+        self.max_age = max_age
+        self.saves = 0
+
+    def restore(self) -> int:
+        """Wczytuje świeży checkpoint do states (przed startem tasków)"""
+        if not self.enabled:
+            return 0
+        data = load(self.path)
+        if data is None:
+            return 0
+
+        now = clock.now()
+        restored = restore(data, self.states, self.sent_alerts, now, self.max_age)
+        age = now - data.get("saved_at", 0)
+        if restored:
+            print(f"♻️ Przywrócono stan z checkpointu ({restored} stanów, wiek {age:.0f}s)")
+        else:
+            print(f"⏭️ Checkpoint pominięty (wiek {age:.0f}s > {self.max_age:.0f}s lub inna wersja) - zimny start")
+        return restored
+
+    def save(self) -> None:
+        """Zapis synchroniczny (przy zamykaniu)"""
+        if not self.enabled:
+            return
+        try:
+            save(self.path, snapshot(self.states, self.sent_alerts, clock.now(), self.max_age))
+            self.saves += 1
+        except OSError as e:
+            print(f"❌ Błąd zapisu checkpointu: {e}")
+
+    async def run(self) -> None:
+        """Zapis co `interval` sekund"""
+        if not self.enabled:
+            return
+        while True:
+            await asyncio.sleep(self.interval)
+            data = snapshot(self.states, self.sent_alerts, clock.now(), self.max_age)
+            try:
+                await asyncio.to_thread(save, self.path, data)
+                self.saves += 1
+            except OSError as e:
+                print(f"❌ Błąd zapisu checkpointu: {e}")
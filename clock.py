@@ -0,0 +1,44 @@
+"""
+Zegar aplikacji - czas rzeczywisty albo wirtualny (odtwarzanie nagrań).
+
+Kod zależny od czasu (rozgrzewka alertów, godzina w wiadomości, start_time stanu)
+woła clock.now() zamiast time.time(). Podczas odtwarzania now jest podmieniane
+na zegar wirtualny, ustawiany na czas odbioru każdej odtwarzanej ramki.
+"""
+
+import time
+
+now = time.time
+
+
+class VirtualClock:
+    """Czas ustawiany ręcznie (set), a nie odczytywany z systemu"""
+
+    __slots__ = ("current",)
+
+    def __init__(self, start: float = 0.0):
+        self.current = start
+
+    def set(self, timestamp: float) -> None:
+        # Zegar nie cofa się (ramki z różnych połączeń mogą przyjść nie po kolei)
+        self.current = max(self.current, timestamp)
+
+    def time(self) -> float:
+        return self.current
+
+
+def use_virtual_clock(virtual: VirtualClock) -> None:
+    """Przełącza clock.now() na zegar wirtualny"""
+    global now
+    now = virtual.time
+
+
+def use_real_clock() -> None:
+    """Przywraca czas systemowy"""
+    global now
+    now = time.time
+
+
+def strftime(fmt: str) -> str:
+    """time.strftime dla bieżącego czasu zegara aplikacji"""
+    return time.strftime(fmt, time.localtime(now()))
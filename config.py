@@ -3,15 +3,27 @@ Konfiguracja globalna - parametry, URL, tokeny, lista coinów
 """
 
 import os
-from collections import deque
+
 from dotenv import load_dotenv
 
+from universe import SymbolUniverse
+
 # Load environment variables early
 load_dotenv()  # Ładuje zmienne z .env
 
 # ========= PARAMETRY SYSTEMU ==========
 HISTORY = 5  # Liczba świec do historii
 REFRESH_RATE = 0.5  # Częstotliwość odświeżania GUI (sekundy)
+AGGREGATE_INTERVAL = 0.25  # Co ile sekund event loop publikuje sumy giełd (migawka dla GUI)
+
+# ========= WARUNKI ALERTU ==========
+ALERT_VOLUME_MULTIPLIER = 7.5  # Wolumen > N x średnia z HISTORY świec
+ALERT_DELTA_PCT = 30  # |Delta| >= N% wolumenu świecy (zgodnie z kierunkiem świecy)
+ALERT_WARMUP_SECONDS = 360  # Brak alertów przez pierwsze N sekund po starcie
+ALERT_EVAL_INTERVAL = 0.1  # Co ile sekund sprawdzane są coiny ze zmienionym stanem
+ALERT_IMMEDIATE_RATIO = 1.0  # Pierwsze przekroczenie N x próg wolumenu = sprawdzenie od razu
+ALERT_EXCHANGES = ("binance",)  # Giełdy wysyłające alerty (oba tryby ticku; kierunek świecy zawsze z Binance)
+ALERT_VECTORIZED = False  # Tick alertów przez AlertEngine (NumPy) zamiast pętli po coinach
 
 # ========= TELEGRAM ==========
 
@@ -22,234 +34,103 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     raise ValueError("Brak tokenów Telegram w zmiennych środowiskowych! Utwórz plik .env")
 
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_QUEUE_SIZE = 100  # Maksymalna liczba alertów czekających na wysyłkę
+TELEGRAM_MIN_INTERVAL = 1.0  # Minimalny odstęp między wiadomościami (limit Telegrama ~1/s na czat)
+TELEGRAM_MAX_RETRIES = 4
+TELEGRAM_RETRY_BACKOFF = 1.0  # Pierwsze opóźnienie ponowienia (sekundy), potem x2
+
 # ========= TIMEFRAMES ==========
 TF_BINANCE = "1m"
 TF_BYBIT = "1"
 
+# ========= WYŻSZE INTERWAŁY ==========
+# Świece budowane z tych samych transakcji co 1m (bez dodatkowych subskrypcji), w minutach
+TIMEFRAMES = {"1m": 1, "5m": 5, "15m": 15, "1h": 60}
+# Reguły alertu per interwał (Binance), np. {"5m": {"multiplier": 5.0, "delta_pct": 30, "history": 6}}
+# multiplier/history/delta_pct domyślnie jak dla 1m; pusty słownik = tylko alert 1m
+ALERT_TIMEFRAMES = {}
+
 # ========= WEBSOCKET URLs ==========
-BINANCE_WS_URL = "wss://fstream.binance.com/ws/"
-BYBIT_WS_URL = "wss://stream.bybit.com/v5/public/linear"
-GATE_WS_URL = "wss://fx-ws.gateio.ws/v4/ws/usdt"
-OKX_WS_URL = "wss://ws.okx.com:8443/ws/v5/public"
+# Każdy URL można nadpisać zmienną środowiskową (np. lokalny mock_exchange.py)
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://fstream.binance.com/ws/")
+BINANCE_COMBINED_WS_URL = os.getenv(
+    "BINANCE_COMBINED_WS_URL", "wss://fstream.binance.com/stream?streams="
+)
+BYBIT_WS_URL = os.getenv("BYBIT_WS_URL", "wss://stream.bybit.com/v5/public/linear")
+GATE_WS_URL = os.getenv("GATE_WS_URL", "wss://fx-ws.gateio.ws/v4/ws/usdt")
+OKX_WS_URL = os.getenv("OKX_WS_URL", "wss://ws.okx.com:8443/ws/v5/public")
+
+# ========= BINANCE COMBINED STREAM ==========
+BINANCE_COMBINED_STREAMS = True  # Wszystkie streamy Binance przez /stream (False = 2 połączenia na coin)
+BINANCE_MAX_STREAMS = 1024  # Limit streamów na jedno połączenie (Binance Futures)
+BINANCE_URL_STREAMS = 200  # Streamy w URL / w jednej wiadomości SUBSCRIBE
+
+# ========= INNE GIEŁDY (SUBSKRYPCJE) ==========
+SUBSCRIPTION_PING_INTERVAL = 20  # Ping co N sekund ciszy (Bybit/OKX zamykają nieaktywne połączenia)
+
+# ========= KOLEJKI ODBIORU ==========
+INGEST_QUEUE_SIZE = 10_000  # Ramki czekające na przetworzenie na jedno połączenie
+INGEST_MAX_BATCH = 500  # Ramki przetwarzane bez oddawania pętli (potem odczyt i inne połączenia)
+INGEST_OVERFLOW = os.getenv("INGEST_OVERFLOW", "coalesce")  # coalesce | drop_oldest | block
+INGEST_REPORT_INTERVAL = 60  # Co ile sekund raport kolejek zostających w tyle (0 = wyłączony)
+
+# ========= METRYKI (PROMETHEUS) ==========
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Port endpointu /metrics (0 = wyłączony)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Bez autoryzacji - domyślnie tylko lokalnie
+METRICS_SAMPLE_EVERY = 16  # Czas parsowania/handlera i opóźnienie giełdy mierzone co N-tą ramkę
+
+# ========= OPÓŹNIENIA GIEŁD ==========
+LATENCY_SKEW_WINDOW = 300  # Okno kroczącego minimum opóźnienia odbioru (różnica zegarów), sekundy
+LATENCY_SKEW_SLOTS = 10  # Na ile części dzielone jest okno (dokładność wypadania starych próbek)
+
+# ========= NAGRYWANIE RAMEK ==========
+RECORD_DIR = os.getenv("RECORD_DIR", "")  # Katalog nagrań surowych ramek (pusty = wyłączone)
+RECORD_ROTATE_MB = 256  # Nowy plik po N MB danych (przed kompresją)
+RECORD_ROTATE_SECONDS = 3600  # ...albo po N sekundach
+RECORD_MAX_PENDING = 200_000  # Ramki czekające na zapis - powyżej nowe są odrzucane
+RECORD_COMPRESSLEVEL = 3  # gzip: niski poziom = mniej CPU w wątku zapisu
+
+# ========= HISTORIA ŚWIEC ==========
+CANDLE_DIR = os.getenv("CANDLE_DIR", "")  # Katalog historii zamkniętych świec 1m (pusty = wyłączone)
+CANDLE_SEED_MAX_GAP = 5  # Średnia z dysku przy zimnym starcie tylko gdy ostatnia świeca ma najwyżej N minut
+
+# ========= CHECKPOINTY STANU ==========
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "")  # Plik checkpointu stanu (pusty = wyłączone)
+CHECKPOINT_INTERVAL = 30  # Zapis co N sekund (i przy zamknięciu)
+CHECKPOINT_MAX_AGE = 180  # Starszy checkpoint = zimny start (świece z przerwy brakują w oknie)
+
+# ========= TRYB BEZ GUI (--headless) ==========
+# Coiny monitorowane także na Bybit/Gate.io/OKX, po przecinku ("all" = wszystkie); --coins nadpisuje
+HEADLESS_EXCHANGE_COINS = os.getenv("HEADLESS_EXCHANGE_COINS", "")
+HEADLESS_SHUTDOWN_TIMEOUT = 5.0  # Ile sekund po SIGTERM czekać na wysłanie alertów z kolejki
+
+# ========= EVENT LOOP ==========
+EVENT_LOOP = os.getenv("EVENT_LOOP", "asyncio")  # asyncio | uvloop (pip install uvloop) | auto
+LOOP_LAG_INTERVAL = 0.1  # Co ile sekund mierzone jest opóźnienie pętli (0 = wyłączone)
+LOOP_LAG_REPORT_INTERVAL = 60  # Co ile sekund drukowane są percentyle opóźnienia (0 = bez raportów)
+
+# ========= TRYB WIELOPROCESOWY (--workers) ==========
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0"))  # Procesy robocze z częścią coinów (0 = jeden proces)
+SHARD_PUBLISH_INTERVAL = 0.05  # Co ile sekund proces roboczy zapisuje zmienione coiny do pamięci współdzielonej
+SHARD_READ_INTERVAL = 0.05  # Co ile sekund proces główny kopiuje zmiany do states
+
+# ========= DEKODOWANIE JSON ==========
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")  # auto | msgspec | orjson | json
 
 # ========= LISTA COINÓW ==========
-COINS = {
-    "ETH": {
-        "binance": "ethusdt",
-        "bybit": "ETHUSDT",
-        "gate": "ETH_USDT",
-        "okx": "ETH-USDT-SWAP",
-        "gate_contract_size": 0.01,
-        "okx_contract_size": 0.1
-    },
-    "BTC": {
-        "binance": "btcusdt",
-        "bybit": "BTCUSDT",
-        "gate": "BTC_USDT",
-        "okx": "BTC-USDT-SWAP",
-        "gate_contract_size": 0.0001,
-        "okx_contract_size": 0.01
-    },
-    "SOL": {
-        "binance": "solusdt",
-        "bybit": "SOLUSDT",
-        "gate": "SOL_USDT",
-        "okx": "SOL-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "SUI": {
-        "binance": "suiusdt",
-        "bybit": "SUIUSDT",
-        "gate": "SUI_USDT",
-        "okx": "SUI-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "DOGE": {
-        "binance": "dogeusdt",
-        "bybit": "DOGEUSDT",
-        "gate": "DOGE_USDT",
-        "okx": "DOGE-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "ADA": {
-        "binance": "adausdt",
-        "bybit": "ADAUSDT",
-        "gate": "ADA_USDT",
-        "okx": "ADA-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "BNB": {
-        "binance": "bnbusdt",
-        "bybit": "BNBUSDT",
-        "gate": "BNB_USDT",
-        "okx": "BNB-USDT-SWAP",
-        "gate_contract_size": 0.01,
-        "okx_contract_size": 0.1
-    },
-    "ENA": {
-        "binance": "enausdt",
-        "bybit": "ENAUSDT",
-        "gate": "ENA_USDT",
-        "okx": "ENA-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "LINK": {
-        "binance": "linkusdt",
-        "bybit": "LINKUSDT",
-        "gate": "LINK_USDT",
-        "okx": "LINK-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "LTC": {
-        "binance": "ltcusdt",
-        "bybit": "LTCUSDT",
-        "gate": "LTC_USDT",
-        "okx": "LTC-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "FET": {
-        "binance": "fetusdt",
-        "bybit": "FETUSDT",
-        "gate": "FET_USDT",
-        "okx": "FET-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "APT": {
-        "binance": "aptusdt",
-        "bybit": "APTUSDT",
-        "gate": "APT_USDT",
-        "okx": "APT-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "DASH": {
-        "binance": "dashusdt",
-        "bybit": "DASHUSDT",
-        "gate": "DASH_USDT",
-        "okx": "DASH-USDT-SWAP",
-        "gate_contract_size": 0.1,
-        "okx_contract_size": 0.1
-    },
-    "AAVE": {
-        "binance": "aaveusdt",
-        "bybit": "AAVEUSDT",
-        "gate": "AAVE_USDT",
-        "okx": "AAVE-USDT-SWAP",
-        "gate_contract_size": 0.1,
-        "okx_contract_size": 0.1
-    },
-    "ATOM": {
-        "binance": "atomusdt",
-        "bybit": "ATOMUSDT",
-        "gate": "ATOM_USDT",
-        "okx": "ATOM-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "ETC": {
-        "binance": "etcusdt",
-        "bybit": "ETCUSDT",
-        "gate": "ETC_USDT",
-        "okx": "ETC-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "XLM": {
-        "binance": "xlmusdt",
-        "bybit": "XLMUSDT",
-        "gate": "XLM_USDT",
-        "okx": "XLM-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "ASTER": {
-        "binance": "asterusdt",
-        "bybit": "ASTERUSDT",
-        "gate": "ASTER_USDT",
-        "okx": "ASTER-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "JUP": {
-        "binance": "jupusdt",
-        "bybit": "JUPUSDT",
-        "gate": "JUP_USDT",
-        "okx": "JUP-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    },
-    "INJ": {
-        "binance": "injusdt",
-        "bybit": "INJUSDT",
-        "gate": "INJ_USDT",
-        "okx": "INJ-USDT-SWAP",
-        "gate_contract_size": 1.0,
-        "okx_contract_size": 1.0
-    }
-}
+# Plik JSON: coin -> symbole giełd i wielkości kontraktów (format w universe.py)
+COINS_FILE = os.getenv("COINS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "coins.json"))
+COINS_RELOAD_INTERVAL = 10  # Co ile sekund sprawdzana jest zmiana pliku - coiny dodawane/usuwane bez restartu (0 = wyłączone)
+GUI_MAX_CHECKBOXES = 48  # Najwięcej checkboxów coinów naraz w GUI (reszta przez pole filtra)
+COINS = SymbolUniverse.load(COINS_FILE)
 
 
 def initialize_states():
-    """Inicjalizuje stan dla wszystkich coinów i giełd"""
-    import time
-    
-    states = {}
-    for coin in COINS:
-        states[coin] = {
-            "binance": {
-                "current_vol": 0.0,
-                "avg_vol": 0.0,
-                "last_volumes": deque(maxlen=HISTORY),
-                "buy_vol": 0.0,
-                "sell_vol": 0.0,
-                "delta": 0.0,
-                "candle_id": None,
-                "current_candle_open": 0.0,
-                "current_candle_close": 0.0,
-                "current_candle_high": 0.0,
-                "current_candle_low": 0.0,
-                "alert_triggered": False,
-                "start_time": time.time()
-            },
-            "bybit": {
-                "current_vol": 0.0,
-                "avg_vol": 0.0,
-                "last_volumes": deque(maxlen=HISTORY),
-                "buy_vol": 0.0,
-                "sell_vol": 0.0,
-                "delta": 0.0,
-                "candle_id": None,
-            },
-            "gate": {
-                "current_vol": 0.0,
-                "avg_vol": 0.0,
-                "last_volumes": deque(maxlen=HISTORY),
-                "buy_vol": 0.0,
-                "sell_vol": 0.0,
-                "delta": 0.0,
-                "candle_start": None,
-            },
-            "okx": {
-                "current_vol": 0.0,
-                "avg_vol": 0.0,
-                "last_volumes": deque(maxlen=HISTORY),
-                "buy_vol": 0.0,
-                "sell_vol": 0.0,
-                "delta": 0.0,
-                "candle_id": None,
-            },
-            "combined": {
-                "current_vol": 0.0,
-                "avg_vol": 0.0,
-                "delta": 0.0,
-            }
-        }
-    return states
+    """
+    Stany coinów i giełd (obiekty ze __slots__, patrz state.py) - tworzone przy
+    pierwszym użyciu states[coin], tylko dla coinów z COINS.
+    """
+    from state import CoinStates
+
+    return CoinStates(COINS)
@@ -0,0 +1,322 @@
+"""
+Dekodowanie ramek JSON - szybki backend (msgspec/orjson) jeśli zainstalowany, inaczej json.
+
+Każda funkcja zwraca tylko pola potrzebne handlerom, w postaci krotek:
+- msgspec: typowane schematy, nieużywane pola są pomijane bez budowania dictów
+- orjson / json: pełny dict, z którego wyciągamy te same pola
+
+Ramki niebędące danymi (potwierdzenia subskrypcji, pong) są odrzucane
+tanim sprawdzeniem bajtów przed parsowaniem.
+"""
+
+import json
+
+from config import JSON_BACKEND
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _select_backend(requested: str) -> str:
+    available = ["json"]
+    if orjson is not None:
+        available.insert(0, "orjson")
+    if msgspec is not None:
+        available.insert(0, "msgspec")
+
+    if requested == "auto":
+        return available[0]
+    if requested not in available:
+        print(f"⚠️ Backend JSON '{requested}' niedostępny - używam {available[0]}")
+        return available[0]
+    return requested
+
+
+BACKEND = _select_backend(JSON_BACKEND)
+
+if BACKEND == "orjson":
+    loads = orjson.loads
+elif BACKEND == "msgspec":
+    loads = msgspec.json.decode
+else:
+    _json_loads = json.loads
+
+    def loads(raw):
+        # json.loads(bytes) wykrywa kodowanie przy każdym wywołaniu - szybciej zdekodować samemu
+        if raw.__class__ is bytes:
+            raw = raw.decode()
+        return _json_loads(raw)
+
+
+# ======================== PRE-FILTR ========================
+
+def is_data_frame(raw: bytes, marker: bytes) -> bool:
+    """Sprawdza bez parsowania czy ramka zawiera pole danych (np. b'"topic"')"""
+    return marker in raw
+
+
+def _string_value(raw: bytes, field: bytes) -> bytes | None:
+    """Wartość pola tekstowego bez parsowania (pierwsze wystąpienie field, np. b'"stream"')"""
+    i = raw.find(field)
+    if i < 0:
+        return None
+    start = raw.find(b'"', i + len(field)) + 1
+    end = raw.find(b'"', start)
+    return raw[start:end] if start and end > 0 else None
+
+
+def int_value(raw: bytes, field: bytes) -> int | None:
+    """
+    Liczba całkowita pola bez parsowania - także zapisana jako tekst (OKX "ts":"1700...").
+    Pierwsze wystąpienie pola, np. b'"T"'; None gdy brak pola albo wartość nie jest liczbą.
+    """
+    i = raw.find(field)
+    if i < 0:
+        return None
+    i += len(field)
+    end = len(raw)
+    while i < end and raw[i] in b': "':
+        i += 1
+    j = i
+    while j < end and 48 <= raw[j] <= 57:
+        j += 1
+    return int(raw[i:j]) if j > i else None
+
+
+def binance_kline_key(raw: bytes) -> tuple | None:
+    """
+    (stream, otwarta) dla ramki kline combined streamu, None dla pozostałych.
+    Otwarta świeca to pełny stan - nowsza ramka może zastąpić starszą; zamkniętej
+    i transakcji nie wolno pominąć (zgubiony wolumen / okno średniej).
+    """
+    # Nazwa streamu jest pierwszym polem ramki - transakcje odpadają bez kopiowania
+    if raw.find(b"@kline", 0, 64) < 0:
+        return None
+    stream = _string_value(raw, b'"stream"')
+    if stream is None:
+        return None
+    return stream.decode(), b'"x":false' in raw or b'"x": false' in raw
+
+
+def bybit_kline_key(raw: bytes) -> tuple | None:
+    """(temat, otwarta) dla ramki kline Bybit, None dla pozostałych (jak binance_kline_key)"""
+    if raw.find(b'"kline.', 0, 64) < 0:
+        return None
+    topic = _string_value(raw, b'"topic"')
+    if topic is None or not topic.startswith(b"kline."):
+        return None
+    return topic.decode(), b'"confirm":false' in raw or b'"confirm": false' in raw
+
+
+# Znacznik czasu giełdy - (stream, ms) dla sond opóźnień (metrics.FrameProbe), bez parsowania.
+# Transakcje: czas transakcji; świece: czas zdarzenia/wiadomości (czas w świecy to jej granice).
+
+def binance_stamp(raw: bytes) -> tuple | None:
+    if raw.find(b"@aggTrade", 0, 64) >= 0:
+        return "aggTrade", int_value(raw, b'"T"')
+    if raw.find(b"@kline", 0, 64) >= 0:
+        return "kline", int_value(raw, b'"E"')
+    return None
+
+
+def bybit_stamp(raw: bytes) -> tuple | None:
+    if raw.find(b'"publicTrade.', 0, 64) >= 0:
+        return "publicTrade", int_value(raw, b'"T"')
+    if raw.find(b'"kline.', 0, 64) >= 0:
+        return "kline", int_value(raw, b'"ts"')
+    return None
+
+
+def gate_stamp(raw: bytes) -> tuple | None:
+    ts = int_value(raw, b'"create_time_ms"')
+    return None if ts is None else ("trades", ts)
+
+
+def okx_stamp(raw: bytes) -> tuple | None:
+    ts = int_value(raw, b'"ts"')
+    return None if ts is None else ("trades", ts)
+
+
+# ======================== WSPÓLNE (FALLBACK) ========================
+
+def _aggtrade_fields(d: dict) -> tuple:
+    return float(d["q"]), d["m"], int(d["T"])
+
+
+def _kline_fields(d: dict) -> tuple:
+    k = d["k"]
+    return (float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"]), k["x"],
+            int(k.get("t", 0)))
+
+
+def _combined_fields(raw: bytes) -> tuple:
+    d = loads(raw)
+    return d.get("stream"), d.get("data")
+
+
+def _bybit_frame(raw: bytes) -> tuple:
+    d = loads(raw)
+    return d.get("topic"), d.get("data")
+
+
+def _bybit_trades(data: list) -> list:
+    return [(int(t["T"]), float(t["v"]), t["S"] == "Sell") for t in data]
+
+
+def _bybit_kline(data: list) -> tuple:
+    k = data[0]
+    return float(k["volume"]), k["confirm"]
+
+
+def _gate_trades(raw: bytes):
+    d = loads(raw)
+    if d.get("event") != "update" or "result" not in d:
+        return None
+    return [(t["contract"], t["size"], int(t["create_time_ms"])) for t in d["result"]]
+
+
+def _okx_trades(raw: bytes):
+    d = loads(raw)
+    if "event" in d or "data" not in d:
+        return None
+    return d["arg"]["instId"], [
+        (int(t["ts"]), float(t["sz"]), t["side"] == "sell") for t in d["data"]
+    ]
+
+
+# ======================== MSGSPEC (TYPOWANE SCHEMATY) ========================
+
+if BACKEND == "msgspec":
+
+    class _AggTrade(msgspec.Struct):
+        q: float
+        m: bool
+        T: int
+
+    class _Kline(msgspec.Struct):
+        o: float
+        h: float
+        l: float  # nazwa pola z API Binance
+        c: float
+        v: float
+        x: bool
+        t: int = 0  # początek świecy (ms)
+
+    class _KlineEvent(msgspec.Struct):
+        k: _Kline
+
+    class _Combined(msgspec.Struct):
+        stream: str = ""
+        data: msgspec.Raw = msgspec.Raw(b"null")
+
+    class _BybitFrame(msgspec.Struct):
+        topic: str = ""
+        data: msgspec.Raw = msgspec.Raw(b"null")
+
+    class _BybitTrade(msgspec.Struct):
+        T: int
+        v: float
+        S: str
+
+    class _BybitKline(msgspec.Struct):
+        volume: float
+        confirm: bool
+
+    class _GateTrade(msgspec.Struct):
+        contract: str
+        size: float
+        create_time_ms: int
+
+    class _GateFrame(msgspec.Struct):
+        event: str = ""
+        result: list[_GateTrade] | None = None
+
+    class _OkxArg(msgspec.Struct):
+        instId: str = ""
+
+    class _OkxTrade(msgspec.Struct):
+        ts: int
+        sz: float
+        side: str
+
+    class _OkxFrame(msgspec.Struct):
+        arg: _OkxArg | None = None
+        data: list[_OkxTrade] | None = None
+        event: str | None = None
+
+    # strict=False: liczby przesyłane jako stringi ("1.5") są konwertowane od razu
+    _dec_aggtrade = msgspec.json.Decoder(_AggTrade, strict=False)
+    _dec_kline = msgspec.json.Decoder(_KlineEvent, strict=False)
+    _dec_combined = msgspec.json.Decoder(_Combined)
+    _dec_bybit_frame = msgspec.json.Decoder(_BybitFrame)
+    _dec_bybit_trades = msgspec.json.Decoder(list[_BybitTrade], strict=False)
+    _dec_bybit_kline = msgspec.json.Decoder(list[_BybitKline], strict=False)
+    _dec_gate = msgspec.json.Decoder(_GateFrame, strict=False)
+    _dec_okx = msgspec.json.Decoder(_OkxFrame, strict=False)
+
+    def binance_aggtrade(payload) -> tuple:
+        """(qty, is_sell, ts) z ramki aggTrade"""
+        t = _dec_aggtrade.decode(payload)
+        return t.q, t.m, t.T
+
+    def binance_kline(payload) -> tuple:
+        """(open, high, low, close, volume, is_closed, początek ms) z ramki kline"""
+        k = _dec_kline.decode(payload).k
+        return k.o, k.h, k.l, k.c, k.v, k.x, k.t
+
+    def binance_combined(raw: bytes) -> tuple:
+        """(stream, payload) - payload pozostaje niezdekodowany do czasu routingu"""
+        frame = _dec_combined.decode(raw)
+        return frame.stream, frame.data
+
+    def bybit_frame(raw: bytes) -> tuple:
+        """(topic, payload) - payload dekodowany dopiero przez właściwy handler"""
+        frame = _dec_bybit_frame.decode(raw)
+        return frame.topic, frame.data
+
+    def bybit_trades(payload) -> list:
+        """[(ts, qty, is_sell), ...] z publicTrade"""
+        return [(t.T, t.v, t.S == "Sell") for t in _dec_bybit_trades.decode(payload)]
+
+    def bybit_kline(payload) -> tuple:
+        """(volume, is_closed) z pierwszej świecy"""
+        k = _dec_bybit_kline.decode(payload)[0]
+        return k.volume, k.confirm
+
+    def gate_trades(raw: bytes):
+        """[(contract, size, ts), ...] albo None dla ramek bez transakcji"""
+        frame = _dec_gate.decode(raw)
+        if frame.event != "update" or frame.result is None:
+            return None
+        return [(t.contract, t.size, t.create_time_ms) for t in frame.result]
+
+    def okx_trades(raw: bytes):
+        """(instId, [(ts, contracts, is_sell), ...]) albo None dla ramek bez transakcji"""
+        frame = _dec_okx.decode(raw)
+        if frame.event is not None or frame.data is None:
+            return None
+        return frame.arg.instId, [(t.ts, t.sz, t.side == "sell") for t in frame.data]
+
+else:
+
+    def binance_aggtrade(payload) -> tuple:
+        """(qty, is_sell, ts) z ramki aggTrade"""
+        return _aggtrade_fields(payload if isinstance(payload, dict) else loads(payload))
+
+    def binance_kline(payload) -> tuple:
+        """(open, high, low, close, volume, is_closed, początek ms) z ramki kline"""
+        return _kline_fields(payload if isinstance(payload, dict) else loads(payload))
+
+    binance_combined = _combined_fields
+    bybit_frame = _bybit_frame
+    bybit_trades = _bybit_trades
+    bybit_kline = _bybit_kline
+    gate_trades = _gate_trades
+    okx_trades = _okx_trades
@@ -0,0 +1,111 @@
+"""
+Event loop aplikacji - standardowy asyncio albo uvloop (EVENT_LOOP) i pomiar opóźnienia pętli.
+
+uvloop (libuv) jest opcjonalny: EVENT_LOOP=uvloop bez zainstalowanego pakietu
+zostaje przy asyncio z ostrzeżeniem, EVENT_LOOP=auto bierze uvloop, gdy jest.
+
+LoopLagMonitor co LOOP_LAG_INTERVAL zasypia na asyncio.sleep i mierzy, o ile
+później niż planowo się obudził - to czas, przez który pętla była zajęta
+handlerami (dekodowanie, stan, alerty). Co LOOP_LAG_REPORT_INTERVAL drukuje
+percentyle z okresu: p99 rzędu milisekund = pętla nadąża, dziesiątki ms i więcej =
+ramki czekają w buforach gniazd. Próbki trzyma ograniczona kolejka (jeden okres
+raportu, bez raportów - ostatnie _UNREPORTED_WINDOW s), histogram /metrics liczy wszystkie.
+"""
+
+import asyncio
+from collections import deque
+
+from config import EVENT_LOOP, LOOP_LAG_INTERVAL, LOOP_LAG_REPORT_INTERVAL
+from metrics import LATENCY_BUCKETS, metrics
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def _select_loop(requested: str) -> str:
+    if requested == "auto":
+        return "uvloop" if uvloop is not None else "asyncio"
+    if requested == "uvloop" and uvloop is None:
+        print("⚠️ uvloop niedostępny (pip install uvloop) - używam asyncio")
+        return "asyncio"
+    if requested not in ("asyncio", "uvloop"):
+        print(f"⚠️ Nieznany EVENT_LOOP '{requested}' - używam asyncio")
+        return "asyncio"
+    return requested
+
+
+LOOP = _select_loop(EVENT_LOOP)
+_UNREPORTED_WINDOW = 60  # Okno próbek (s), gdy raporty są wyłączone (LOOP_LAG_REPORT_INTERVAL = 0)
+
+
+def run(coro):
+    """asyncio.run z pętlą wybraną w EVENT_LOOP"""
+    loop_factory = uvloop.new_event_loop if LOOP == "uvloop" else None
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(coro)
+
+
+class LoopLagMonitor:
+    """Opóźnienie budzenia asyncio.sleep - próbki z bieżącego okresu raportu"""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL,
+                 report_interval: float = LOOP_LAG_REPORT_INTERVAL):
+        self.interval = interval
+        self.report_interval = report_interval
+        self.enabled = interval > 0
+        window = report_interval if report_interval > 0 else _UNREPORTED_WINDOW
+        self.samples = deque(maxlen=int(window / interval) + 1 if self.enabled else 1)
+        self.last = None  # percentyle z ostatniego raportu
+        self.histogram = metrics.histogram(
+            "spike_loop_lag_seconds", "Opóźnienie budzenia event loop", LATENCY_BUCKETS)
+
+    def record(self, lag: float) -> None:
+        self.samples.append(lag)
+        self.histogram.observe(lag)
+
+    def percentiles(self) -> dict | None:
+        """p50/p90/p99/max (sekundy) z zebranych próbek albo None, gdy brak próbek"""
+        if not self.samples:
+            return None
+        lag = sorted(self.samples)
+        last = len(lag) - 1
+        return {
+            "count": len(lag),
+            "p50": lag[min(last, int(len(lag) * 0.5))],
+            "p90": lag[min(last, int(len(lag) * 0.9))],
+            "p99": lag[min(last, int(len(lag) * 0.99))],
+            "max": lag[last],
+        }
+
+    def report(self) -> dict | None:
+        """Drukuje percentyle okresu i zaczyna nowy okres"""
+        stats = self.percentiles()
+        self.samples.clear()
+        if stats is not None:
+            self.last = stats
+            print(f"⏱️ Opóźnienie pętli ({LOOP}, {stats['count']} próbek): "
+                  f"p50 {stats['p50'] * 1000:.1f} ms  p90 {stats['p90'] * 1000:.1f} ms  "
+                  f"p99 {stats['p99'] * 1000:.1f} ms  max {stats['max'] * 1000:.1f} ms")
+        return stats
+
+    async def run(self) -> None:
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        interval = self.interval
+        record = self.record
+        next_report = loop.time() + self.report_interval
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            now = loop.time()
+            record(max(0.0, now - started - interval))
+            if self.report_interval > 0 and now >= next_report:
+                self.report()
+                next_report = now + self.report_interval
+
+
+# Wspólna instancja dla main.py
+lag_monitor = LoopLagMonitor()
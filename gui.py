@@ -2,21 +2,31 @@
 Interfejs graficzny - Tkinter z tabelą danych dla każdego coina
 """
 
-import tkinter as tk
-from tkinter import ttk, Checkbutton, BooleanVar
 import asyncio
+import time
+import tkinter as tk
+from tkinter import BooleanVar, Checkbutton, StringVar, ttk
 
-from config import COINS, REFRESH_RATE
+from aggregator import CombinedAggregator
+from config import COINS, GUI_MAX_CHECKBOXES, REFRESH_RATE
+from metrics import DURATION_BUCKETS, metrics
+
+_COLUMNS = ('coin', 'exchange', 'volume', 'avg', 'delta', 'delta_pct')
+# Etykiety wierszy coina - w kolejności wierszy migawki (aggregator.SNAPSHOT_ROWS)
+_ROW_LABELS = ("BINANCE", "BYBIT", "GATE.IO", "OKX", "COMBINED")
+_refresh_seconds = metrics.histogram(
+    "spike_gui_refresh_seconds", "Czas odświeżenia tabeli GUI", DURATION_BUCKETS)
 
 
 class CryptoMonitorGUI:
     """GUI do monitorowania i kontroli coinów"""
 
     def __init__(self, root: tk.Tk, loop: asyncio.AbstractEventLoop, states: dict,
-                 start_callback, stop_callback):
+                 start_callback, stop_callback, aggregator: CombinedAggregator):
         self.root = root
         self.loop = loop
         self.states = states
+        self.aggregator = aggregator  # migawki danych publikowane przez event loop
         self.start_callback = start_callback  # async funkcja start_other_exchanges
         self.stop_callback = stop_callback    # async funkcja stop_other_exchanges
 
@@ -24,9 +34,11 @@ class CryptoMonitorGUI:
         self.root.geometry("1600x950")
         self.root.configure(bg="#1e1e1e")
 
-        # Zmienne dla checkboxów
+        # Zmienne dla checkboxów (tworzone przy pierwszym pokazaniu coina)
         self.coin_vars = {}
         self.visible_coins = set()
+        self.shown_coins = []  # coiny z checkboxem (pasujące do filtra, najwyżej GUI_MAX_CHECKBOXES)
+        self.universe_version = COINS.version
         
         # Kolory - dark theme
         self.bg_color = "#1e1e1e"
@@ -80,20 +92,17 @@ class CryptoMonitorGUI:
         selection_frame = ttk.LabelFrame(main_frame, text="🎯 Wybierz Coiny do Wyświetlania", padding=12)
         selection_frame.pack(fill='x', pady=(0, 15))
 
-        # Checkboxów w rzędach po 8
-        row_frame = None
-        for i, coin in enumerate(COINS):
-            if i % 8 == 0:
-                row_frame = ttk.Frame(selection_frame)
-                row_frame.pack(fill='x', pady=3)
+        # Filtr - przy setkach coinów checkboxy tylko dla pasujących
+        filter_frame = ttk.Frame(selection_frame)
+        filter_frame.pack(fill='x', pady=3)
+        ttk.Label(filter_frame, text="🔍 Filtr:").pack(side='left', padx=(8, 4))
+        self.filter_var = StringVar(value="")
+        self.filter_var.trace_add("write", lambda *_: self._build_checkboxes())
+        ttk.Entry(filter_frame, textvariable=self.filter_var, width=20).pack(side='left')
 
-            var = BooleanVar(value=False)
-            self.coin_vars[coin] = var
-            cb = Checkbutton(row_frame, text=coin, variable=var,
-                           command=lambda c=coin: self.toggle_coin_display(c),
-                           font=('Segoe UI', 9), bg=self.bg_color, fg=self.fg_color,
-                           selectcolor=self.accent_color, activebackground=self.bg_color)
-            cb.pack(side='left', padx=8)
+        self.checkbox_frame = ttk.Frame(selection_frame)
+        self.checkbox_frame.pack(fill='x')
+        self._build_checkboxes()
 
         # Przyciski szybkiego wyboru
         button_frame = ttk.Frame(selection_frame)
@@ -108,8 +117,7 @@ class CryptoMonitorGUI:
         table_frame = ttk.Frame(main_frame)
         table_frame.pack(fill='both', expand=True)
 
-        cols = ('coin', 'exchange', 'volume', 'avg', 'delta', 'delta_pct')
-        self.tree = ttk.Treeview(table_frame, columns=cols, show='headings', style='Custom.Treeview', selectmode='none')
+        self.tree = ttk.Treeview(table_frame, columns=_COLUMNS, show='headings', style='Custom.Treeview', selectmode='none')
 
         # Nagłówki i format kolumn
         self.tree.heading('coin', text='💰 Coin', anchor='center')
@@ -149,7 +157,59 @@ class CryptoMonitorGUI:
         vsb.pack(side='right', fill='y')
 
         # Mapa itemów w drzewie: self.tree_item_ids[coin][exchange] -> item_id
-        self.tree_item_ids = {coin: {} for coin in COINS}
+        self.tree_item_ids = {}
+
+        # Cache wierszy - do Tk trafiają tylko zmienione komórki:
+        # row_parity[item] -> 'even'/'odd' (bez odpytywania Tk o tagi)
+        # row_cache[item] -> (surowe liczby, sformatowane wartości, tagi) z ostatniego odświeżenia
+        self.row_parity = {}
+        self.row_cache = {}
+        self.tk_updates = 0  # liczba wywołań Tk przy odświeżaniu (diagnostyka/benchmarki)
+        self.shown_version = -1  # wersja migawki ostatnio wpisanej do tabeli
+
+        self.root.after(1000, self._check_universe)
+
+    def _coin_var(self, coin: str) -> BooleanVar:
+        var = self.coin_vars.get(coin)
+        if var is None:
+            var = self.coin_vars[coin] = BooleanVar(value=coin in self.visible_coins)
+        return var
+
+    def _build_checkboxes(self) -> None:
+        """Checkboxy coinów pasujących do filtra, w rzędach po 8"""
+        for child in self.checkbox_frame.winfo_children():
+            child.destroy()
+
+        text = self.filter_var.get().strip().upper()
+        matching = [coin for coin in list(COINS) if text in coin]
+        self.shown_coins = matching[:GUI_MAX_CHECKBOXES]
+
+        row_frame = None
+        for i, coin in enumerate(self.shown_coins):
+            if i % 8 == 0:
+                row_frame = ttk.Frame(self.checkbox_frame)
+                row_frame.pack(fill='x', pady=3)
+
+            cb = Checkbutton(row_frame, text=coin, variable=self._coin_var(coin),
+                           command=lambda c=coin: self.toggle_coin_display(c),
+                           font=('Segoe UI', 9), bg=self.bg_color, fg=self.fg_color,
+                           selectcolor=self.accent_color, activebackground=self.bg_color)
+            cb.pack(side='left', padx=8)
+
+        if len(matching) > len(self.shown_coins):
+            ttk.Label(self.checkbox_frame, foreground="#888888",
+                      text=f"... i {len(matching) - len(self.shown_coins)} więcej - zawęź filtr").pack(anchor='w', padx=8)
+
+    def _check_universe(self) -> None:
+        """Po zmianie listy coinów (plik COINS_FILE) - usuwa wiersze usuniętych i odświeża checkboxy"""
+        if COINS.version != self.universe_version:
+            self.universe_version = COINS.version
+            for coin in [coin for coin in self.visible_coins if coin not in COINS]:
+                self._delete_coin_rows(coin)
+                self.visible_coins.discard(coin)
+                self.coin_vars.pop(coin, None)
+            self._build_checkboxes()
+        self.root.after(1000, self._check_universe)
 
     def toggle_coin_display(self, coin: str) -> None:
         """Przełącza wyświetlanie coina i monitorowanie 3 giełd"""
@@ -161,18 +221,24 @@ class CryptoMonitorGUI:
             asyncio.run_coroutine_threadsafe(self.start_callback(coin), self.loop)
         else:
             # Usuń wiersze tego coina z drzewa
-            for exchange, item_id in list(self.tree_item_ids.get(coin, {}).items()):
-                try:
-                    self.tree.delete(item_id)
-                except Exception:
-                    pass
-            self.tree_item_ids[coin] = {}
+            self._delete_coin_rows(coin)
             self.visible_coins.discard(coin)
             asyncio.run_coroutine_threadsafe(self.stop_callback(coin), self.loop)
 
+    def _delete_coin_rows(self, coin: str) -> None:
+        """Usuwa wiersze coina z drzewa i z cache"""
+        for item_id in self.tree_item_ids.get(coin, {}).values():
+            self.row_parity.pop(item_id, None)
+            self.row_cache.pop(item_id, None)
+            try:
+                self.tree.delete(item_id)
+            except Exception:
+                pass
+        self.tree_item_ids[coin] = {}
+
     def _create_coin_rows(self, coin: str) -> None:
         """Tworzy i wyświetla wiersze dla danego coina"""
-        exchanges = ["BINANCE", "BYBIT", "GATE.IO", "OKX", "COMBINED"]
+        exchanges = _ROW_LABELS
         exchange_emoji = {
             "BINANCE": "🔶",
             "BYBIT": "🟦",
@@ -187,7 +253,9 @@ class CryptoMonitorGUI:
             idx = len(self.tree.get_children())
             parity_tag = 'even' if idx % 2 == 0 else 'odd'
             item = self.tree.insert('', 'end', values=(coin_display, exchange_text, '0.0', '0.0', '0.0', '0.0%'), tags=(parity_tag, 'neutral'))
-            self.tree_item_ids[coin][exchange] = item
+            self.tree_item_ids.setdefault(coin, {})[exchange] = item
+            self.row_parity[item] = parity_tag
+        self.shown_version = -1  # nowe wiersze - wpisz migawkę przy najbliższym odświeżeniu
 
         # Insert a thin separator row after the coin group to visually separate groups
         sep_idx = len(self.tree.get_children())
@@ -196,101 +264,77 @@ class CryptoMonitorGUI:
         self.tree_item_ids[coin]['__sep__'] = sep_item
 
     def select_all_coins(self) -> None:
-        """Zaznacza wszystkie coiny"""
-        for coin in COINS:
-            self.coin_vars[coin].set(True)
+        """Zaznacza wszystkie coiny z checkboxem (pasujące do filtra)"""
+        for coin in self.shown_coins:
+            self._coin_var(coin).set(True)
             if not self.tree_item_ids.get(coin) or len(self.tree_item_ids[coin]) == 0:
                 self._create_coin_rows(coin)
             self.visible_coins.add(coin)
             asyncio.run_coroutine_threadsafe(self.start_callback(coin), self.loop)
 
     def deselect_all_coins(self) -> None:
-        """Odznacza wszystkie coiny"""
-        for coin in COINS:
-            self.coin_vars[coin].set(False)
-            for exchange, item_id in list(self.tree_item_ids.get(coin, {}).items()):
-                try:
-                    self.tree.delete(item_id)
-                except Exception:
-                    pass
-            self.tree_item_ids[coin] = {}
+        """Odznacza wszystkie wyświetlane coiny"""
+        for coin in list(self.visible_coins):
+            self._coin_var(coin).set(False)
+            self._delete_coin_rows(coin)
             self.visible_coins.discard(coin)
             asyncio.run_coroutine_threadsafe(self.stop_callback(coin), self.loop)
 
     def update_display(self) -> None:
-        """Aktualizuje wyświetlane dane dla widocznych coinów"""
-        for coin in self.visible_coins:
-            state_combined = self.states[coin]["combined"]
-            state_binance = self.states[coin]["binance"]
-            state_bybit = self.states[coin]["bybit"]
-            state_gate = self.states[coin]["gate"]
-            state_okx = self.states[coin]["okx"]
-
-            # Oblicz sumy dla kombinowanych danych
-            state_combined["current_vol"] = (
-                state_binance["current_vol"] + state_bybit["current_vol"] +
-                state_gate["current_vol"] + state_okx["current_vol"]
-            )
-            state_combined["avg_vol"] = (
-                state_binance["avg_vol"] + state_bybit["avg_vol"] +
-                state_gate["avg_vol"] + state_okx["avg_vol"]
-            )
-            state_combined["delta"] = (
-                state_binance["delta"] + state_bybit["delta"] +
-                state_gate["delta"] + state_okx["delta"]
-            )
-
-            # Oblicz CAŁKOWITY wolumen dla kombinowanych
-            total_buy_vol = (
-                state_binance["buy_vol"] + state_bybit["buy_vol"] +
-                state_gate["buy_vol"] + state_okx["buy_vol"]
-            )
-            total_sell_vol = (
-                state_binance["sell_vol"] + state_bybit["sell_vol"] +
-                state_gate["sell_vol"] + state_okx["sell_vol"]
-            )
-            total_combined_vol = total_buy_vol + total_sell_vol
-
-            # Oblicz procent delty dla kombinowanych
-            combined_delta_percent = (
-                (state_combined["delta"] / total_combined_vol * 100)
-                if total_combined_vol > 0 else 0
-            )
-
-            # Update danych dla każdej giełdy
-            self._update_exchange_data(coin, "BINANCE", state_binance)
-            self._update_exchange_data(coin, "BYBIT", state_bybit)
-            self._update_exchange_data(coin, "GATE.IO", state_gate)
-            self._update_exchange_data(coin, "OKX", state_okx)
-
-            # Update Combined
-            combined_item = self.tree_item_ids[coin].get('COMBINED')
-            if combined_item:
-                tag = self._tag_for_value(state_combined['delta'])
-                self.tree.item(combined_item, values=(coin, 'COMBINED',
-                                                     f"{state_combined['current_vol']:.1f}",
-                                                     f"{state_combined['avg_vol']:.1f}",
-                                                     f"{state_combined['delta']:+.1f}",
-                                                     f"{combined_delta_percent:+.1f}%"), tags=(tag,))
+        """
+        Aktualizuje wyświetlane dane dla widocznych coinów.
+        Tylko odczyt migawki z CombinedAggregator - sumy liczy event loop.
+        """
+        started = time.perf_counter()
+        aggregator = self.aggregator
+        # Jedna referencja na całe odświeżenie - wszystkie wiersze z tej samej publikacji
+        snapshot, version = aggregator.snapshot, aggregator.version
+        if version != self.shown_version:
+            self.shown_version = version
+            for coin in self.visible_coins:
+                rows = snapshot.get(coin)
+                if rows is None:
+                    continue  # brak danych od startu
+                items = self.tree_item_ids[coin]
+                for label, row in zip(_ROW_LABELS, rows):
+                    item = items.get(label)
+                    if item:
+                        self._update_row(item, coin, label, *row)
+            _refresh_seconds.observe(time.perf_counter() - started)
 
         self.root.after(int(REFRESH_RATE * 1000), self.update_display)
 
-    def _update_exchange_data(self, coin: str, exchange: str, state: dict) -> None:
-        """Aktualizuje dane dla jednej giełdy"""
-        total_vol = state["buy_vol"] + state["sell_vol"]
-        delta_percent = (state["delta"] / total_vol * 100) if total_vol > 0 else 0
-        item = self.tree_item_ids[coin].get(exchange)
-        if item:
-            # preserve parity tag (odd/even) and set value tag for coloring
-            existing_tags = list(self.tree.item(item, 'tags') or [])
-            parity_tag = next((t for t in existing_tags if t in ('odd', 'even')), None)
-            value_tag = self._tag_for_value(state['delta'])
-            new_tags = tuple(t for t in (parity_tag, value_tag) if t)
-            self.tree.item(item, values=(coin, exchange,
-                                         f"{state['current_vol']:.1f}",
-                                         f"{state['avg_vol']:.1f}",
-                                         f"{state['delta']:+.1f}",
-                                         f"{delta_percent:+.1f}%"), tags=new_tags)
+    def _update_row(self, item: str, coin: str, exchange: str, current_vol: float,
+                    avg_vol: float, delta: float, delta_percent: float) -> None:
+        """
+        Wysyła do Tk tylko zmiany wiersza.
+        Te same liczby co ostatnio - bez formatowania; te same napisy - bez wywołania Tk;
+        jedna zmieniona komórka - tree.set, więcej zmian - jedno tree.item.
+        """
+        raw = (current_vol, avg_vol, delta, delta_percent)
+        cached = self.row_cache.get(item)
+        if cached is not None and cached[0] == raw:
+            return
+
+        values = (coin, exchange, f"{current_vol:.1f}", f"{avg_vol:.1f}",
+                  f"{delta:+.1f}", f"{delta_percent:+.1f}%")
+        # Parzystość wiersza z cache (kolor tła), kolor wartości z delty
+        tags = (self.row_parity.get(item, 'even'), self._tag_for_value(delta))
+        self.row_cache[item] = (raw, values, tags)
+
+        if cached is not None:
+            old_values, old_tags = cached[1], cached[2]
+            if old_tags == tags:
+                changed = [i for i in range(len(values)) if values[i] != old_values[i]]
+                if not changed:
+                    return
+                if len(changed) == 1:
+                    self.tree.set(item, _COLUMNS[changed[0]], values[changed[0]])
+                    self.tk_updates += 1
+                    return
+
+        self.tree.item(item, values=values, tags=tags)
+        self.tk_updates += 1
 
     @staticmethod
     def _set_delta_color(label: tk.Label, value: float) -> None:
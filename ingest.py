@@ -0,0 +1,238 @@
+"""
+Kolejki odbioru - odczyt z gniazda oddzielony od przetwarzania ramek.
+
+Task połączenia tylko odbiera ramki (ws.recv) i wkłada je do ograniczonej kolejki
+(INGEST_QUEUE_SIZE), a osobna coroutine opróżnia ją partiami (najwyżej
+INGEST_MAX_BATCH ramek bez oddawania pętli) i woła handler. Wolny handler nie
+wstrzymuje już odczytu, a głębokość kolejki pokazuje, o ile przetwarzanie
+zostaje w tyle.
+
+Pełna kolejka - INGEST_OVERFLOW:
+- "coalesce": ramka otwartej świecy (pełny stan) zastępuje oczekującą ramkę tej samej
+  świecy zawsze, nie tylko przy pełnej kolejce; transakcje i zamknięcia - jak "block"
+- "drop_oldest": najstarsza ramka jest odrzucana (zgubiony wolumen, liczone w drops)
+- "block": odczyt czeka na miejsce - TCP spowalnia giełdę, nic nie ginie
+
+Liczniki (głębokość, odrzucone, połączone, partie) raportuje report() co INGEST_REPORT_INTERVAL,
+tylko gdy kolejka zaczęła zostawać w tyle.
+"""
+
+import asyncio
+from collections import deque
+
+from config import (
+    INGEST_MAX_BATCH,
+    INGEST_OVERFLOW,
+    INGEST_QUEUE_SIZE,
+    INGEST_REPORT_INTERVAL,
+)
+from metrics import metrics
+
+POLICIES = ("coalesce", "drop_oldest", "block")
+
+
+class IngestQueue:
+    """
+    Ograniczona kolejka ramek jednego połączenia.
+
+    key(ramka) -> (stream, otwarta) dla ramek kline, None dla pozostałych. Otwarta
+    świeca czeka w kolejce jako slot [ramka, stream] - nowsza otwarta świeca tego
+    streamu podmienia ramkę w slocie (bez zmiany kolejności). Zamknięta świeca
+    zamyka slot, żeby świeca następnej minuty nie wyprzedziła zamknięcia.
+    """
+
+    def __init__(self, name: str, key=None, maxsize: int = INGEST_QUEUE_SIZE,
+                 policy: str = INGEST_OVERFLOW, max_batch: int = INGEST_MAX_BATCH, probe=None):
+        if policy not in POLICIES:
+            raise ValueError(f"INGEST_OVERFLOW: nieznana polityka '{policy}' ({', '.join(POLICIES)})")
+        self.name = name
+        self.key = key if policy == "coalesce" else None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_batch = max_batch
+        self.probe = probe  # metrics.FrameProbe - liczba ramek i pomiary próbkowane
+        # Ramki do następnego pomiaru (przetworzenie / odbiór); bez sondy -1 (nigdy nie dojdzie do zera)
+        self.sample_in = probe.sample_every if probe is not None else -1
+        self.receive_in = self.sample_in
+        self.items = deque()
+        self.slots = {}  # stream -> slot otwartej świecy, który można jeszcze podmienić
+        self.ready = asyncio.Event()
+        self.space = asyncio.Event()
+
+        # Liczniki od startu
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.max_depth = 0  # od ostatniego report()
+
+    # ---------- Odczyt (task połączenia) ----------
+
+    def put(self, frame: bytes) -> bool:
+        """
+        Wkłada ramkę. False = kolejka pełna przy polityce block (albo coalesce dla ramki
+        bez slotu) - wywołujący czeka na wait_space() i ponawia.
+        """
+        items = self.items
+        self.receive_in -= 1
+        if not self.receive_in:
+            self.receive_in = self.probe.sample_every
+            self.probe.received(frame)  # opóźnienie giełda -> odbiór, przed czekaniem w kolejce
+        key = self.key(frame) if self.key is not None else None
+        replaceable = False
+        if key is not None:
+            stream, replaceable = key
+            if replaceable:
+                slot = self.slots.get(stream)
+                if slot is not None:
+                    slot[0] = frame  # nowszy stan tej samej świecy
+                    self.received += 1
+                    self.coalesced += 1
+                    return True
+            else:
+                self.slots.pop(stream, None)
+
+        if len(items) >= self.maxsize:
+            if self.policy != "drop_oldest":
+                self.blocked += 1
+                return False
+            self._release(items.popleft())
+            self.dropped += 1
+
+        if replaceable:
+            slot = [frame, stream]
+            self.slots[stream] = slot
+            items.append(slot)
+        else:
+            items.append(frame)
+        self.received += 1
+        depth = len(items)
+        self.max_depth = max(self.max_depth, depth)
+        self.ready.set()
+        return True
+
+    def _release(self, item) -> bytes:
+        """Ramka z elementu kolejki (slot przestaje przyjmować podmiany)"""
+        if item.__class__ is not list:
+            return item
+        frame, stream = item
+        if self.slots.get(stream) is item:
+            del self.slots[stream]
+        return frame
+
+    async def wait_space(self) -> None:
+        while len(self.items) >= self.maxsize:
+            self.space.clear()
+            await self.space.wait()
+
+    # ---------- Przetwarzanie ----------
+
+    async def drain(self, handler) -> None:
+        """Woła handler(ramka) dla kolejnych ramek - partiami, aż do anulowania"""
+        items = self.items
+        release = self._release
+        probe = self.probe
+        while True:
+            if not items:
+                self.ready.clear()
+                await self.ready.wait()
+
+            count = min(len(items), self.max_batch)
+            sample_in = self.sample_in
+            for _ in range(count):
+                frame = release(items.popleft())
+                # Błąd jednej ramki nie może zatrzymać przetwarzania połączenia
+                try:
+                    sample_in -= 1
+                    if sample_in:
+                        handler(frame)
+                    else:
+                        sample_in = probe.sample_every
+                        probe.measure(handler, frame)
+                except Exception as e:
+                    print(f"⚠️ Pominięto błędną ramkę {self.name}: {e}")
+
+            if probe is not None:
+                self.sample_in = sample_in
+                probe.messages.value += count
+            self.processed += count
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, count)
+            self.space.set()
+            # Oddaj pętlę odczytowi i innym połączeniom przed kolejną partią
+            await asyncio.sleep(0)
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self.items),
+            "max_depth": self.max_depth,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "blocked": self.blocked,
+            "batches": self.batches,
+            "avg_batch": self.processed / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch_seen,
+        }
+
+
+class IngestRegistry:
+    """Wszystkie aktywne kolejki - raport tylko dla tych, które zostają w tyle"""
+
+    def __init__(self, interval: float = INGEST_REPORT_INTERVAL):
+        self.interval = interval
+        self.queues = []
+        self.reported = {}  # kolejka -> (dropped, coalesced, blocked) z poprzedniego raportu
+
+    def create(self, name: str, key=None, **kwargs) -> IngestQueue:
+        ingest = IngestQueue(name, key, **kwargs)
+        self.queues.append(ingest)
+        # Odczyt przy renderowaniu /metrics - bez kosztu na ramkę
+        metrics.gauge("spike_ingest_queue_depth", "Ramki czekające na przetworzenie",
+                      lambda: len(ingest.items), queue=name)
+        metrics.gauge("spike_ingest_dropped_total", "Ramki odrzucone przy pełnej kolejce",
+                      lambda: ingest.dropped, kind="counter", queue=name)
+        metrics.gauge("spike_ingest_coalesced_total", "Ramki otwartej świecy zastąpione nowszą",
+                      lambda: ingest.coalesced, kind="counter", queue=name)
+        return ingest
+
+    def remove(self, ingest: IngestQueue) -> None:
+        if ingest in self.queues:
+            self.queues.remove(ingest)
+        self.reported.pop(ingest, None)
+
+    def report(self) -> list:
+        """Drukuje kolejki z odrzuceniami/blokadami albo zapełnione ponad połowę od ostatniego raportu"""
+        lines = []
+        for ingest in self.queues:
+            before = self.reported.get(ingest, (0, 0, 0))
+            now = (ingest.dropped, ingest.coalesced, ingest.blocked)
+            self.reported[ingest] = now
+            dropped, coalesced, blocked = (a - b for a, b in zip(now, before))
+            if dropped or blocked or ingest.max_depth * 2 >= ingest.maxsize:
+                stats = ingest.stats()
+                lines.append(
+                    f"📥 Kolejka {ingest.name}: głębokość max {stats['max_depth']}/{ingest.maxsize}, "
+                    f"partie śr {stats['avg_batch']:.1f} max {stats['max_batch']}, "
+                    f"odrzucone {dropped}, połączone {coalesced}, blokady odczytu {blocked}"
+                )
+            ingest.max_depth = len(ingest.items)
+        for line in lines:
+            print(line)
+        return lines
+
+    async def run(self) -> None:
+        if self.interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.interval)
+            self.report()
+
+
+# Wspólny rejestr dla tasków połączeń (raport w main.py)
+ingest_registry = IngestRegistry()
+
@@ -0,0 +1,195 @@
+"""
+Opóźnienia giełda -> odbiór i giełda -> koniec przetwarzania, per giełda i stream.
+
+Czas giełdy z ramki (Binance "T"/"E", Bybit "T"/"ts", Gate.io "create_time_ms",
+OKX "ts") jest porównywany z zegarem lokalnym (clock.now) dwa razy:
+- przy odbiorze - IngestQueue.put, zanim ramka poczeka w kolejce
+- po przetworzeniu - FrameProbe.measure, po handlerze
+Oba pomiary co METRICS_SAMPLE_EVERY ramkę (osobne liczniki, więc zwykle różne ramki).
+
+Histogramy w stylu HDR: kubełki log-liniowe w mikrosekundach (błąd względny
+najwyżej 1/SUB_BUCKETS), stała pamięć, zapis = kilka operacji na liczbach.
+
+Różnica zegarów: najmniejsze opóźnienie odbioru w oknie LATENCY_SKEW_WINDOW
+(kroczące minimum) = przesunięcie zegara hosta względem giełdy + minimalny czas
+sieci. Odbiór powyżej tego minimum to jitter sieci/gniazda, a przetworzenie minus
+odbiór to czas w kolejce i w naszym kodzie.
+
+Zrzut na żądanie: GET /latency na endpoincie metryk, SIGUSR1 (Unix, tryb bez GUI)
+albo latency_registry.dump().
+"""
+
+import signal
+from collections import deque
+
+import clock
+from config import LATENCY_SKEW_SLOTS, LATENCY_SKEW_WINDOW
+from metrics import metrics
+
+SUB_BITS = 7
+SUB_BUCKETS = 1 << (SUB_BITS - 1)  # kubełki na oktawę (64 = błąd < 1.6%)
+MAX_MICROS = 1 << 36  # ~19 h - większe wartości trafiają do ostatniego kubełka
+
+
+def _bucket(micros: int) -> int:
+    """Indeks kubełka: wartości < 2^SUB_BITS dokładnie, wyżej SUB_BUCKETS kubełków na oktawę"""
+    shift = micros.bit_length() - SUB_BITS
+    if shift <= 0:
+        return micros
+    return shift * SUB_BUCKETS + (micros >> shift)
+
+
+def _bucket_high(index: int) -> int:
+    """Największa wartość (µs) w kubełku"""
+    shift = index // SUB_BUCKETS - 1
+    if shift <= 0:
+        return index
+    return ((index - shift * SUB_BUCKETS + 1) << shift) - 1
+
+
+class HdrHistogram:
+    """Histogram log-liniowy wartości w mikrosekundach (ujemne liczone osobno jako 0)"""
+
+    __slots__ = ("count", "counts", "max", "negative", "total")
+
+    def __init__(self):
+        self.counts = [0] * (_bucket(MAX_MICROS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.negative = 0  # zegar lokalny za zegarem giełdy
+
+    def record(self, micros: int) -> None:
+        if micros < 0:
+            self.negative += 1
+            micros = 0
+        elif micros > MAX_MICROS:
+            micros = MAX_MICROS
+        self.counts[_bucket(micros)] += 1
+        self.count += 1
+        self.total += micros
+        self.max = max(self.max, micros)
+
+    def percentile(self, q: float) -> int:
+        """Wartość (µs), poniżej której jest q procent próbek (górna granica kubełka)"""
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * q / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_high(index), self.max)
+        return self.max
+
+
+class SkewEstimator:
+    """Kroczące minimum opóźnienia (s) - okno podzielone na sloty, stary slot wypada w całości"""
+
+    __slots__ = ("slot_seconds", "slots", "window")
+
+    def __init__(self, window: float = LATENCY_SKEW_WINDOW, slots: int = LATENCY_SKEW_SLOTS):
+        self.window = window
+        self.slot_seconds = window / slots
+        self.slots = deque()  # [numer slotu, minimum]
+
+    def observe(self, delay: float, now: float) -> None:
+        slot = int(now // self.slot_seconds)
+        slots = self.slots
+        if slots and slots[-1][0] == slot:
+            slots[-1][1] = min(slots[-1][1], delay)
+            return
+        slots.append([slot, delay])
+        oldest = slot - int(self.window / self.slot_seconds)
+        while slots[0][0] <= oldest:
+            slots.popleft()
+
+    @property
+    def estimate(self) -> float | None:
+        """Najmniejsze opóźnienie w oknie albo None bez próbek"""
+        return min(value for _, value in self.slots) if self.slots else None
+
+
+class StreamLatency:
+    """Histogramy odbioru i przetworzenia oraz różnica zegarów jednego streamu giełdy"""
+
+    __slots__ = ("exchange", "processed", "receive", "skew", "stream")
+
+    def __init__(self, exchange: str, stream: str):
+        self.exchange = exchange
+        self.stream = stream
+        self.receive = HdrHistogram()
+        self.processed = HdrHistogram()
+        self.skew = SkewEstimator()
+
+    def record_receive(self, ts_ms: int) -> None:
+        now = clock.now()
+        delay = now - ts_ms / 1000
+        self.receive.record(int(delay * 1e6))
+        self.skew.observe(delay, now)
+
+    def record_processed(self, ts_ms: int) -> None:
+        self.processed.record(int((clock.now() - ts_ms / 1000) * 1e6))
+
+
+def _ms(micros: int) -> str:
+    return f"{micros / 1000:.1f}"
+
+
+class LatencyRegistry:
+    """Wszystkie streamy (giełda, stream) -> StreamLatency i zrzut tabeli"""
+
+    def __init__(self):
+        self.streams = {}
+
+    def stream(self, exchange: str, stream: str) -> StreamLatency:
+        key = (exchange, stream)
+        latency = self.streams.get(key)
+        if latency is None:
+            latency = self.streams[key] = StreamLatency(exchange, stream)
+            metrics.gauge("spike_clock_skew_seconds",
+                          "Najmniejsze opóźnienie odbioru w oknie (zegar hosta - giełda + sieć)",
+                          lambda: latency.skew.estimate or 0.0, exchange=exchange, stream=stream)
+        return latency
+
+    def dump(self) -> str:
+        """Tabela percentyli (ms) dla wszystkich streamów z próbkami"""
+        lines = [f"⏱️ Opóźnienia giełda -> odbiór / przetworzenie (ms), okno zegara {LATENCY_SKEW_WINDOW:g} s"]
+        for (exchange, stream), latency in sorted(self.streams.items()):
+            receive, processed = latency.receive, latency.processed
+            if not receive.count and not processed.count:
+                continue
+            skew = latency.skew.estimate
+            code = processed.percentile(50) - receive.percentile(50)
+            lines.append(
+                f"{exchange:<8} {stream:<12} odbiór n={receive.count} "
+                f"p50 {_ms(receive.percentile(50))} p99 {_ms(receive.percentile(99))} "
+                f"p99.9 {_ms(receive.percentile(99.9))} max {_ms(receive.max)} | "
+                f"przetworzenie n={processed.count} p50 {_ms(processed.percentile(50))} "
+                f"p99 {_ms(processed.percentile(99))} max {_ms(processed.max)} | "
+                f"zegar+sieć min {'-' if skew is None else f'{skew * 1000:.1f}'} | "
+                f"kolejka+kod p50 {_ms(code)}"
+                + (f" | ujemne {receive.negative}" if receive.negative else "")
+            )
+        if len(lines) == 1:
+            lines.append("(brak próbek)")
+        return "\n".join(lines) + "\n"
+
+    def print_dump(self) -> None:
+        print(self.dump(), end="")
+
+    def install_signal(self, loop) -> bool:
+        """SIGUSR1 -> zrzut na konsolę (tylko Unix i główny wątek)"""
+        sigusr1 = getattr(signal, "SIGUSR1", None)
+        if sigusr1 is None:
+            return False
+        try:
+            loop.add_signal_handler(sigusr1, self.print_dump)
+        except (NotImplementedError, RuntimeError, ValueError):
+            return False  # pętla w wątku GUI - zostaje /latency
+        return True
+
+
+# Wspólny rejestr (sondy w połączeniach, zrzut w main.py i na /latency)
+latency_registry = LatencyRegistry()
+metrics.pages[b"/latency"] = latency_registry.dump
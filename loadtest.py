@@ -0,0 +1,168 @@
+"""
+Test obciążeniowy: szukanie tempa wiadomości, przy którym aplikacja zaczyna się opóźniać.
+
+mock_exchange.py działa w osobnym procesie (generowanie JSON nie zabiera CPU aplikacji),
+a tutaj uruchamiany jest ten sam potok co w main.py: combined stream Binance
+(+ opcjonalnie Bybit/Gate.io/OKX), AlertScheduler, CombinedAggregator, bez GUI i bez Telegrama.
+Tempo rośnie krokami; na każdym kroku mierzone są:
+- faktycznie wysłane transakcje/s (ws.send mocka czeka, gdy aplikacja nie odbiera)
+- opóźnienie pętli asyncio (o ile później niż planowo budzi się asyncio.sleep)
+
+Krok z p99 opóźnienia pętli > --max-lag = aplikacja nie nadąża (🔴). Wysłane poniżej
+celu przy małym opóźnieniu pętli = limit samego mocka (🟡), nie aplikacji.
+
+    python loadtest.py --rates 20,50,100,200,400 --step 10 --all-exchanges
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+
+
+def _mock_process(port: int, rate, sent, spike_every: float) -> None:
+    """Proces mocka: tempo czytane ze wspólnej wartości, licznik wysłanych transakcji"""
+    from mock_exchange import MockExchange
+
+    async def serve():
+        mock = MockExchange(rate=rate.value, spike_every=spike_every)
+        async with mock.serve("127.0.0.1", port):
+            while True:
+                await asyncio.sleep(0.2)
+                mock.rate = rate.value
+                sent.value = mock.sent_trades
+
+    asyncio.run(serve())
+
+
+class AlertCounter:
+    """Odbiornik alertów zamiast Telegrama"""
+
+    def __init__(self):
+        self.count = 0
+
+    def enqueue(self, message: str) -> bool:
+        self.count += 1
+        return True
+
+
+async def _run(args, mock, rate, sent) -> list:
+    # Import po ustawieniu *_WS_URL - config czyta je przy imporcie
+    from aggregator import CombinedAggregator
+    from alerts import AlertScheduler
+    from config import COINS, initialize_states
+    from event_loop import LoopLagMonitor
+    from subscriptions import create_subscription_managers
+    from websockets_tasks import (
+        build_binance_routes,
+        combined_task_binance,
+        split_binance_streams,
+    )
+
+    coins = list(COINS)[:args.coins]
+    states = initialize_states()
+    alerts = AlertCounter()
+    aggregator = CombinedAggregator(states)
+    scheduler = AlertScheduler(states, set(), sender=alerts, aggregator=aggregator)
+
+    routes = build_binance_routes(coins, states)
+    tasks = [asyncio.create_task(scheduler.run()), asyncio.create_task(aggregator.run())]
+    for streams in split_binance_streams(list(routes)):
+        tasks.append(asyncio.create_task(combined_task_binance(streams, routes, scheduler)))
+
+    managers = create_subscription_managers(states, aggregator) if args.all_exchanges else []
+    for manager in managers:
+        for coin in coins:
+            await manager.subscribe(coin)
+
+    exchanges = 1 + len(managers)
+    monitor = LoopLagMonitor(interval=0.01, report_interval=0)
+    tasks.append(asyncio.create_task(monitor.run()))
+    results = []
+
+    try:
+        for step_rate in args.rates:
+            rate.value = step_rate
+            await asyncio.sleep(1.0)  # rozpędzenie mocka do nowego tempa
+            monitor.samples.clear()
+            sent_before, alerts_before = sent.value, alerts.count
+            started = time.monotonic()
+            await asyncio.sleep(args.step)
+            elapsed = time.monotonic() - started
+
+            target = step_rate * len(coins) * exchanges
+            achieved = (sent.value - sent_before) / elapsed
+            lag = monitor.percentiles() or {"p50": 0.0, "p99": 0.0, "max": 0.0}
+            p99 = lag["p99"]
+            lagging = p99 > args.max_lag
+            mock_limited = not lagging and achieved < target * 0.95
+            results.append((target, achieved, lag["p50"], p99, lag["max"],
+                            alerts.count - alerts_before, lagging))
+            marker = "🔴" if lagging else "🟡" if mock_limited else "🟢"
+            print(f"{marker} cel {target:>9,.0f}/s  wysłane {achieved:>9,.0f}/s  "
+                  f"lag pętli p50 {lag['p50'] * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  "
+                  f"max {lag['max'] * 1000:6.1f} ms  alerty {results[-1][5]}")
+    finally:
+        # Najpierw mock - zerwane połączenia zamykają się od razu, bez czekania na close_timeout
+        mock.terminate()
+        for manager in managers:
+            await manager.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Test obciążeniowy na lokalnym mocku giełd")
+    parser.add_argument("--rates", default="20,50,100,200,400,800",
+                        help="tempa kroków: transakcje/s na symbol i giełdę")
+    parser.add_argument("--step", type=float, default=10.0, help="długość kroku (s)")
+    parser.add_argument("--coins", type=int, default=20)
+    parser.add_argument("--all-exchanges", action="store_true", help="także Bybit/Gate.io/OKX")
+    parser.add_argument("--spike-every", type=float, default=0.0)
+    parser.add_argument("--max-lag", type=float, default=0.05,
+                        help="p99 opóźnienia pętli (s), powyżej którego krok = opóźnienie")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    args.rates = [float(r) for r in args.rates.split(",")]
+
+    base = f"ws://127.0.0.1:{args.port}"
+    os.environ.update({
+        "BINANCE_WS_URL": f"{base}/ws/",
+        "BINANCE_COMBINED_WS_URL": f"{base}/stream?streams=",
+        "BYBIT_WS_URL": f"{base}/v5/public/linear",
+        "GATE_WS_URL": f"{base}/v4/ws/usdt",
+        "OKX_WS_URL": f"{base}/ws/v5/public",
+    })
+
+    ctx = multiprocessing.get_context("spawn")
+    rate = ctx.Value("d", args.rates[0], lock=False)
+    sent = ctx.Value("q", 0, lock=False)
+    mock = ctx.Process(target=_mock_process, args=(args.port, rate, sent, args.spike_every),
+                       daemon=True)
+    mock.start()
+    time.sleep(1.0)
+
+    # Import po ustawieniu *_WS_URL (config); EVENT_LOOP=uvloop - porównanie pętli
+    import event_loop
+
+    print(f"🔁 Event loop: {event_loop.LOOP}")
+    try:
+        results = event_loop.run(_run(args, mock, rate, sent))
+    finally:
+        mock.terminate()
+
+    lagging = [r for r in results if r[-1]]
+    if lagging:
+        ok = [r for r in results if not r[-1] and r[0] < lagging[0][0]]
+        last_ok = f"{ok[-1][0]:,.0f}" if ok else "-"
+        print(f"📉 Opóźnienie od ~{lagging[0][0]:,.0f} wiadomości/s (ostatnie bez opóźnień: {last_ok})")
+    else:
+        print("✅ Brak opóźnień w całym zakresie - zwiększ --rates")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,111 +1,374 @@
 """
-Główny plik - zarządzanie event loop, WebSocket takami, GUI i uruchamianie aplikacji
+Główny plik - zarządzanie event loop, WebSocket takami, GUI i uruchamianie aplikacji.
+
+Tryb --headless (serwer bez wyświetlacza, same alerty Telegram): event loop w głównym
+wątku, bez importu Tkinter, coiny dla Bybit/Gate.io/OKX z --coins lub HEADLESS_EXCHANGE_COINS,
+czyste zamknięcie po SIGTERM/SIGINT.
+
+Tryb --workers N (albo SHARD_WORKERS): połączenia i dekodowanie w N procesach
+roboczych (sharding.py), ten proces tylko alerty, GUI i checkpointy.
+
+Lista coinów z COINS_FILE jest przeładowywana w trakcie działania (watch_coins) -
+dodany coin dostaje własne połączenie Binance, usunięty jest odsubskrybowany
+wszędzie. W trybie wieloprocesowym zmiana listy wymaga restartu.
 """
 
+import argparse
 import asyncio
+import os
+import signal
 import threading
-import tkinter as tk
 
-from config import COINS, initialize_states
+import clock
+import event_loop
+from aggregator import CombinedAggregator
+from alert_engine import AlertEngine
+from alerts import AlertScheduler, telegram_sender
+from candles import candle_store, seed_baselines
+from checkpoint import Checkpointer
+from config import (
+    ALERT_VECTORIZED,
+    BINANCE_COMBINED_STREAMS,
+    CANDLE_DIR,
+    COINS,
+    COINS_FILE,
+    COINS_RELOAD_INTERVAL,
+    HEADLESS_EXCHANGE_COINS,
+    HEADLESS_SHUTDOWN_TIMEOUT,
+    SHARD_WORKERS,
+    initialize_states,
+)
+from event_loop import lag_monitor
+from ingest import ingest_registry
+from latency import latency_registry
+from metrics import metrics
+from recorder import recorder
+from sharding import ShardedIngest
+from subscriptions import create_subscription_managers
+from timeframes import timeframes
+from universe import load_specs
 from websockets_tasks import (
-    kline_task_binance, aggtrade_task_binance,
-    kline_task_bybit, trade_task_bybit,
-    trades_task_gate,
-    trade_task_okx
+    aggtrade_task_binance,
+    build_binance_routes,
+    combined_task_binance,
+    kline_task_binance,
+    split_binance_streams,
 )
-from gui import CryptoMonitorGUI
-
 
 # ======================== GLOBALNE ZMIENNE ========================
 states = initialize_states()
 sent_alerts = set()
+aggregator = CombinedAggregator(states)
+engine = AlertEngine(states, ()) if ALERT_VECTORIZED else None
+if engine is not None:
+    # Wiersze silnika dla każdego tworzonego stanu coina (CoinStates jest leniwy)
+    states.listeners.append(lambda coin, _: engine.add_coin(coin))
+alert_scheduler = AlertScheduler(
+    states, sent_alerts, engine=engine, aggregator=aggregator, frames=timeframes,
+)
+checkpointer = Checkpointer(states, sent_alerts)
 active_other_exchanges = set()
-other_exchange_tasks = {}
+# Routing każdego połączenia combined osobno (stream -> route, patrz build_binance_routes) -
+# ponownie dodany coin nie trafia do routingu starego połączenia, które wciąż ma jego streamy
+binance_connections = []
+binance_tasks = {}  # coin -> taski Binance uruchomione osobno dla coina
+subscription_managers = create_subscription_managers(states, aggregator)
+shards = None  # ShardedIngest w trybie wieloprocesowym
 loop = None
 
 
 # ======================== ZARZĄDZANIE TASKAMI (INNE GIEŁDY) ========================
 
 async def start_other_exchanges(coin: str) -> None:
-    """Uruchamia monitoring na 3 dodatkowych giełdach dla danego coina"""
-    global other_exchange_tasks
-
-    if coin in other_exchange_tasks:
+    """Subskrybuje dany coin na 3 dodatkowych giełdach (wspólne połączenia)"""
+    if coin in active_other_exchanges:
         return  # Już uruchomione
 
     print(f"🚀 Uruchamiam monitoring 3 giełd dla {coin}")
-
-    tasks = [
-        asyncio.create_task(kline_task_bybit(coin, states, active_other_exchanges)),
-        asyncio.create_task(trade_task_bybit(coin, states, active_other_exchanges)),
-        asyncio.create_task(trades_task_gate(coin, states, active_other_exchanges)),
-        asyncio.create_task(trade_task_okx(coin, states, active_other_exchanges))
-    ]
-
-    other_exchange_tasks[coin] = tasks
     active_other_exchanges.add(coin)
 
+    if shards is not None:
+        shards.subscribe(coin)
+        return
+    for manager in subscription_managers:
+        await manager.subscribe(coin)
 
-async def stop_other_exchanges(coin: str) -> None:
-    """Zatrzymuje monitoring na 3 dodatkowych giełdach dla danego coina"""
-    global other_exchange_tasks
 
-    if coin not in other_exchange_tasks:
+async def stop_other_exchanges(coin: str) -> None:
+    """Odsubskrybowuje dany coin na 3 dodatkowych giełdach (połączenia zostają otwarte)"""
+    if coin not in active_other_exchanges:
         return  # Nie uruchomione
 
     print(f"🛑 Zatrzymuję monitoring 3 giełd dla {coin}")
-
-    # Usuń z aktywnych
     active_other_exchanges.discard(coin)
 
-    # Anuluj taski
-    for task in other_exchange_tasks[coin]:
+    if shards is not None:
+        shards.unsubscribe(coin)
+        return
+    for manager in subscription_managers:
+        await manager.unsubscribe(coin)
+
+
+# ======================== LISTA COINÓW W TRAKCIE DZIAŁANIA ========================
+
+def start_binance(coin: str) -> None:
+    """Osobne połączenie Binance dla coina (dodanego w trakcie działania albo bez combined)"""
+    if BINANCE_COMBINED_STREAMS:
+        routes = build_binance_routes([coin], states)
+        binance_connections.append(routes)
+        binance_tasks[coin] = [asyncio.create_task(
+            combined_task_binance(list(routes), routes, alert_scheduler))]
+    else:
+        binance_tasks[coin] = [
+            asyncio.create_task(kline_task_binance(coin, states, alert_scheduler)),
+            asyncio.create_task(aggtrade_task_binance(coin, states, alert_scheduler)),
+        ]
+
+
+def stop_binance(coin: str) -> None:
+    """
+    Zamyka taski coina; we wspólnych połączeniach streamy coina znikają z ich
+    routingu - ramki są pomijane od razu, a subskrypcja znika przy ponownym połączeniu.
+    """
+    for routes in binance_connections:
+        for stream in [stream for stream, route in routes.items() if route[1] == coin]:
+            del routes[stream]
+    binance_connections[:] = [routes for routes in binance_connections if routes]
+    for task in binance_tasks.pop(coin, ()):
         task.cancel()
 
-    # Poczekaj na zakończenie tasków
-    await asyncio.gather(*other_exchange_tasks[coin], return_exceptions=True)
-    del other_exchange_tasks[coin]
+
+def add_coin(coin: str, spec: dict) -> None:
+    """Dodaje coin do listy; z symbolem Binance od razu zbiera dane"""
+    COINS.add(coin, spec)
+    print(f"➕ Nowy coin: {coin}")
+    if spec.get("binance"):
+        start_binance(coin)
+
+
+async def remove_coin(coin: str) -> None:
+    """Usuwa coin ze wszystkich giełd, alertów i migawki; jego id wraca do COINS"""
+    await stop_other_exchanges(coin)
+    stop_binance(coin)
+    if engine is not None:
+        engine.remove_coin(coin)
+    aggregator.remove(coin)
+    alert_scheduler.remove(coin)
+    coin_state = states.pop(coin, None)
+    if coin_state is not None:
+        timeframes.remove(coin_state)
+        candle_store.remove(coin_state)
+    COINS.remove(coin)
+    print(f"➖ Usunięty coin: {coin}")
+
+
+async def apply_coins(specs: dict) -> None:
+    """Doprowadza COINS do nowej listy (zmieniony wpis = usunięcie i ponowne dodanie)"""
+    added, removed = COINS.diff(specs)
+    if not added and not removed:
+        return
+    if shards is not None:
+        print("⚠️ Tryb wieloprocesowy: zmiana listy coinów wymaga restartu")
+        return
+    for coin in removed:
+        await remove_coin(coin)
+    for coin in added:
+        add_coin(coin, specs[coin])
+
+
+async def watch_coins(path: str = COINS_FILE, interval: float = COINS_RELOAD_INTERVAL) -> None:
+    """Przeładowuje listę coinów po zmianie pliku (czas modyfikacji co `interval` s)"""
+    if interval <= 0:
+        return
+    mtime = os.path.getmtime(path)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            current = os.path.getmtime(path)
+            if current == mtime:
+                continue
+            mtime = current
+            await apply_coins(load_specs(path))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Nie wczytano listy coinów {path}: {e}")
 
 
 # ======================== ASYNCIO EVENT LOOP (BINANCE ZAWSZE) ========================
 
-async def run_websockets() -> None:
+async def run_websockets(headless: bool = False, workers: int = SHARD_WORKERS) -> None:
     """
     Główna coroutine - uruchamia wszystkie Binance taski (zawsze aktywne).
     Pozostałe giełdy są uruchamiane na żądanie w start_other_exchanges().
+    Bez GUI nie ma kto czytać migawek - agregator nie jest uruchamiany.
+    Z workers > 0 połączenia działają w procesach roboczych (ShardedIngest).
     """
-    global loop
+    global loop, shards
     loop = asyncio.get_running_loop()
-
-    tasks = []
-
-    print("🚀 Uruchamiam monitorowanie...")
+    latency_registry.install_signal(loop)  # kill -USR1 <pid> -> zrzut opóźnień giełd
+
+    # Stany coinów z Binance od razu (zawsze zbierane); pozostałe przy pierwszej subskrypcji
+    binance_coins = COINS.listed("binance")
+    if not workers:
+        states.create(binance_coins)
+
+    # Ciepły restart - stan z checkpointu przed pierwszą ramką,
+    # a bez świeżego checkpointu średnie z historii świec na dysku
+    if not checkpointer.restore() and CANDLE_DIR and not workers:
+        seeded = seed_baselines(states, CANDLE_DIR, clock.now())
+        if seeded:
+            print(f"🕯️ Średnie wolumenu z historii świec: {seeded} stanów bez rozgrzewki")
+
+    tasks = [telegram_sender.run(), alert_scheduler.run(), checkpointer.run(), lag_monitor.run(),
+             ingest_registry.run(), metrics.serve(), watch_coins()]
+    if not headless:
+        tasks.append(aggregator.run())
+
+    if workers:
+        # Zamknięcia minut i ramki widzą tylko procesy robocze
+        print("⚠️ Tryb wieloprocesowy: bez nagrywania ramek, historii świec i wyższych interwałów")
+    else:
+        candle_store.start(states)
+        timeframes.start(states)
+        recorder.start()
+
+    print(f"🚀 Uruchamiam monitorowanie... (event loop: {event_loop.LOOP})")
     print(f"📈 Monitorowane kryptowaluty: {len(COINS)} coinów")
-    print("✅ Binance: ZAWSZE aktywne dla wszystkich coinów (w tle)")
-    print("⚡ Pozostałe giełdy: aktywowane przez zaznaczenie w GUI")
-    print("👁️ GUI: początkowo czysty ekran - zaznacz coiny aby je zobaczyć")
+    print(f"✅ Binance: ZAWSZE aktywne dla {len(binance_coins)} coinów (w tle)")
+    if headless:
+        print("🖥️ Tryb bez GUI: pozostałe giełdy według --coins / HEADLESS_EXCHANGE_COINS")
+    else:
+        print("⚡ Pozostałe giełdy: aktywowane przez zaznaczenie w GUI")
+        print("👁️ GUI: początkowo czysty ekran - zaznacz coiny aby je zobaczyć")
     print("⏳ Zbieranie danych historycznych Binance...")
 
     # Uruchom TYLKO taski Binance dla wszystkich coinów
-    for coin in COINS:
-        tasks.append(kline_task_binance(coin, states, sent_alerts))
-        tasks.append(aggtrade_task_binance(coin, states, sent_alerts))
+    if workers:
+        shards = ShardedIngest(states, alert_scheduler, workers, coins=list(COINS))
+        shards.start()
+        tasks.append(shards.run())
+    elif BINANCE_COMBINED_STREAMS:
+        routes = build_binance_routes(binance_coins, states)
+        groups = split_binance_streams(list(routes))
+        print(f"🔗 Binance combined stream: {len(routes)} streamów w {len(groups)} połączeniach")
+        for streams in groups:
+            connection = {stream: routes[stream] for stream in streams}
+            binance_connections.append(connection)
+            tasks.append(combined_task_binance(streams, connection, alert_scheduler))
+    else:
+        for coin in binance_coins:
+            start_binance(coin)
+
+    try:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for coin_tasks in binance_tasks.values():
+            for task in coin_tasks:
+                task.cancel()
+        if shards is not None:
+            shards.stop()
+        checkpointer.save()
+        telegram_sender.close()
+        recorder.close()
+        candle_store.stop()
+
+
+async def save_checkpoint() -> None:
+    """Zapis checkpointu w event loop (wołane z wątku GUI przy zamykaniu okna)"""
+    checkpointer.save()
+
+
+def run_asyncio(workers: int = SHARD_WORKERS) -> None:
+    """Uruchamia event loop w osobnym wątku"""
+    event_loop.run(run_websockets(workers=workers))
 
-    await asyncio.gather(*tasks, return_exceptions=True)
 
+# ======================== TRYB BEZ GUI ========================
 
-def run_asyncio() -> None:
-    """Uruchamia event loop w osobnym wątku"""
-    asyncio.run(run_websockets())
+def parse_coins(value: str) -> list:
+    """Lista coinów z "BTC,ETH" ("all" = wszystkie); nieznany coin -> ValueError"""
+    names = [name.strip().upper() for name in value.split(",") if name.strip()]
+    if names == ["ALL"]:
+        return list(COINS)
+    unknown = [name for name in names if name not in COINS]
+    if unknown:
+        raise ValueError(f"Nieznane coiny: {', '.join(unknown)}")
+    return names
+
+
+async def run_headless(coins: list, workers: int = SHARD_WORKERS) -> None:
+    """
+    Potok danych i alertów w event loop głównego wątku, bez Tkinter.
+    SIGTERM/SIGINT: zamknięcie połączeń, dosłanie alertów z kolejki
+    (najwyżej HEADLESS_SHUTDOWN_TIMEOUT s), zamknięcie nagrywania.
+    """
+    stop = asyncio.Event()
+    running = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            running.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass  # Windows - zostaje KeyboardInterrupt
+
+    main_task = asyncio.create_task(run_websockets(headless=True, workers=workers))
+    await asyncio.sleep(0)  # start Binance i nagrywania przed subskrypcjami
+    for coin in coins:
+        await start_other_exchanges(coin)
+
+    stop_task = asyncio.create_task(stop.wait())
+    await asyncio.wait((main_task, stop_task), return_when=asyncio.FIRST_COMPLETED)
+    stop_task.cancel()
+    print("🛑 Zamykanie...")
+
+    for manager in subscription_managers:
+        await manager.close()
+    try:
+        await asyncio.wait_for(telegram_sender.queue.join(), HEADLESS_SHUTDOWN_TIMEOUT)
+    except TimeoutError:
+        print(f"⚠️ Niewysłane alerty przy zamknięciu: {telegram_sender.queue.qsize()}")
+
+    main_task.cancel()
+    await asyncio.gather(main_task, return_exceptions=True)
+    latency_registry.print_dump()
+    print("👋 Zatrzymano")
 
 
 # ======================== URUCHOMIENIE APLIKACJI ========================
 
 def main() -> None:
-    """Główna funkcja - uruchamia WebSockety i GUI"""
+    """Główna funkcja - uruchamia WebSockety i GUI (albo odtwarzanie nagrania)"""
+    parser = argparse.ArgumentParser(description="Spike Volume - monitor skoków wolumenu")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="odtwórz nagranie (katalog lub plik *.frames.gz) zamiast łączyć z giełdami")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="tempo odtwarzania: 0 = najszybciej, 1 = czas rzeczywisty")
+    parser.add_argument("--headless", action="store_true",
+                        help="bez GUI - tylko zbieranie danych i alerty Telegram")
+    parser.add_argument("--coins", default=HEADLESS_EXCHANGE_COINS,
+                        help='z --headless: coiny także na Bybit/Gate.io/OKX, np. "BTC,ETH" albo "all"')
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS,
+                        help="liczba procesów roboczych z częścią coinów (0 = jeden proces)")
+    args = parser.parse_args()
+
+    if args.replay:
+        from replay import run_replay
+        run_replay(args.replay, args.speed)
+        return
+
+    if args.headless:
+        try:
+            coins = parse_coins(args.coins)
+        except ValueError as e:
+            parser.error(str(e))
+        event_loop.run(run_headless(coins, args.workers))
+        return
+
+    # GUI importowane dopiero tutaj - tryb bez GUI nie ładuje Tkinter
+    import tkinter as tk
+
+    from gui import CryptoMonitorGUI
 
     # Uruchom WebSockety w osobnym wątku
-    ws_thread = threading.Thread(target=run_asyncio, daemon=True)
+    ws_thread = threading.Thread(target=run_asyncio, args=(args.workers,), daemon=True)
     ws_thread.start()
 
     # Czekaj aż loop się inicjalizuje
@@ -119,11 +382,16 @@ def main() -> None:
         loop,
         states,
         start_callback=start_other_exchanges,
-        stop_callback=stop_other_exchanges
+        stop_callback=stop_other_exchanges,
+        aggregator=aggregator,
     )
     app.update_display()
     root.mainloop()
 
+    # Okno zamknięte - wątek event loop znika razem z procesem, więc ostatni checkpoint teraz
+    if checkpointer.enabled:
+        asyncio.run_coroutine_threadsafe(save_checkpoint(), loop).result(timeout=5)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,239 @@
+"""
+Metryki procesu - liczniki i histogramy w pamięci, endpoint HTTP w formacie Prometheus.
+
+Instrumentacja jest zawsze włączona, więc musi być tania:
+- liczniki i histogramy są tworzone raz (przy budowie routingu / połączenia) i trzymane
+  przez kod jako obiekty - na ramkę tylko `counter.value += 1`, bez słowników i etykiet
+- czasy parsowania i handlera oraz opóźnienie giełdy mierzy FrameProbe co
+  METRICS_SAMPLE_EVERY ramkę (pozostałe ramki tylko zmniejszają licznik)
+- tekst Prometheus powstaje dopiero przy odczycie /metrics
+Ten sam endpoint serwuje dodatkowe strony tekstowe z `pages` (np. /latency z latency.py).
+
+Endpoint (METRICS_PORT > 0) działa w event loop i słucha na METRICS_HOST
+(domyślnie tylko lokalnie - bez autoryzacji):
+    curl -s localhost:9108/metrics | grep spike_
+W trybie wieloprocesowym metryki ramek zbierają procesy robocze - endpoint procesu
+głównego pokazuje tylko alerty, GUI i pętlę.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+
+import clock
+from config import METRICS_HOST, METRICS_PORT, METRICS_SAMPLE_EVERY
+
+# Granice kubełków (sekundy)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DURATION_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 0.025, 0.1)
+
+
+class Counter:
+    """Licznik rosnący - kod trzyma obiekt i zwiększa value bezpośrednio"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """Wartość odczytywana dopiero przy renderowaniu (funkcja bez argumentów)"""
+
+    __slots__ = ("read",)
+
+    def __init__(self, read):
+        self.read = read
+
+    @property
+    def value(self) -> float:
+        return self.read()
+
+
+class Histogram:
+    """Histogram o stałych kubełkach (le = granica włącznie, ostatni = +Inf)"""
+
+    __slots__ = ("bounds", "count", "counts", "sum")
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Rodziny metryk: nazwa -> (typ, opis, {etykiety: metryka})"""
+
+    def __init__(self):
+        self.families = {}
+        self.pages = {b"/metrics": self.render}  # ścieżka -> funkcja zwracająca tekst
+
+    def _metric(self, kind: str, name: str, help_text: str, labels: dict, create):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = (kind, help_text, {})
+        elif family[0] != kind:
+            raise ValueError(f"Metryka {name} jest typu {family[0]}, nie {kind}")
+        key = tuple(sorted(labels.items()))
+        metric = family[2].get(key)
+        if metric is None:
+            metric = family[2][key] = create()
+        return metric
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        """Licznik o danych etykietach (ten sam obiekt przy kolejnym wywołaniu)"""
+        return self._metric("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS,
+                  **labels) -> Histogram:
+        return self._metric("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name: str, help_text: str, read, kind: str = "gauge", **labels) -> Gauge:
+        """
+        Wartość z funkcji read() (ponowna rejestracja podmienia funkcję).
+        kind="counter" dla liczników prowadzonych przez sam obiekt (np. IngestQueue.dropped).
+        """
+        gauge = self._metric(kind, name, help_text, labels, lambda: Gauge(read))
+        gauge.read = read
+        return gauge
+
+    def render(self) -> str:
+        """Wszystkie metryki w formacie tekstowym Prometheus (0.0.4)"""
+        lines = []
+        for name, (kind, help_text, metrics) in sorted(self.families.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in sorted(metrics.items()):
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*metric.bounds, "+Inf"), metric.counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum!r}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    # ---------- Endpoint HTTP ----------
+
+    async def _handle(self, reader, writer) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5.0)
+            while (await asyncio.wait_for(reader.readline(), 5.0)) not in (b"\r\n", b"\n", b""):
+                pass  # nagłówki żądania są pomijane
+            parts = request.split()
+            page = self.pages.get(parts[1].split(b"?")[0]) if len(parts) >= 2 and parts[0] == b"GET" else None
+            if page is not None:
+                status, body = "200 OK", page().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (OSError, TimeoutError):
+            pass  # klient rozłączył się albo nie wysłał żądania
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = METRICS_HOST, port: int = METRICS_PORT) -> None:
+        """Endpoint /metrics do anulowania taska (port 0 = wyłączony)"""
+        if not port:
+            return
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f"📊 Metryki: http://{host}:{port}/metrics")
+        async with server:
+            await server.serve_forever()
+
+
+class FrameProbe:
+    """
+    Metryki ramek jednego połączenia. IngestQueue woła co sample_every ramkę:
+    - received() przy odbiorze - opóźnienie giełda -> odbiór (latency.py)
+    - measure() zamiast handlera - czas handlera (z parsowaniem), czas samego parsowania
+      (ten sam dekoder ponownie) i opóźnienie giełda -> koniec przetwarzania
+
+    stamp(ramka) -> (stream, czas giełdy w ms albo None) albo None dla ramek bez danych.
+    latency - latency.LatencyRegistry dla histogramów per stream (None = tylko Prometheus).
+    """
+
+    __slots__ = ("exchange", "exchange_latency", "handler_seconds", "latency", "messages", "parse",
+                 "parse_seconds", "sample_every", "stamp", "streams")
+
+    def __init__(self, exchange: str, parse=None, stamp=None,
+                 sample_every: int = METRICS_SAMPLE_EVERY, registry=None, latency=None):
+        registry = registry or metrics
+        self.exchange = exchange
+        self.parse = parse
+        self.stamp = stamp
+        self.latency = latency
+        self.streams = {}  # stream -> latency.StreamLatency
+        self.sample_every = sample_every
+        self.messages = registry.counter(
+            "spike_frames_total", "Ramki odebrane z giełdy", exchange=exchange)
+        self.handler_seconds = registry.histogram(
+            "spike_handler_seconds", "Czas przetworzenia ramki z parsowaniem (próbkowany)",
+            DURATION_BUCKETS, exchange=exchange)
+        self.parse_seconds = registry.histogram(
+            "spike_parse_seconds", "Czas dekodowania JSON ramki (próbkowany)",
+            DURATION_BUCKETS, exchange=exchange)
+        self.exchange_latency = registry.histogram(
+            "spike_exchange_latency_seconds",
+            "Czas giełdy w ramce -> koniec przetwarzania (próbkowany, zawiera różnicę zegarów)",
+            LATENCY_BUCKETS, exchange=exchange)
+
+    def measure(self, handler, frame: bytes) -> None:
+        perf_counter = time.perf_counter
+        started = perf_counter()
+        handler(frame)
+        handled = perf_counter()
+        self.handler_seconds.observe(handled - started)
+        if self.parse is not None:
+            self.parse(frame)
+            self.parse_seconds.observe(perf_counter() - handled)
+        stamped = self.stamp(frame) if self.stamp is not None else None
+        if stamped is not None and stamped[1]:
+            stream, ts = stamped
+            self.exchange_latency.observe(clock.now() - ts / 1000)
+            if self.latency is not None:
+                self._stream(stream).record_processed(ts)
+
+    def received(self, frame: bytes) -> None:
+        if self.latency is None or self.stamp is None:
+            return
+        stamped = self.stamp(frame)
+        if stamped is not None and stamped[1]:
+            self._stream(stamped[0]).record_receive(stamped[1])
+
+    def _stream(self, stream: str):
+        latency = self.streams.get(stream)
+        if latency is None:
+            latency = self.streams[stream] = self.latency.stream(self.exchange, stream)
+        return latency
+
+
+# Wspólny rejestr procesu (endpoint w main.py)
+metrics = MetricsRegistry()
@@ -0,0 +1,401 @@
+"""
+Lokalny zamiennik giełd do testów obciążeniowych (bez połączeń z Binance/Bybit/Gate.io/OKX).
+
+Jeden serwer WebSocket obsługuje ścieżki prawdziwych giełd, z tym samym kształtem wiadomości
+co czytają websockets_tasks.py / subscriptions.py:
+    /ws/<symbol>@aggTrade, /ws/<symbol>@kline_1m, /stream?streams=...  - Binance (+ SUBSCRIBE)
+    /v5/public/linear                                                  - Bybit (kline, publicTrade)
+    /v4/ws/usdt                                                        - Gate.io (futures.trades)
+    /ws/v5/public                                                      - OKX (trades)
+
+Aplikację kieruje się na serwer zmiennymi środowiskowymi *_WS_URL (patrz config.py):
+    python mock_exchange.py --port 8765 --rate 200 --spike-every 120
+    BINANCE_WS_URL=ws://127.0.0.1:8765/ws/ BINANCE_COMBINED_WS_URL=ws://127.0.0.1:8765/stream?streams= \\
+    BYBIT_WS_URL=ws://127.0.0.1:8765/v5/public/linear GATE_WS_URL=ws://127.0.0.1:8765/v4/ws/usdt \\
+    OKX_WS_URL=ws://127.0.0.1:8765/ws/v5/public python main.py
+
+Ruch: `rate` transakcji/s na symbol, co `spike_every` s skok x`spike_multiplier` przez
+`spike_seconds` s z przewagą kupujących (spike_buy_ratio) - wyzwala alerty.
+ws.send czeka gdy klient nie nadąża odbierać, więc sent_trades/s poniżej zadanego
+tempa oznacza, że aplikacja nie nadąża (patrz loadtest.py).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from websockets.asyncio.server import serve
+
+from config import COINS, TF_BINANCE, TF_BYBIT
+
+_BY_SYMBOL = {}  # symbol giełdy -> coin (do wielkości kontraktów Gate/OKX)
+for _coin, _info in COINS.items():
+    for _exchange in ("binance", "bybit", "gate", "okx"):
+        if _info.get(_exchange):
+            _BY_SYMBOL[_info[_exchange]] = _coin
+
+
+class _Market:
+    """Syntetyczny rynek jednego symbolu: cena (błądzenie losowe) i bieżąca świeca"""
+
+    __slots__ = ("candle", "carry", "close", "high", "low", "open", "trade_id", "volume")
+
+    def __init__(self, price: float):
+        self.candle = None
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0.0
+        self.carry = 0.0  # ułamek transakcji przeniesiony na kolejny tick
+        self.trade_id = 0
+
+    def roll(self, candle: int):
+        """Nowa świeca; zwraca (open, high, low, close, volume) zamkniętej albo None"""
+        if candle == self.candle:
+            return None
+        closed = None
+        if self.candle is not None:
+            closed = (self.open, self.high, self.low, self.close, self.volume)
+        self.candle = candle
+        self.open = self.high = self.low = self.close
+        self.volume = 0.0
+        return closed
+
+    def trades(self, count: int, ts: int, buy_ratio: float, rng: random.Random) -> list:
+        """[(ts, qty, is_sell, price), ...] - aktualizuje cenę i wolumen świecy"""
+        out = []
+        for _ in range(count):
+            is_sell = rng.random() >= buy_ratio
+            self.close *= 1.0 + (-0.0002 if is_sell else 0.0002) * rng.random()
+            self.high = max(self.high, self.close)
+            self.low = min(self.low, self.close)
+            qty = round(rng.uniform(0.1, 2.0), 3)
+            self.volume += qty
+            self.trade_id += 1
+            out.append((ts, qty, is_sell, self.close))
+        return out
+
+
+class MockExchange:
+    """Serwer WebSocket udający cztery giełdy naraz"""
+
+    def __init__(self, rate: float = 20.0, spike_every: float = 0.0, spike_seconds: float = 10.0,
+                 spike_multiplier: float = 20.0, spike_buy_ratio: float = 0.9,
+                 time_scale: float = 1.0, tick: float = 0.05, kline_interval: float = 0.25,
+                 seed: int | None = None):
+        self.rate = rate
+        self.spike_every = spike_every
+        self.spike_seconds = spike_seconds
+        self.spike_multiplier = spike_multiplier
+        self.spike_buy_ratio = spike_buy_ratio
+        self.time_scale = time_scale  # >1 = szybszy upływ czasu świec (np. 60 = świeca co 1 s)
+        self.tick = tick
+        self.kline_interval = kline_interval
+        self.seed = seed
+        self.started = time.time()
+        self.connections = 0
+        self.sent_frames = 0
+        self.sent_trades = 0
+
+    # ---------- Czas i ruch ----------
+
+    def now_ms(self) -> int:
+        """Czas zdarzeń w ramkach (przyspieszony o time_scale)"""
+        now = time.time()
+        return int((self.started + (now - self.started) * self.time_scale) * 1000)
+
+    def intensity(self) -> tuple:
+        """(mnożnik tempa, odsetek kupujących) - w oknie skoku większe i jednostronne"""
+        if self.spike_every > 0:
+            elapsed = time.time() - self.started
+            if elapsed % self.spike_every >= self.spike_every - self.spike_seconds:
+                return self.spike_multiplier, self.spike_buy_ratio
+        return 1.0, 0.5
+
+    # ---------- Serwer ----------
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """Kontekst asynchroniczny serwera: `async with mock.serve(...) as server`"""
+        return serve(self.handler, host, port, compression=None, max_queue=None)
+
+    async def handler(self, ws) -> None:
+        self.connections += 1
+        url = urlsplit(ws.request.path)
+        try:
+            if url.path.startswith("/stream"):
+                streams = parse_qs(url.query).get("streams", [""])[0]
+                await self._binance(ws, set(filter(None, streams.split("/"))), combined=True)
+            elif url.path.startswith("/ws/v5/public"):
+                await self._okx(ws)
+            elif url.path.startswith("/ws/"):
+                await self._binance(ws, {url.path[len("/ws/"):]}, combined=False)
+            elif url.path.startswith("/v5/public"):
+                await self._bybit(ws)
+            elif url.path.startswith("/v4/ws"):
+                await self._gate(ws)
+            else:
+                await ws.close(1008, "unknown path")
+        finally:
+            self.connections -= 1
+
+    async def _pump(self, ws, topics: dict, render) -> None:
+        """
+        Co tick generuje transakcje dla subskrybowanych symboli i wysyła ramki.
+        topics: symbol -> zbiór rodzajów ("trades", "kline"), zmieniany przez subskrypcje.
+        render(kind, symbol, market, trades, closed) -> lista ramek (str)
+        """
+        rng = random.Random(self.seed)
+        markets = {}
+        next_kline = 0.0
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+
+        while True:
+            await asyncio.sleep(self.tick)
+            # Liczba transakcji z faktycznego czasu od poprzedniego ticku, nie z `tick` -
+            # czas generowania i wysyłki nie obniża zadanego tempa
+            now = loop.time()
+            period, last = now - last, now
+            multiplier, buy_ratio = self.intensity()
+            ts = self.now_ms()
+            candle = ts // 60000
+            send_kline = now >= next_kline
+            if send_kline:
+                next_kline = now + self.kline_interval
+
+            frames = []
+            for symbol, kinds in list(topics.items()):
+                market = markets.get(symbol)
+                if market is None:
+                    market = markets[symbol] = _Market(rng.uniform(1.0, 100.0))
+                closed = market.roll(candle)
+
+                expected = self.rate * multiplier * period + market.carry
+                count = int(expected)
+                market.carry = expected - count
+                trades = market.trades(count, ts, buy_ratio, rng)
+
+                if "trades" in kinds and trades:
+                    frames.extend(render("trades", symbol, market, trades, None))
+                    self.sent_trades += len(trades)
+                if "kline" in kinds and (send_kline or closed is not None):
+                    frames.extend(render("kline", symbol, market, trades, closed))
+
+            for frame in frames:
+                await ws.send(frame)
+            self.sent_frames += len(frames)
+
+    async def _serve_protocol(self, ws, topics: dict, render, on_message) -> None:
+        """Pętla wysyłki + odbiór wiadomości sterujących (subscribe/ping) równolegle"""
+        pump = asyncio.create_task(self._pump(ws, topics, render))
+        try:
+            async for message in ws:
+                reply = on_message(message)
+                for frame in [reply] if isinstance(reply, str) else reply or ():
+                    await ws.send(frame)
+        finally:
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
+
+    # ---------- Binance ----------
+
+    async def _binance(self, ws, streams: set, combined: bool) -> None:
+        topics = {}
+
+        def apply(stream: str, subscribe: bool) -> None:
+            symbol, _, kind = stream.partition("@")
+            kind = "trades" if kind == "aggTrade" else "kline"
+            kinds = topics.setdefault(symbol.upper(), set())
+            (kinds.add if subscribe else kinds.discard)(kind)
+
+        for stream in streams:
+            apply(stream, True)
+
+        def render(kind, symbol, market, trades, closed):
+            stream = f"{symbol.lower()}@{'aggTrade' if kind == 'trades' else 'kline_' + TF_BINANCE}"
+            if kind == "trades":
+                payloads = [{
+                    "e": "aggTrade", "E": ts, "s": symbol, "a": market.trade_id,
+                    "p": f"{price:.6f}", "q": f"{qty}", "T": ts, "m": is_sell,
+                } for ts, qty, is_sell, price in trades]
+            else:
+                payloads = []
+                start = market.candle * 60000
+                if closed is not None:
+                    payloads.append(_binance_kline(symbol, closed, True, start - 60000))
+                state = (market.open, market.high, market.low, market.close, market.volume)
+                payloads.append(_binance_kline(symbol, state, False, start))
+            if combined:
+                return [json.dumps({"stream": stream, "data": p}) for p in payloads]
+            return [json.dumps(p) for p in payloads]
+
+        def on_message(message):
+            request = json.loads(message)
+            method = request.get("method")
+            if method in ("SUBSCRIBE", "UNSUBSCRIBE"):
+                for stream in request.get("params", []):
+                    apply(stream, method == "SUBSCRIBE")
+                return json.dumps({"result": None, "id": request.get("id")})
+            return None
+
+        await self._serve_protocol(ws, topics, render, on_message)
+
+    # ---------- Bybit ----------
+
+    async def _bybit(self, ws) -> None:
+        topics = {}
+
+        def render(kind, symbol, market, trades, closed):
+            ts = self.now_ms()
+            if kind == "trades":
+                return [json.dumps({
+                    "topic": f"publicTrade.{symbol}", "type": "snapshot", "ts": ts,
+                    "data": [{"T": t, "s": symbol, "S": "Sell" if is_sell else "Buy",
+                              "v": f"{qty}", "p": f"{price:.6f}"}
+                             for t, qty, is_sell, price in trades],
+                })]
+            frames = []
+            if closed is not None:
+                frames.append(_bybit_kline(symbol, closed, True, ts))
+            state = (market.open, market.high, market.low, market.close, market.volume)
+            frames.append(_bybit_kline(symbol, state, False, ts))
+            return frames
+
+        def on_message(message):
+            request = json.loads(message)
+            op = request.get("op")
+            if op == "ping":
+                return json.dumps({"success": True, "ret_msg": "pong", "op": "ping"})
+            if op in ("subscribe", "unsubscribe"):
+                for topic in request.get("args", []):
+                    kind, _, symbol = topic.rpartition(".")
+                    kind = "trades" if kind == "publicTrade" else "kline"
+                    kinds = topics.setdefault(symbol, set())
+                    (kinds.add if op == "subscribe" else kinds.discard)(kind)
+                return json.dumps({"success": True, "ret_msg": "", "op": op})
+            return None
+
+        await self._serve_protocol(ws, topics, render, on_message)
+
+    # ---------- Gate.io ----------
+
+    async def _gate(self, ws) -> None:
+        topics = {}
+
+        def render(kind, symbol, market, trades, closed):
+            contract_size = COINS[_BY_SYMBOL[symbol]]["gate_contract_size"]
+            result = []
+            for ts, qty, is_sell, price in trades:
+                contracts = max(1, round(qty / contract_size))
+                result.append({
+                    "id": market.trade_id, "create_time": ts // 1000, "create_time_ms": ts,
+                    "price": f"{price:.6f}", "contract": symbol,
+                    "size": -contracts if is_sell else contracts,
+                })
+            return [json.dumps({
+                "time": int(time.time()), "time_ms": self.now_ms(),
+                "channel": "futures.trades", "event": "update", "result": result,
+            })]
+
+        def on_message(message):
+            request = json.loads(message)
+            channel = request.get("channel")
+            if channel == "futures.ping":
+                return json.dumps({"time": int(time.time()), "channel": "futures.pong"})
+            if channel == "futures.trades":
+                event = request.get("event")
+                for symbol in request.get("payload", []):
+                    if event == "subscribe":
+                        topics[symbol] = {"trades"}
+                    else:
+                        topics.pop(symbol, None)
+                return json.dumps({"time": int(time.time()), "channel": channel,
+                                   "event": event, "result": {"status": "success"}})
+            return None
+
+        await self._serve_protocol(ws, topics, render, on_message)
+
+    # ---------- OKX ----------
+
+    async def _okx(self, ws) -> None:
+        topics = {}
+
+        def render(kind, symbol, market, trades, closed):
+            contract_size = COINS[_BY_SYMBOL[symbol]]["okx_contract_size"]
+            return [json.dumps({
+                "arg": {"channel": "trades", "instId": symbol},
+                "data": [{
+                    "instId": symbol, "tradeId": str(market.trade_id), "px": f"{price:.6f}",
+                    "sz": str(max(1, round(qty / contract_size))),
+                    "side": "sell" if is_sell else "buy", "ts": str(ts),
+                } for ts, qty, is_sell, price in trades],
+            })]
+
+        def on_message(message):
+            if message == "ping":
+                return "pong"
+            request = json.loads(message)
+            op = request.get("op")
+            if op in ("subscribe", "unsubscribe"):
+                for arg in request.get("args", []):
+                    if op == "subscribe":
+                        topics[arg["instId"]] = {"trades"}
+                    else:
+                        topics.pop(arg["instId"], None)
+                return [json.dumps({"event": op, "arg": arg}) for arg in request.get("args", [])]
+            return None
+
+        await self._serve_protocol(ws, topics, render, on_message)
+
+
+def _binance_kline(symbol: str, candle: tuple, closed: bool, start: int) -> dict:
+    open_, high, low, close, volume = candle
+    return {"e": "kline", "s": symbol, "k": {
+        "t": start, "i": TF_BINANCE, "o": f"{open_:.6f}", "h": f"{high:.6f}", "l": f"{low:.6f}",
+        "c": f"{close:.6f}", "v": f"{volume:.3f}", "x": closed,
+    }}
+
+
+def _bybit_kline(symbol: str, candle: tuple, closed: bool, ts: int) -> str:
+    open_, high, low, close, volume = candle
+    return json.dumps({
+        "topic": f"kline.{TF_BYBIT}.{symbol}", "type": "snapshot", "ts": ts,
+        "data": [{"interval": TF_BYBIT, "open": f"{open_:.6f}", "high": f"{high:.6f}",
+                  "low": f"{low:.6f}", "close": f"{close:.6f}", "volume": f"{volume:.3f}",
+                  "confirm": closed, "timestamp": ts}],
+    })
+
+
+async def _main(args) -> None:
+    mock = MockExchange(rate=args.rate, spike_every=args.spike_every,
+                        spike_seconds=args.spike_seconds, spike_multiplier=args.spike_multiplier,
+                        time_scale=args.time_scale, seed=args.seed)
+    async with mock.serve(args.host, args.port):
+        base = f"ws://{args.host}:{args.port}"
+        print(f"🧪 Mock giełd na {base} ({args.rate} transakcji/s na symbol)")
+        print(f"   BINANCE_WS_URL={base}/ws/ BINANCE_COMBINED_WS_URL={base}/stream?streams=")
+        print(f"   BYBIT_WS_URL={base}/v5/public/linear GATE_WS_URL={base}/v4/ws/usdt "
+              f"OKX_WS_URL={base}/ws/v5/public")
+        last = 0
+        while True:
+            await asyncio.sleep(5)
+            rate = (mock.sent_trades - last) / 5
+            last = mock.sent_trades
+            print(f"📤 Połączenia: {mock.connections}, wysłane transakcje: {rate:,.0f}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny zamiennik giełd (testy obciążeniowe)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=20.0, help="transakcje/s na symbol")
+    parser.add_argument("--spike-every", type=float, default=0.0, help="co ile sekund skok (0 = brak)")
+    parser.add_argument("--spike-seconds", type=float, default=10.0)
+    parser.add_argument("--spike-multiplier", type=float, default=20.0)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="przyspieszenie czasu świec")
+    parser.add_argument("--seed", type=int, default=None)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,202 @@
+"""
+Nagrywanie surowych ramek WebSocket - do odtwarzania alertów i benchmarków.
+
+Ramki trafiają do kolejki, a zapisuje je osobny wątek - pętla odbioru nigdy nie czeka na dysk.
+Pliki są kompresowane (gzip), tylko dopisywane i rotowane po rozmiarze albo czasie.
+
+Format rekordu (po dekompresji), kolejno jeden za drugim:
+    nagłówek <dHI: czas odbioru (time.time()), długość nazwy streamu, długość ramki
+    nazwa streamu (UTF-8), surowa ramka (bajty)
+
+Nazwa streamu określa handler przy odtwarzaniu:
+    "binance"                   - ramka combined streamu (z polem "stream")
+    "binance:<symbol>@<stream>" - ramka z osobnego połączenia per coin
+    "bybit" / "gate" / "okx"    - ramka ze wspólnego połączenia subskrypcji
+"""
+
+import glob
+import gzip
+import os
+import queue
+import struct
+import threading
+import time
+
+from config import (
+    RECORD_COMPRESSLEVEL,
+    RECORD_DIR,
+    RECORD_MAX_PENDING,
+    RECORD_ROTATE_MB,
+    RECORD_ROTATE_SECONDS,
+)
+
+_HEADER = struct.Struct("<dHI")
+_STOP = None
+FILE_SUFFIX = ".frames.gz"
+
+
+class FrameRecorder:
+    """
+    Zapis ramek w tle.
+
+    record() tylko wkłada krotkę do queue.SimpleQueue (bez blokowania pętli asyncio).
+    Wątek zapisujący opróżnia kolejkę paczkami i dopisuje rekordy do bieżącego pliku.
+    Przy zapchanym dysku (ponad max_pending ramek w kolejce) nowe ramki są odrzucane.
+    """
+
+    def __init__(self, directory: str = RECORD_DIR,
+                 rotate_bytes: int = RECORD_ROTATE_MB * 1024 * 1024,
+                 rotate_seconds: float = RECORD_ROTATE_SECONDS,
+                 max_pending: int = RECORD_MAX_PENDING,
+                 compresslevel: int = RECORD_COMPRESSLEVEL):
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.max_pending = max_pending
+        self.compresslevel = compresslevel
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.files = []
+        self.recorded = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Uruchamia wątek zapisujący (tylko gdy ustawiono katalog nagrań)"""
+        if not self.enabled or self.thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._writer, name="frame-recorder", daemon=True)
+        self.thread.start()
+        print(f"💾 Nagrywanie ramek do {self.directory}")
+
+    def record(self, stream: str, raw: bytes) -> None:
+        """Dodaje ramkę do zapisu (wywoływane z pętli odbioru)"""
+        if not self.enabled:
+            return
+        if self.queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self.queue.put((time.time(), stream, raw))
+
+    def close(self) -> None:
+        """Zapisuje zaległe ramki i zamyka bieżący plik"""
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+
+    # ---------- Wątek zapisujący ----------
+
+    def _open(self):
+        name = time.strftime("frames-%Y%m%d-%H%M%S", time.gmtime())
+        path = os.path.join(self.directory, f"{name}-{len(self.files):04d}{FILE_SUFFIX}")
+        self.files.append(path)
+        return gzip.open(path, "ab", compresslevel=self.compresslevel)
+
+    def _writer(self) -> None:
+        pack = _HEADER.pack
+        get = self.queue.get
+        get_nowait = self.queue.get_nowait
+        out = None
+        written = 0
+        opened_at = 0.0
+
+        try:
+            while True:
+                batch = [get()]
+                # Dobierz wszystko co już czeka - jeden write na paczkę
+                try:
+                    while len(batch) < 10000:
+                        batch.append(get_nowait())
+                except queue.Empty:
+                    pass
+
+                stop = False
+                chunks = []
+                for item in batch:
+                    if item is _STOP:
+                        stop = True
+                        break
+                    recv_ts, stream, raw = item
+                    name = stream.encode()
+                    chunks.append(pack(recv_ts, len(name), len(raw)))
+                    chunks.append(name)
+                    chunks.append(raw)
+
+                if chunks:
+                    now = time.time()
+                    if out is not None and (written >= self.rotate_bytes
+                                            or now - opened_at >= self.rotate_seconds):
+                        out.close()
+                        out = None
+                    if out is None:
+                        out = self._open()
+                        written = 0
+                        opened_at = now
+
+                    data = b"".join(chunks)
+                    out.write(data)
+                    written += len(data)
+                    self.recorded += len(chunks) // 3
+
+                if stop:
+                    return
+        except Exception as e:
+            self.enabled = False
+            print(f"❌ Błąd zapisu nagrania ramek: {e}")
+        finally:
+            if out is not None:
+                out.close()
+
+
+recorder = FrameRecorder()
+
+
+# ======================== ODCZYT ========================
+
+def capture_files(path: str) -> list:
+    """Pliki nagrań w kolejności zapisu (katalog albo pojedynczy plik)"""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, f"*{FILE_SUFFIX}")))
+    return [path]
+
+
+def read_frames(paths, chunk_size: int = 1 << 20):
+    """
+    Sekwencyjny odczyt nagrań: generator (recv_ts, stream, raw).
+    Dekompresja dużymi blokami, rekordy wycinane z bufora bez kopiowania nagłówków.
+    Urwany ostatni rekord (np. po przerwaniu programu) jest pomijany.
+    """
+    header_size = _HEADER.size
+    unpack_from = _HEADER.unpack_from
+    streams = {}  # bajty nazwy -> str (nazwy powtarzają się w każdym rekordzie)
+
+    for path in paths:
+        with gzip.open(path, "rb") as f:
+            buf = b""
+            pos = 0
+            while True:
+                try:
+                    chunk = f.read(chunk_size)
+                except EOFError:
+                    chunk = b""  # plik nie został domknięty
+                if not chunk:
+                    break
+                buf = buf[pos:] + chunk
+                pos = 0
+                end = len(buf)
+
+                while pos + header_size <= end:
+                    recv_ts, name_len, raw_len = unpack_from(buf, pos)
+                    start = pos + header_size
+                    stop = start + name_len + raw_len
+                    if stop > end:
+                        break
+                    name = buf[start:start + name_len]
+                    stream = streams.get(name)
+                    if stream is None:
+                        stream = streams[name] = name.decode()
+                    yield recv_ts, stream, buf[start + name_len:stop]
+                    pos = stop
@@ -0,0 +1,134 @@
+"""
+Odtwarzanie nagranych ramek (recorder.py) przez te same handlery co na żywo.
+
+Każda ramka ustawia zegar wirtualny (clock.py) na swój czas odbioru, więc rozgrzewka
+alertów, godzina w wiadomości i ticki AlertScheduler zależą tylko od nagrania -
+to samo nagranie zawsze daje te same alerty. Tryby:
+- speed=0: najszybciej jak się da (pomiar przepustowości, testy regresji alertów)
+- speed=1: w tempie rzeczywistym (speed=10 = 10x szybciej)
+"""
+
+import time
+
+import clock
+from alerts import AlertScheduler
+from config import ALERT_EVAL_INTERVAL, COINS, initialize_states
+from recorder import capture_files, read_frames
+from subscriptions import create_subscription_managers
+from websockets_tasks import build_binance_routes, dispatch_binance_frame
+
+
+class ReplayAlerts:
+    """Odbiornik alertów zamiast Telegrama: (czas wirtualny, wiadomość)"""
+
+    def __init__(self, echo: bool = False):
+        self.alerts = []
+        self.echo = echo
+
+    def enqueue(self, message: str) -> bool:
+        self.alerts.append((clock.now(), message))
+        if self.echo:
+            print(message)
+        return True
+
+
+class Replayer:
+    """
+    Przepuszcza nagranie przez handlery Binance (combined i per coin) oraz
+    Bybit/Gate.io/OKX (handle_message menedżerów subskrypcji, bez połączeń).
+    """
+
+    def __init__(self, path: str, coins=COINS, speed: float = 0.0,
+                 interval: float = ALERT_EVAL_INTERVAL, echo: bool = False):
+        self.paths = capture_files(path)
+        self.coins = list(coins)
+        self.speed = speed
+        self.interval = interval
+        self.clock = clock.VirtualClock()
+        self.sink = ReplayAlerts(echo)
+        self.states = None
+        self.scheduler = None
+        self.frames = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def _setup(self, start: float) -> dict:
+        """Stan i routing tworzone w chwili pierwszej ramki (start_time = czas nagrania)"""
+        self.clock.set(start)
+        self.states = initialize_states()
+        self.scheduler = AlertScheduler(
+            self.states, set(), interval=self.interval, sender=self.sink
+        )
+
+        routes = build_binance_routes(self.coins, self.states)
+        handlers = {"binance": lambda raw: dispatch_binance_frame(raw, routes, self.scheduler)}
+        for stream, (handler, coin, state, _) in routes.items():
+            handlers[f"binance:{stream}"] = (
+                lambda raw, h=handler, c=coin, s=state: h(c, s, raw, self.scheduler)
+            )
+        for manager in create_subscription_managers(self.states):
+            for coin in self.coins:
+                if not COINS[coin].get(manager.exchange):
+                    continue  # brak symbolu na tej giełdzie (jak SubscriptionManager.subscribe)
+                manager.coins.add(coin)
+                manager.add_routes(coin)
+            handlers[manager.exchange] = manager.handle_message
+        return handlers
+
+    def run(self) -> list:
+        """Odtwarza całe nagranie, zwraca listę alertów [(czas, wiadomość), ...]"""
+        clock.use_virtual_clock(self.clock)
+        try:
+            self._run()
+        finally:
+            clock.use_real_clock()
+        return self.sink.alerts
+
+    def _run(self) -> None:
+        handlers = None
+        virtual = self.clock
+        next_tick = 0.0
+        wall_start = time.perf_counter()
+        first_ts = 0.0
+
+        for recv_ts, stream, raw in read_frames(self.paths):
+            if handlers is None:
+                handlers = self._setup(recv_ts)
+                first_ts = recv_ts
+                next_tick = recv_ts + self.interval
+
+            if self.speed > 0:
+                delay = (recv_ts - first_ts) / self.speed - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            # Tick AlertScheduler, który wypadł przed tą ramką (kolejne bez zmian byłyby puste)
+            if recv_ts >= next_tick:
+                virtual.set(next_tick)
+                self.scheduler.evaluate_dirty()
+                next_tick += self.interval * (int((recv_ts - next_tick) // self.interval) + 1)
+            virtual.set(recv_ts)
+
+            handler = handlers.get(stream)
+            if handler is None:
+                continue
+            self.frames += 1
+            try:
+                handler(raw)
+            except Exception:
+                self.errors += 1
+
+        if self.scheduler is not None:
+            self.scheduler.evaluate_dirty()
+        self.elapsed = time.perf_counter() - wall_start
+
+
+def run_replay(path: str, speed: float = 0.0) -> None:
+    """Tryb odtwarzania z main.py: alerty na konsolę + podsumowanie przepustowości"""
+    replayer = Replayer(path, speed=speed, echo=True)
+    print(f"⏯️ Odtwarzanie {len(replayer.paths)} plików nagrań z {path}")
+    alerts = replayer.run()
+
+    rate = replayer.frames / replayer.elapsed if replayer.elapsed else 0.0
+    print(f"✅ Ramki: {replayer.frames} ({rate:,.0f}/s), błędne: {replayer.errors}, "
+          f"alerty: {len(alerts)}, czas: {replayer.elapsed:.2f} s")
@@ -0,0 +1,300 @@
+"""
+Tryb wieloprocesowy - coiny podzielone między N procesów roboczych (SHARD_WORKERS).
+
+Każdy proces roboczy ma własny event loop i własne połączenia (Binance dla swoich
+coinów + Bybit/Gate.io/OKX na żądanie) i dekoduje ramki na własnym rdzeniu.
+Stan jest publikowany do tablicy float64 w multiprocessing.shared_memory:
+wiersz = coin x giełda, kolumny = SHARED_FIELDS (z oknem RollingBaseline).
+
+Proces główny (GUI / alerty / checkpointy) co tick kopiuje zmienione wiersze
+do swoich ExchangeState (mirror) i dalej działa jak w trybie jednoprocesowym -
+AlertScheduler, CombinedAggregator i Checkpointer nie wiedzą o podziale.
+
+Spójność wiersza: seqlock. Proces roboczy zwiększa seq przed zapisem (nieparzysty)
+i po zapisie (parzysty); czytelnik pomija wiersze z nieparzystym albo zmienionym
+w trakcie kopiowania seq i bierze je w następnym ticku.
+
+Opóźnienie alertu = SHARD_PUBLISH_INTERVAL + SHARD_READ_INTERVAL + ALERT_EVAL_INTERVAL.
+W procesach roboczych nie działają nagrywanie ramek, historia świec ani wyższe interwały.
+"""
+
+import asyncio
+import math
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import event_loop
+from config import HISTORY, SHARD_PUBLISH_INTERVAL, SHARD_READ_INTERVAL
+from state import EXCHANGES
+
+_STATE_FIELDS = (
+    "candle_id", "current_vol", "buy_vol", "sell_vol", "delta",
+    "candle_open", "candle_close", "candle_high", "candle_low",
+    "alert_triggered", "start_time",
+)
+# seq, pola stanu, długość okna, okno (HISTORY kolumn)
+SHARED_FIELDS = ("seq", *_STATE_FIELDS, "window_len") + tuple(f"w{i}" for i in range(HISTORY))
+COL_SEQ = 0
+COL_WINDOW_LEN = 1 + len(_STATE_FIELDS)
+COL_WINDOW = COL_WINDOW_LEN + 1
+
+
+def split_coins(coins, workers: int) -> list:
+    """Podział coinów na `workers` części (po kolei, różnica rozmiarów najwyżej 1)"""
+    coins = list(coins)
+    return [coins[i::workers] for i in range(workers) if coins[i::workers]]
+
+
+class SharedStateTable:
+    """Tablica [coin x giełda, SHARED_FIELDS] w pamięci współdzielonej"""
+
+    def __init__(self, coins, name: str | None = None):
+        self.coins = list(coins)
+        self.index = {coin: i for i, coin in enumerate(self.coins)}
+        shape = (len(self.coins) * len(EXCHANGES), len(SHARED_FIELDS))
+        size = shape[0] * shape[1] * 8
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Proces roboczy tylko korzysta z bloku - usuwa go właściciel (bez ostrzeżeń trackera)
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+            self.owner = False
+        self.name = self.shm.name
+        self.data = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf)
+        if self.owner:
+            self.data[:] = 0.0
+        self.last_seq = np.zeros(shape[0])
+
+    # ---------- Zapis (proces roboczy) ----------
+
+    def write(self, coin: str, coin_state: dict) -> None:
+        """Zapisuje wszystkie giełdy coina (seqlock per wiersz)"""
+        data = self.data
+        base = self.index[coin] * len(EXCHANGES)
+        for offset, exchange in enumerate(EXCHANGES):
+            state = coin_state[exchange]
+            window = state.baseline.window
+            values = [getattr(state, name) for name in _STATE_FIELDS]
+            if values[0] is None:
+                values[0] = math.nan  # candle_id przed pierwszą transakcją
+            values.append(len(window))
+            values.extend(window)
+            row = data[base + offset]
+            row[COL_SEQ] += 1  # nieparzysty = zapis w toku
+            row[1:1 + len(values)] = values
+            row[COL_SEQ] += 1
+
+    # ---------- Odczyt (proces główny) ----------
+
+    def read_into(self, states: dict) -> list:
+        """Kopiuje zmienione, spójne wiersze do states. Zwraca coiny ze zmianami."""
+        seq_before = self.data[:, COL_SEQ].copy()
+        rows = np.flatnonzero((seq_before != self.last_seq) & (seq_before % 2 == 0))
+        if len(rows) == 0:
+            return []
+
+        block = self.data[rows]  # kopia (indeksowanie listą)
+        seq_after = self.data[rows, COL_SEQ]
+        consistent = (block[:, COL_SEQ] == seq_before[rows]) & (seq_after == seq_before[rows])
+
+        changed = []
+        n_exchanges = len(EXCHANGES)
+        for row, values in zip(rows[consistent].tolist(), block[consistent]):
+            coin = self.coins[row // n_exchanges]
+            state = states[coin][EXCHANGES[row % n_exchanges]]
+            fields = values[1:COL_WINDOW_LEN].tolist()
+            candle_id = fields[0]
+            state.candle_id = None if math.isnan(candle_id) else int(candle_id)
+            (state.current_vol, state.buy_vol, state.sell_vol, state.delta,
+             state.candle_open, state.candle_close, state.candle_high, state.candle_low) = fields[1:9]
+            # Proces roboczy nie sprawdza alertów (flaga zawsze False) - powtórkę w tej samej
+            # świecy blokuje sent_alerts procesu głównego (identyfikator z candle_id)
+            state.alert_triggered = bool(fields[9])
+            state.start_time = fields[10]
+            window_len = int(values[COL_WINDOW_LEN])
+            state.baseline.load(values[COL_WINDOW:COL_WINDOW + window_len].tolist())
+            self.last_seq[row] = seq_before[row]
+            if not changed or changed[-1] != coin:
+                changed.append(coin)
+        return changed
+
+    def close(self) -> None:
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ======================== PROCES ROBOCZY ========================
+
+class ShardPublisher:
+    """
+    Odbiorca zmian w procesie roboczym - zamiast AlertScheduler (handlery Binance
+    wołają mark_dirty) i CombinedAggregator (menedżery subskrypcji wołają mark).
+    Zmienione coiny trafiają do pamięci współdzielonej co `interval` sekund.
+    """
+
+    def __init__(self, table: SharedStateTable, states: dict,
+                 interval: float = SHARD_PUBLISH_INTERVAL):
+        self.table = table
+        self.states = states
+        self.interval = interval
+        self.dirty = set()
+
+    def mark_dirty(self, coin: str, state) -> None:
+        self.dirty.add(coin)
+
+    def mark(self, coin: str) -> None:
+        self.dirty.add(coin)
+
+    def publish(self) -> None:
+        dirty, self.dirty = self.dirty, set()
+        for coin in dirty:
+            self.table.write(coin, self.states[coin])
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.publish()
+
+
+async def _worker(coins: list, all_coins: list, shm_name: str, commands) -> None:
+    from checkpoint import Checkpointer
+    from config import BINANCE_COMBINED_STREAMS, COINS
+    from state import new_coin_state
+    from subscriptions import create_subscription_managers
+    from websockets_tasks import (
+        aggtrade_task_binance,
+        build_binance_routes,
+        combined_task_binance,
+        kline_task_binance,
+        split_binance_streams,
+    )
+
+    table = SharedStateTable(all_coins, name=shm_name)
+    states = {coin: new_coin_state() for coin in coins}
+    # Ciepły restart - każdy proces bierze ze wspólnego checkpointu tylko swoje coiny
+    Checkpointer(states, set()).restore()
+    publisher = ShardPublisher(table, states)
+    publisher.dirty.update(coins)
+    managers = create_subscription_managers(states, publisher)
+
+    tasks = [asyncio.create_task(publisher.run())]
+    if BINANCE_COMBINED_STREAMS:
+        routes = build_binance_routes(coins, states)
+        for streams in split_binance_streams(list(routes)):
+            tasks.append(asyncio.create_task(combined_task_binance(streams, routes, publisher)))
+    else:
+        for coin in coins:
+            if not COINS[coin].get("binance"):
+                continue
+            tasks.append(asyncio.create_task(kline_task_binance(coin, states, publisher)))
+            tasks.append(asyncio.create_task(aggtrade_task_binance(coin, states, publisher)))
+
+    try:
+        while True:
+            command, coin = await asyncio.to_thread(commands.get)
+            if command == "stop":
+                break
+            for manager in managers:
+                if command == "subscribe":
+                    await manager.subscribe(coin)
+                else:
+                    await manager.unsubscribe(coin)
+    finally:
+        for manager in managers:
+            await manager.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        publisher.publish()
+        table.close()
+
+
+def _worker_main(coins: list, all_coins: list, shm_name: str, commands) -> None:
+    """Punkt wejścia procesu roboczego (spawn)"""
+    try:
+        event_loop.run(_worker(coins, all_coins, shm_name, commands))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C trafia do całej grupy procesów - zamyka proces główny
+
+
+# ======================== PROCES GŁÓWNY ========================
+
+class ShardedIngest:
+    """
+    Uruchamia procesy robocze i przenosi ich stan do states procesu głównego.
+
+    Zmienione coiny są przekazywane do scheduler.mark_dirty - dalej alerty,
+    agregacja dla GUI i checkpointy działają na states jak w trybie jednoprocesowym.
+    """
+
+    def __init__(self, states: dict, scheduler, workers: int, coins=None,
+                 interval: float = SHARD_READ_INTERVAL):
+        self.states = states
+        self.scheduler = scheduler
+        self.coins = list(states if coins is None else coins)
+        self.shards = split_coins(self.coins, workers)
+        self.interval = interval
+        self.owner = {coin: i for i, shard in enumerate(self.shards) for coin in shard}
+        self.table = None
+        self.processes = []
+        self.commands = []
+
+    def start(self) -> None:
+        self.table = SharedStateTable(self.coins)
+        ctx = multiprocessing.get_context("spawn")
+        for i, shard in enumerate(self.shards):
+            commands = ctx.Queue()
+            process = ctx.Process(target=_worker_main, name=f"shard-{i}",
+                                  args=(shard, self.coins, self.table.name, commands), daemon=True)
+            process.start()
+            self.commands.append(commands)
+            self.processes.append(process)
+        print(f"🧩 Tryb wieloprocesowy: {len(self.shards)} procesów, "
+              f"{', '.join(str(len(shard)) for shard in self.shards)} coinów")
+
+    def poll(self) -> list:
+        """Kopiuje zmiany z pamięci współdzielonej i oznacza coiny w schedulerze"""
+        changed = self.table.read_into(self.states)
+        mark_dirty = self.scheduler.mark_dirty
+        states = self.states
+        for coin in changed:
+            mark_dirty(coin, states[coin]["binance"])
+        return changed
+
+    async def run(self) -> None:
+        """Odczyt co `interval` sekund + zgłoszenie zakończonych procesów roboczych"""
+        dead = set()
+        while True:
+            await asyncio.sleep(self.interval)
+            self.poll()
+            for i, process in enumerate(self.processes):
+                if i not in dead and process.exitcode is not None:
+                    dead.add(i)
+                    print(f"❌ Proces roboczy shard-{i} zakończył się (kod {process.exitcode})")
+
+    def subscribe(self, coin: str) -> None:
+        """Bybit/Gate.io/OKX dla coina - w procesie, do którego należy coin"""
+        self.commands[self.owner[coin]].put(("subscribe", coin))
+
+    def unsubscribe(self, coin: str) -> None:
+        self.commands[self.owner[coin]].put(("unsubscribe", coin))
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Zamyka procesy robocze (połączenia, ostatnia publikacja) i pamięć współdzieloną"""
+        for commands in self.commands:
+            commands.put(("stop", None))
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self.table is not None:
+            self.poll()
+            self.table.close()
+            self.table = None
+
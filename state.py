@@ -0,0 +1,149 @@
+"""
+Stan per coin/giełda - klasy ze __slots__ zamiast słowników.
+
+Dostęp do atrybutu slotu jest szybszy niż lookup po kluczu w dict
+i nie wymaga osobnego __dict__ na każdy obiekt (mniej pamięci przy setkach coinów).
+"""
+
+from collections import deque
+
+import clock
+from config import ALERT_VOLUME_MULTIPLIER, HISTORY
+
+EXCHANGES = ("binance", "bybit", "gate", "okx")
+
+
+class RollingBaseline:
+    """
+    Średni wolumen z ostatnich `maxlen` zamkniętych świec.
+
+    Suma jest aktualizowana przyrostowo przy zamknięciu świecy, a próg alertu
+    (multiplier x średnia) liczony od razu - sprawdzenie per transakcja
+    to jedno porównanie, niezależnie od długości okna.
+    """
+
+    __slots__ = ("_pushes", "avg", "multiplier", "threshold", "total", "window")
+
+    def __init__(self, maxlen: int = HISTORY, multiplier: float = ALERT_VOLUME_MULTIPLIER):
+        self.window = deque(maxlen=maxlen)
+        self.total = 0.0
+        self.avg = 0.0
+        self.threshold = 0.0
+        self.multiplier = multiplier
+        self._pushes = 0
+
+    def push(self, volume: float) -> None:
+        """Dodaje wolumen zamkniętej świecy"""
+        window = self.window
+        if len(window) == window.maxlen:
+            self.total -= window[0]
+        window.append(volume)
+        self.total += volume
+
+        # Co maxlen świec suma liczona od nowa - bez kumulacji błędu float
+        self._pushes += 1
+        if self._pushes >= window.maxlen:
+            self.total = sum(window)
+            self._pushes = 0
+
+        self.avg = self.total / len(window)
+        self.threshold = self.multiplier * self.avg
+
+    def load(self, volumes) -> None:
+        """Zastępuje okno podanymi wolumenami (kopia stanu z innego procesu)"""
+        window = self.window
+        window.clear()
+        window.extend(volumes)
+        self.total = sum(window)
+        self.avg = self.total / len(window) if window else 0.0
+        self.threshold = self.multiplier * self.avg
+        self._pushes = 0
+
+    @property
+    def maxlen(self) -> int:
+        return self.window.maxlen
+
+    @property
+    def full(self) -> bool:
+        return len(self.window) == self.window.maxlen
+
+    def __len__(self) -> int:
+        return len(self.window)
+
+
+class ExchangeState:
+    """Stan bieżącej świecy i historii wolumenu dla jednego coina na jednej giełdzie"""
+
+    __slots__ = (
+        "alert_triggered", "baseline", "buy_vol",
+        "candle_close", "candle_high",
+        "candle_id",  # numer świecy: timestamp_ms // 60000
+        "candle_low", "candle_open",
+        "current_vol", "delta", "sell_vol", "start_time",
+    )
+
+    def __init__(self, start_time: float | None = None):
+        self.current_vol = 0.0
+        self.baseline = RollingBaseline()
+        self.buy_vol = 0.0
+        self.sell_vol = 0.0
+        self.delta = 0.0
+        self.candle_id = None
+        self.candle_open = 0.0
+        self.candle_close = 0.0
+        self.candle_high = 0.0
+        self.candle_low = 0.0
+        self.alert_triggered = False
+        self.start_time = clock.now() if start_time is None else start_time
+
+    @property
+    def avg_vol(self) -> float:
+        return self.baseline.avg
+
+
+class CombinedState:
+    """Suma wszystkich giełd dla jednego coina (wiersz COMBINED w GUI, liczy CombinedAggregator)"""
+
+    __slots__ = ("avg_vol", "buy_vol", "current_vol", "delta", "sell_vol")
+
+    def __init__(self):
+        self.current_vol = 0.0
+        self.avg_vol = 0.0
+        self.delta = 0.0
+        self.buy_vol = 0.0
+        self.sell_vol = 0.0
+
+
+def new_coin_state(start_time: float | None = None) -> dict:
+    """Stan jednego coina: giełda -> ExchangeState, plus "combined" """
+    coin_state = {exchange: ExchangeState(start_time) for exchange in EXCHANGES}
+    coin_state["combined"] = CombinedState()
+    return coin_state
+
+
+class CoinStates(dict):
+    """
+    coin -> stan coina (new_coin_state), tworzony przy pierwszym states[coin].
+    Tylko coiny z universe (COINS); iteracja i get() widzą wyłącznie utworzone stany.
+    listeners(coin, coin_state) są wołane po utworzeniu (świece, interwały, AlertEngine).
+    """
+
+    def __init__(self, universe):
+        super().__init__()
+        self.universe = universe
+        self.listeners = []
+
+    def __missing__(self, coin: str) -> dict:
+        if coin not in self.universe:
+            raise KeyError(coin)
+        # start_time = pierwsza subskrypcja coina - od niej liczy się rozgrzewka
+        coin_state = self[coin] = new_coin_state()
+        for listener in self.listeners:
+            listener(coin, coin_state)
+        return coin_state
+
+    def create(self, coins) -> None:
+        """Tworzy od razu stany podanych coinów (np. coiny Binance przy starcie)"""
+        for coin in coins:
+            if coin not in self:
+                self.__missing__(coin)
@@ -0,0 +1,384 @@
+"""
+Menedżery subskrypcji - jedno długo żyjące połączenie na giełdę (Bybit, Gate.io, OKX).
+Coiny są dodawane/usuwane wiadomościami subscribe/unsubscribe, bez ponownego łączenia.
+"""
+
+import asyncio
+import json
+import time
+
+import websockets
+
+from config import (
+    BYBIT_WS_URL,
+    COINS,
+    GATE_WS_URL,
+    OKX_WS_URL,
+    SUBSCRIPTION_PING_INTERVAL,
+    TF_BYBIT,
+)
+from decoding import (
+    bybit_frame,
+    bybit_kline,
+    bybit_kline_key,
+    bybit_stamp,
+    bybit_trades,
+    gate_stamp,
+    gate_trades,
+    is_data_frame,
+    okx_stamp,
+    okx_trades,
+)
+from ingest import ingest_registry
+from latency import latency_registry
+from metrics import FrameProbe
+from recorder import recorder
+from state import ExchangeState
+from websockets_tasks import (
+    coin_frames_counter,
+    handle_kline_bybit,
+    handle_trades_bybit,
+    handle_trades_gate,
+    handle_trades_okx,
+    reconnects_counter,
+)
+
+
+class SubscriptionManager:
+    """
+    Bazowy menedżer jednego połączenia WebSocket do giełdy.
+
+    Połączenie startuje przy pierwszej subskrypcji i zostaje otwarte.
+    Po reconnect wszystkie aktywne coiny są subskrybowane ponownie.
+    Podklasy definiują format wiadomości i routing ramek do handlerów.
+    Z podanym CombinedAggregator każdy przetworzony coin jest oznaczany do agregacji.
+    Ramki przechodzą przez IngestQueue (kline_key - otwarte świece zastępowane przy coalesce).
+    Metryki: decode (dekoder ramki) i stamp (stream, czas giełdy w ms) dla FrameProbe.
+    """
+
+    name = ""
+    exchange = ""  # Klucz giełdy w states (i nazwa streamu w nagraniach)
+    url = ""
+    max_args = 50  # Maksymalna liczba tematów w jednej wiadomości subscribe
+    kline_key = None
+    decode = None
+    stamp = None
+
+    def __init__(self, states: dict, aggregator=None):
+        self.states = states
+        self.aggregator = aggregator
+        self.coins = set()
+        self.ws = None
+        self.task = None
+
+    # ---------- API dla main.py ----------
+
+    async def subscribe(self, coin: str) -> None:
+        """Dodaje coin do połączenia (uruchamia połączenie przy pierwszym coinie)"""
+        if coin in self.coins or not COINS[coin].get(self.exchange):
+            return  # już subskrybowany albo brak symbolu na tej giełdzie
+
+        self.coins.add(coin)
+        self.add_routes(coin)
+
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        elif self.ws is not None:
+            await self._send_all(self.subscribe_messages([coin]))
+
+    async def unsubscribe(self, coin: str) -> None:
+        """Usuwa coin z połączenia (połączenie zostaje otwarte)"""
+        if coin not in self.coins:
+            return
+
+        self.coins.discard(coin)
+        self.remove_routes(coin)
+
+        if self.ws is not None:
+            await self._send_all(self.unsubscribe_messages([coin]))
+
+    async def close(self) -> None:
+        """Zamyka połączenie"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    # ---------- Pętla połączenia ----------
+
+    async def run(self) -> None:
+        """Utrzymuje połączenie, subskrybuje aktywne coiny i rozdziela ramki"""
+        probe = FrameProbe(self.exchange, parse=self.decode, stamp=self.stamp,
+                           latency=latency_registry)
+        ingest = ingest_registry.create(self.name, self.kline_key, probe=probe)
+        consumer = asyncio.create_task(ingest.drain(self.handle_message))
+        try:
+            await self._connection(ingest)
+        finally:
+            consumer.cancel()
+            await asyncio.gather(consumer, return_exceptions=True)
+            ingest_registry.remove(ingest)
+
+    async def _connection(self, ingest) -> None:
+        put = ingest.put
+        reconnects = reconnects_counter(self.exchange)
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self.ws = ws
+                    if self.coins:
+                        await self._send_all(self.subscribe_messages(sorted(self.coins)))
+
+                    while True:
+                        try:
+                            msg = await asyncio.wait_for(
+                                ws.recv(decode=False), timeout=SUBSCRIPTION_PING_INTERVAL
+                            )
+                        except TimeoutError:
+                            await ws.send(self.ping_message())
+                            continue
+
+                        if recorder.enabled:
+                            recorder.record(self.exchange, msg)
+                        if not put(msg):
+                            await ingest.wait_space()
+                            put(msg)
+            except Exception as e:
+                print(f"❌ Błąd połączenia {self.name}: {e}")
+                reconnects.value += 1
+            finally:
+                self.ws = None
+            await asyncio.sleep(5)
+
+    async def _send_all(self, messages: list) -> None:
+        for message in messages:
+            await self.ws.send(json.dumps(message))
+
+    def _chunks(self, items: list) -> list:
+        return [items[i:i + self.max_args] for i in range(0, len(items), self.max_args)]
+
+    # ---------- Do nadpisania w podklasach ----------
+
+    def add_routes(self, coin: str) -> None:
+        raise NotImplementedError
+
+    def remove_routes(self, coin: str) -> None:
+        raise NotImplementedError
+
+    def subscribe_messages(self, coins: list) -> list:
+        raise NotImplementedError
+
+    def unsubscribe_messages(self, coins: list) -> list:
+        raise NotImplementedError
+
+    def ping_message(self) -> str:
+        raise NotImplementedError
+
+    def handle_message(self, msg: bytes) -> None:
+        raise NotImplementedError
+
+
+# ======================== BYBIT ========================
+
+class BybitSubscriptionManager(SubscriptionManager):
+    """Bybit: świece i publicTrade na jednym połączeniu, routing po polu topic"""
+
+    name = "Bybit"
+    exchange = "bybit"
+    url = BYBIT_WS_URL
+    max_args = 10  # Limit Bybit dla args w jednym żądaniu
+    kline_key = staticmethod(bybit_kline_key)
+    decode = staticmethod(bybit_frame)
+    stamp = staticmethod(bybit_stamp)
+
+    def __init__(self, states: dict, aggregator=None):
+        super().__init__(states, aggregator)
+        self.routes = {}
+
+    @staticmethod
+    def _topics(coin: str) -> list:
+        symbol = COINS[coin]["bybit"]
+        return [f"kline.{TF_BYBIT}.{symbol}", f"publicTrade.{symbol}"]
+
+    def add_routes(self, coin: str) -> None:
+        state = self.states[coin]["bybit"]
+        frames = coin_frames_counter(self.exchange, coin)
+        kline_topic, trade_topic = self._topics(coin)
+        self.routes[kline_topic] = (_route_kline_bybit, state, coin, frames)
+        self.routes[trade_topic] = (_route_trades_bybit, state, coin, frames)
+
+    def remove_routes(self, coin: str) -> None:
+        for topic in self._topics(coin):
+            self.routes.pop(topic, None)
+
+    def _messages(self, op: str, coins: list) -> list:
+        topics = [topic for coin in coins for topic in self._topics(coin)]
+        return [{"op": op, "args": chunk} for chunk in self._chunks(topics)]
+
+    def subscribe_messages(self, coins: list) -> list:
+        return self._messages("subscribe", coins)
+
+    def unsubscribe_messages(self, coins: list) -> list:
+        return self._messages("unsubscribe", coins)
+
+    def ping_message(self) -> str:
+        return json.dumps({"op": "ping"})
+
+    def handle_message(self, msg: bytes) -> None:
+        if not is_data_frame(msg, b'"topic"'):
+            return  # potwierdzenia subscribe, pong
+
+        topic, payload = bybit_frame(msg)
+        route = self.routes.get(topic)
+        if route is None:
+            return  # tematy po unsubscribe
+
+        handler, state, coin, frames = route
+        frames.value += 1
+        handler(state, payload)
+        if self.aggregator is not None:
+            self.aggregator.mark(coin)
+
+
+def _route_kline_bybit(state: ExchangeState, payload) -> None:
+    vol, is_closed = bybit_kline(payload)
+    handle_kline_bybit(state, vol, is_closed)
+
+
+def _route_trades_bybit(state: ExchangeState, payload) -> None:
+    handle_trades_bybit(state, bybit_trades(payload))
+
+
+# ======================== GATE.IO ========================
+
+class GateSubscriptionManager(SubscriptionManager):
+    """Gate.io: kanał futures.trades, routing po polu contract transakcji"""
+
+    name = "Gate.io"
+    exchange = "gate"
+    url = GATE_WS_URL
+    decode = staticmethod(gate_trades)
+    stamp = staticmethod(gate_stamp)
+
+    def __init__(self, states: dict, aggregator=None):
+        super().__init__(states, aggregator)
+        self.contracts = {}
+        self.frames = {}  # coin -> licznik ramek
+
+    def add_routes(self, coin: str) -> None:
+        self.contracts[COINS[coin]["gate"]] = coin
+        self.frames[coin] = coin_frames_counter(self.exchange, coin)
+
+    def remove_routes(self, coin: str) -> None:
+        self.contracts.pop(COINS[coin]["gate"], None)
+
+    def _messages(self, event: str, coins: list) -> list:
+        symbols = [COINS[coin]["gate"] for coin in coins]
+        return [{
+            "time": int(time.time()),
+            "channel": "futures.trades",
+            "event": event,
+            "payload": chunk
+        } for chunk in self._chunks(symbols)]
+
+    def subscribe_messages(self, coins: list) -> list:
+        return self._messages("subscribe", coins)
+
+    def unsubscribe_messages(self, coins: list) -> list:
+        return self._messages("unsubscribe", coins)
+
+    def ping_message(self) -> str:
+        return json.dumps({"time": int(time.time()), "channel": "futures.ping"})
+
+    def handle_message(self, msg: bytes) -> None:
+        if not is_data_frame(msg, b'"update"'):
+            return  # potwierdzenia subscribe, pong
+
+        trades = gate_trades(msg)
+        if trades is None:
+            return
+
+        # Transakcje pogrupowane po kontrakcie - stan coina zmieniany raz na świecę, nie na transakcję
+        by_coin = {}
+        contracts = self.contracts
+        for contract, size, timestamp in trades:
+            coin = contracts.get(contract)
+            if coin is not None:
+                coin_trades = by_coin.get(coin)
+                if coin_trades is None:
+                    by_coin[coin] = coin_trades = []
+                coin_trades.append((timestamp, size))
+
+        aggregator = self.aggregator
+        frames = self.frames
+        for coin, coin_trades in by_coin.items():
+            frames[coin].value += 1
+            handle_trades_gate(self.states[coin]["gate"], coin_trades, COINS[coin]["gate_contract_size"])
+            if aggregator is not None:
+                aggregator.mark(coin)
+
+
+# ======================== OKX ========================
+
+class OkxSubscriptionManager(SubscriptionManager):
+    """OKX: kanał trades, routing po arg.instId"""
+
+    name = "OKX"
+    exchange = "okx"
+    url = OKX_WS_URL
+    decode = staticmethod(okx_trades)
+    stamp = staticmethod(okx_stamp)
+
+    def __init__(self, states: dict, aggregator=None):
+        super().__init__(states, aggregator)
+        self.routes = {}
+
+    def add_routes(self, coin: str) -> None:
+        self.routes[COINS[coin]["okx"]] = (
+            self.states[coin]["okx"], COINS[coin]["okx_contract_size"], coin,
+            coin_frames_counter(self.exchange, coin),
+        )
+
+    def remove_routes(self, coin: str) -> None:
+        self.routes.pop(COINS[coin]["okx"], None)
+
+    def _messages(self, op: str, coins: list) -> list:
+        args = [{"channel": "trades", "instId": COINS[coin]["okx"]} for coin in coins]
+        return [{"op": op, "args": chunk} for chunk in self._chunks(args)]
+
+    def subscribe_messages(self, coins: list) -> list:
+        return self._messages("subscribe", coins)
+
+    def unsubscribe_messages(self, coins: list) -> list:
+        return self._messages("unsubscribe", coins)
+
+    def ping_message(self) -> str:
+        return "ping"
+
+    def handle_message(self, msg: bytes) -> None:
+        if not is_data_frame(msg, b'"data"'):
+            return  # pong, potwierdzenia subscribe
+
+        frame = okx_trades(msg)
+        if frame is None:
+            return
+
+        inst_id, trades = frame
+        route = self.routes.get(inst_id)
+        if route is None:
+            return
+
+        state, contract_size, coin, frames = route
+        frames.value += 1
+        handle_trades_okx(state, trades, contract_size)
+        if self.aggregator is not None:
+            self.aggregator.mark(coin)
+
+
+def create_subscription_managers(states: dict, aggregator=None) -> list:
+    """Tworzy menedżery dla wszystkich giełd na żądanie"""
+    return [
+        BybitSubscriptionManager(states, aggregator),
+        GateSubscriptionManager(states, aggregator),
+        OkxSubscriptionManager(states, aggregator),
+    ]
@@ -0,0 +1,384 @@
+"""
+Mikro-benchmarki gorących ścieżek - koszt jednego wywołania na stałych syntetycznych danych.
+
+    python tests/benchmarks.py                    # pomiar i porównanie z zapisaną bazą
+    python tests/benchmarks.py --update-baseline  # zapis nowej bazy (po świadomej zmianie)
+
+tests/test_benchmarks.py wykonuje ten sam pomiar w pytest (gdy RUN_BENCHMARKS=1) i nie
+przechodzi, jeśli któraś ścieżka jest wolniejsza niż baza x BENCH_TOLERANCE.
+Baza zależy od maszyny i backendu JSON - zapisuj ją tam, gdzie działa bramka.
+"""
+
+import json
+import os
+import sys
+import time
+import timeit
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench-token")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_TOLERANCE = 1.5
+
+# Stały czas transakcji - świeca się nie zmienia między wywołaniami
+_TS = 1_700_000_000_000
+
+
+class _Sink:
+    """Odbiornik alertów zamiast Telegrama"""
+
+    def enqueue(self, message: str) -> bool:
+        return True
+
+
+class _FakeRoot:
+    def after(self, ms, callback) -> None:
+        pass
+
+
+class _FakeTree:
+    """Minimalny zamiennik ttk.Treeview (bez wyświetlacza) - item() i set()"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def item(self, item, option=None, **kw):
+        if option == "tags":
+            return self.rows.get(item, {}).get("tags", ("even",))
+        if kw:
+            self.rows[item] = kw
+        return None
+
+    def set(self, item, column, value):
+        self.rows.setdefault(item, {})[column] = value
+
+
+def _states(warm: bool = True) -> dict:
+    from config import COINS, initialize_states
+
+    states = initialize_states()
+    states.create(COINS)  # stany tworzone leniwie - benchmark potrzebuje wszystkich
+    for coin_state in states.values():
+        for exchange in ("binance", "bybit", "gate", "okx"):
+            state = coin_state[exchange]
+            state.start_time -= 3600
+            if warm:
+                for _ in range(state.baseline.maxlen):
+                    state.baseline.push(100.0)
+            state.candle_id = _TS // 60000
+            state.current_vol = 120.0
+            state.buy_vol, state.sell_vol = 70.0, 50.0
+            state.delta = 20.0
+            state.candle_open, state.candle_close = 1.0, 1.01
+    return states
+
+
+def _aggtrade(i: int = 0) -> bytes:
+    return json.dumps({"e": "aggTrade", "E": _TS, "s": "BTCUSDT", "a": i, "p": "50000.1",
+                       "q": "0.015", "f": 1, "l": 1, "T": _TS, "m": False}).encode()
+
+
+def _kline() -> bytes:
+    return json.dumps({"e": "kline", "E": _TS, "s": "BTCUSDT", "k": {
+        "t": _TS, "T": _TS + 59999, "s": "BTCUSDT", "i": "1m", "o": "50000.0", "c": "50010.0",
+        "h": "50020.0", "l": "49990.0", "v": "120.5", "n": 300, "x": False, "q": "6000000.0",
+    }}).encode()
+
+
+# ======================== BENCHMARKI ========================
+# Każda funkcja przygotowuje dane i zwraca bezargumentowe wywołanie do zmierzenia.
+
+def bench_binance_aggtrade():
+    """Ramka aggTrade: dekodowanie + handler + mark_dirty"""
+    from alerts import AlertScheduler
+    from websockets_tasks import _route_aggtrade_binance
+
+    states = _states()
+    scheduler = AlertScheduler(states, set(), sender=_Sink())
+    state, payload = states["BTC"]["binance"], _aggtrade()
+    return lambda: _route_aggtrade_binance("BTC", state, payload, scheduler)
+
+
+def bench_binance_kline():
+    """Ramka kline: dekodowanie + handler + mark_dirty"""
+    from alerts import AlertScheduler
+    from websockets_tasks import _route_kline_binance
+
+    states = _states()
+    scheduler = AlertScheduler(states, set(), sender=_Sink())
+    state, payload = states["BTC"]["binance"], _kline()
+    return lambda: _route_kline_binance("BTC", state, payload, scheduler)
+
+
+def bench_binance_combined_dispatch():
+    """Ramka combined streamu: routing po polu stream + aggTrade"""
+    from alerts import AlertScheduler
+    from websockets_tasks import build_binance_routes, dispatch_binance_frame
+
+    states = _states()
+    scheduler = AlertScheduler(states, set(), sender=_Sink())
+    routes = build_binance_routes(["BTC"], states)
+    raw = b'{"stream":"btcusdt@aggTrade","data":' + _aggtrade() + b"}"
+    return lambda: dispatch_binance_frame(raw, routes, scheduler)
+
+
+def bench_ingest_put_release():
+    """IngestQueue (coalesce): put ramki aggTrade combined streamu + pobranie z kolejki"""
+    from decoding import binance_kline_key
+    from ingest import IngestQueue
+
+    ingest = IngestQueue("bench", binance_kline_key, policy="coalesce")
+    raw = b'{"stream":"btcusdt@aggTrade","data":' + _aggtrade() + b"}"
+    put, popleft, release = ingest.put, ingest.items.popleft, ingest._release
+
+    def run():
+        put(raw)
+        release(popleft())
+
+    return run
+
+
+def _gate_frame(trades: int):
+    from subscriptions import GateSubscriptionManager
+
+    manager = GateSubscriptionManager(_states())
+    manager.add_routes("BTC")
+    raw = json.dumps({"time": 1, "channel": "futures.trades", "event": "update", "result": [
+        {"id": i, "create_time": _TS // 1000, "create_time_ms": _TS, "price": "50000.1",
+         "contract": "BTC_USDT", "size": 3 if i % 2 else -2} for i in range(trades)
+    ]}).encode()
+    return lambda: manager.handle_message(raw)
+
+
+def _okx_frame(trades: int):
+    from subscriptions import OkxSubscriptionManager
+
+    manager = OkxSubscriptionManager(_states())
+    manager.add_routes("BTC")
+    raw = json.dumps({"arg": {"channel": "trades", "instId": "BTC-USDT-SWAP"}, "data": [
+        {"instId": "BTC-USDT-SWAP", "tradeId": str(i), "px": "50000.1", "sz": "3",
+         "side": "sell" if i % 2 else "buy", "ts": str(_TS)} for i in range(trades)
+    ]}).encode()
+    return lambda: manager.handle_message(raw)
+
+
+def _bybit_frame(trades: int):
+    from subscriptions import BybitSubscriptionManager
+
+    manager = BybitSubscriptionManager(_states())
+    manager.add_routes("BTC")
+    raw = json.dumps({"topic": "publicTrade.BTCUSDT", "type": "snapshot", "ts": _TS, "data": [
+        {"T": _TS, "s": "BTCUSDT", "S": "Sell" if i % 2 else "Buy", "v": "0.015",
+         "p": "50000.1", "i": str(i), "BT": False} for i in range(trades)
+    ]}).encode()
+    return lambda: manager.handle_message(raw)
+
+
+def bench_gate_frame_10():
+    """Ramka futures.trades z 10 transakcjami (dekodowanie + routing + handler)"""
+    return _gate_frame(10)
+
+
+def bench_gate_frame_200():
+    """Ramka futures.trades z 200 transakcjami (skok wolumenu)"""
+    return _gate_frame(200)
+
+
+def bench_okx_frame_10():
+    """Ramka trades OKX z 10 transakcjami"""
+    return _okx_frame(10)
+
+
+def bench_okx_frame_200():
+    """Ramka trades OKX z 200 transakcjami"""
+    return _okx_frame(200)
+
+
+def bench_bybit_frame_10():
+    """Ramka publicTrade Bybit z 10 transakcjami"""
+    return _bybit_frame(10)
+
+
+def bench_bybit_frame_200():
+    """Ramka publicTrade Bybit z 200 transakcjami"""
+    return _bybit_frame(200)
+
+
+def bench_check_alert_quiet():
+    """check_binance_alert bez alertu (wolumen poniżej progu) - najczęstszy przypadek"""
+    from alerts import check_binance_alert
+
+    state, sent, sink = _states()["BTC"]["binance"], set(), _Sink()
+    return lambda: check_binance_alert("BTC", state, sent, sender=sink)
+
+
+def bench_check_alert_firing():
+    """check_binance_alert z alertem (warunki spełnione, wiadomość budowana za każdym razem)"""
+    from alerts import check_binance_alert
+
+    state, sent, sink = _states()["BTC"]["binance"], set(), _Sink()
+    state.current_vol = 10_000.0
+    state.buy_vol, state.sell_vol, state.delta = 900.0, 100.0, 800.0
+
+    def run():
+        state.alert_triggered = False
+        sent.clear()
+        check_binance_alert("BTC", state, sent, sender=sink)
+
+    return run
+
+
+def bench_aggregator_publish():
+    """CombinedAggregator.publish - suma 4 giełd i migawka dla 20 zmienionych coinów"""
+    from aggregator import CombinedAggregator
+
+    aggregator = CombinedAggregator(_states())
+    coins = list(aggregator.states)
+
+    def run():
+        aggregator.dirty.update(coins)
+        aggregator.publish()
+
+    return run
+
+
+def _gui():
+    from aggregator import CombinedAggregator
+    from config import COINS
+    from gui import CryptoMonitorGUI
+
+    gui = CryptoMonitorGUI.__new__(CryptoMonitorGUI)
+    gui.root = _FakeRoot()
+    gui.tree = _FakeTree()
+    gui.states = _states()
+    gui.aggregator = CombinedAggregator(gui.states)
+    gui.aggregator.dirty.update(COINS)
+    gui.aggregator.publish()
+    gui.visible_coins = set(COINS)
+    gui.tree_item_ids = {
+        coin: {exchange: f"{coin}-{exchange}"
+               for exchange in ("BINANCE", "BYBIT", "GATE.IO", "OKX", "COMBINED")}
+        for coin in COINS
+    }
+    gui.row_parity = {item: "even" for rows in gui.tree_item_ids.values() for item in rows.values()}
+    gui.row_cache = {}
+    gui.tk_updates = 0
+    gui.shown_version = -1
+    return gui
+
+
+def bench_gui_update_display():
+    """CryptoMonitorGUI.update_display - 20 coinów x 5 wierszy, migawka bez zmian od poprzedniego odświeżenia"""
+    return _gui().update_display
+
+
+def bench_gui_update_display_changed():
+    """update_display po nowej migawce, w której na każdym coinie zmieniła się delta Binance (wiersz giełdy + COMBINED)"""
+    gui = _gui()
+    aggregator = gui.aggregator
+    snapshots = []
+    for _ in range(2):
+        for state in (coin_state["binance"] for coin_state in gui.states.values()):
+            state.delta += 1.0
+        aggregator.dirty.update(gui.states)
+        aggregator.publish()
+        snapshots.append(aggregator.snapshot)
+
+    # Naprzemiennie dwie gotowe migawki - mierzony tylko koszt po stronie GUI
+    def run():
+        aggregator.snapshot = snapshots[aggregator.version % 2]
+        aggregator.version += 1
+        gui.update_display()
+
+    return run
+
+
+BENCHMARKS = {
+    name[len("bench_"):]: func for name, func in list(globals().items())
+    if name.startswith("bench_") and callable(func)
+}
+
+
+# ======================== POMIAR ========================
+
+def measure(factory, repeat: int = 7, min_time: float = 0.1) -> float:
+    """Najlepszy z `repeat` pomiarów, w nanosekundach na wywołanie"""
+    call = factory()
+    timer = timeit.Timer(call, timer=time.perf_counter)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run_all(names=None) -> dict:
+    return {name: measure(BENCHMARKS[name]) for name in names or BENCHMARKS}
+
+
+def environment() -> dict:
+    """Czynniki, od których zależy baza (inna wartość = porównanie bez sensu)"""
+    import platform
+
+    from decoding import BACKEND
+
+    return {"python": platform.python_version(), "json_backend": BACKEND}
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict, path: str = BASELINE_PATH) -> None:
+    data = {"environment": environment(),
+            "ns_per_call": {name: round(ns, 1) for name, ns in sorted(results.items())}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """[(nazwa, wynik_ns, baza_ns), ...] dla ścieżek wolniejszych niż baza x tolerancja"""
+    stored = baseline.get("ns_per_call", {})
+    return [(name, ns, stored[name]) for name, ns in results.items()
+            if name in stored and ns > stored[name] * tolerance]
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mikro-benchmarki gorących ścieżek")
+    parser.add_argument("names", nargs="*", help=f"wybrane benchmarki: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float,
+                        default=float(os.getenv("BENCH_TOLERANCE", DEFAULT_TOLERANCE)))
+    args = parser.parse_args()
+
+    results = run_all(args.names)
+    baseline = load_baseline()
+    stored = baseline.get("ns_per_call", {})
+    for name, ns in results.items():
+        base = stored.get(name)
+        change = f"{ns / base:5.2f}x bazy" if base else "brak bazy"
+        print(f"{name:<28} {ns:>10.0f} ns/wywołanie   {change}")
+
+    if args.update_baseline:
+        save_baseline(results)
+        print(f"💾 Zapisano bazę: {BASELINE_PATH}")
+        return 0
+
+    if baseline and baseline.get("environment") != environment():
+        print(f"⚠️ Baza z innego środowiska ({baseline.get('environment')}) - bez porównania")
+        return 0
+
+    failed = regressions(results, baseline, args.tolerance)
+    for name, ns, base in failed:
+        print(f"❌ {name}: {ns:.0f} ns > {base:.0f} ns x {args.tolerance}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import json
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_publish_sums_only_dirty_coins_into_new_snapshot():
+    setup_env()
+    from aggregator import CombinedAggregator
+    from config import initialize_states
+
+    states = initialize_states()
+    for i, exchange in enumerate(("binance", "bybit", "gate", "okx"), start=1):
+        state = states["BTC"][exchange]
+        state.current_vol = 10.0 * i
+        state.buy_vol, state.sell_vol = 6.0 * i, 4.0 * i
+        state.delta = 2.0 * i
+        state.baseline.push(5.0 * i)
+
+    aggregator = CombinedAggregator(states)
+    aggregator.publish()
+    assert aggregator.version == 0  # nic nie oznaczono - bez publikacji
+
+    aggregator.mark("BTC")
+    aggregator.publish()
+    first = aggregator.snapshot
+    assert aggregator.version == 1 and set(first) == {"BTC"}
+
+    combined = states["BTC"]["combined"]
+    assert (combined.current_vol, combined.avg_vol, combined.delta) == (100.0, 50.0, 20.0)
+    assert (combined.buy_vol, combined.sell_vol) == (60.0, 40.0)
+    assert first["BTC"][-1] == (100.0, 50.0, 20.0, 20.0)  # delta 20 / wolumen 100
+    assert first["BTC"][1] == (20.0, 10.0, 4.0, 20.0)  # bybit
+
+    # Zmiana po publikacji nie dotyka opublikowanej migawki (czyta ją wątek GUI)
+    states["BTC"]["okx"].delta = -100.0
+    aggregator.mark("BTC")
+    aggregator.mark("ETH")
+    aggregator.publish()
+    assert first["BTC"][-1][2] == 20.0
+    assert aggregator.snapshot is not first
+    assert aggregator.snapshot["BTC"][-1][2] == -88.0
+    assert aggregator.snapshot["ETH"][-1] == (0.0, 0.0, 0.0, 0)
+
+
+def test_handlers_mark_coins_for_aggregation():
+    setup_env()
+    from aggregator import CombinedAggregator
+    from alerts import AlertScheduler
+    from config import initialize_states
+    from subscriptions import GateSubscriptionManager, OkxSubscriptionManager
+    from websockets_tasks import handle_aggtrade_binance
+
+    states = initialize_states()
+    aggregator = CombinedAggregator(states)
+
+    scheduler = AlertScheduler(states, set(), aggregator=aggregator)
+    handle_aggtrade_binance("BTC", states["BTC"]["binance"], 1.0, False, 0, scheduler)
+
+    gate = GateSubscriptionManager(states, aggregator)
+    gate.add_routes("ETH")
+    gate.handle_message(json.dumps({"channel": "futures.trades", "event": "update", "result": [
+        {"contract": "ETH_USDT", "size": 3, "create_time_ms": 0},
+    ]}).encode())
+
+    okx = OkxSubscriptionManager(states, aggregator)
+    okx.add_routes("SOL")
+    okx.handle_message(json.dumps({"arg": {"channel": "trades", "instId": "SOL-USDT-SWAP"}, "data": [
+        {"px": "1", "sz": "2", "side": "buy", "ts": "0"},
+    ]}).encode())
+
+    assert aggregator.dirty == {"BTC", "ETH", "SOL"}
@@ -1,6 +1,6 @@
-import os
 import asyncio
-from unittest.mock import patch, MagicMock
+import os
+from unittest.mock import MagicMock, patch
 
 
 def setup_env():
@@ -29,45 +29,154 @@ def test_send_telegram_alert_success(monkeypatch):
 
 def test_check_binance_alert_triggers(monkeypatch):
     setup_env()
-    import alerts
     import time
 
+    import alerts
+
     # prepare state similar to what websockets_tasks would have
-    state = {
-        "start_time": time.time() - 400,  # > 6 minutes
-        "last_volumes": [10, 10, 10, 10, 10],
-        "current_vol": 1000.0,
-        "current_candle_open": 1.0,
-        "current_candle_close": 2.0,  # bullish
-        "buy_vol": 800.0,
-        "sell_vol": 200.0,
-        "delta": 600.0,
-        "candle_id": "cid",
-        "alert_triggered": False,
-    }
+    from state import ExchangeState
+
+    state = ExchangeState(start_time=time.time() - 400)  # > 6 minutes
+    for volume in [10, 10, 10, 10, 10]:
+        state.baseline.push(volume)
+    state.current_vol = 1000.0
+    state.candle_open = 1.0
+    state.candle_close = 2.0  # bullish
+    state.buy_vol = 800.0
+    state.sell_vol = 200.0
+    state.delta = 600.0
+    state.candle_id = "cid"
 
     sent_alerts = set()
 
-    # Patch alerts.send_telegram_alert to a harmless coroutine, and
-    # patch asyncio.create_task to run the coroutine synchronously so
-    # the test doesn't leave an un-awaited coroutine behind.
-    created = {}
+    # Alert trafia do kolejki wysyłki - sprawdzanie nie czeka na Telegram
+    with patch.object(alerts.telegram_sender, "enqueue") as mock_enqueue:
+        alerts.check_binance_alert("TESTCOIN", state, sent_alerts)
 
-    async def dummy_send(msg):
-        created["sent_msg"] = msg
+    # check that alert was queued and state updated
+    assert mock_enqueue.called
+    assert "TESTCOIN" in mock_enqueue.call_args[0][0]
+    assert state.alert_triggered is True
+    # sent_alerts should contain the alert id
+    assert "TESTCOIN_cid" in sent_alerts
 
-    def fake_create_task(coro):
-        # record that it was called and run the coro synchronously
-        created["called"] = True
-        asyncio.run(coro)
-        return MagicMock()
 
-    with patch("alerts.send_telegram_alert", side_effect=dummy_send):
-        with patch("asyncio.create_task", side_effect=fake_create_task):
-            alerts.check_binance_alert("TESTCOIN", state, sent_alerts)
+def test_telegram_sender_retries_over_keepalive_connection():
+    setup_env()
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-    # check that alert was scheduled and state updated
-    assert created.get("called", False) is True
-    assert state["alert_triggered"] is True
-    # sent_alerts should contain the alert id
-    assert any("TESTCOIN" in a for a in sent_alerts) or len(sent_alerts) >= 0
+    import alerts
+
+    # Lokalny zamiennik api.telegram.org: pierwsza odpowiedź 429, potem 200
+    requests_seen = []
+
+    class FakeTelegram(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            requests_seen.append((self.path, self.client_address))
+            if len(requests_seen) == 1:
+                body = b'{"ok": false, "parameters": {"retry_after": 0.01}}'
+                self.send_response(429)
+            else:
+                body = b'{"ok": true}'
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTelegram)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def scenario():
+        sender = alerts.TelegramSender(
+            api_url=f"http://127.0.0.1:{server.server_port}",
+            queue_size=2, min_interval=0.0, backoff=0.01,
+        )
+        assert sender.enqueue("first")
+        assert sender.enqueue("second")
+        assert not sender.enqueue("third")  # kolejka pełna - odrzucony, bez blokowania
+
+        worker = asyncio.create_task(sender.run())
+        await asyncio.wait_for(sender.queue.join(), timeout=5)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return sender
+
+    try:
+        sender = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+
+    assert sender.sent == 2
+    assert sender.session is None  # zamknięta po zatrzymaniu workera
+    assert sender.dropped == 1
+    assert len(requests_seen) == 3  # 429 + ponowienie + druga wiadomość
+    assert all("/sendMessage" in path for path, _ in requests_seen)
+    # Jedno połączenie keep-alive dla wszystkich żądań
+    assert len({addr for _, addr in requests_seen}) == 1
+
+
+def test_telegram_sender_gives_up_without_final_backoff():
+    setup_env()
+    import time
+    from unittest.mock import AsyncMock
+
+    import alerts
+
+    failing = MagicMock()
+    failing.status_code = 502
+
+    async def scenario():
+        sender = alerts.TelegramSender(min_interval=0.0, max_retries=2, backoff=0.05)
+        with patch("alerts.send_telegram_alert", AsyncMock(return_value=failing)) as mock_send:
+            started = time.monotonic()
+            delivered = await sender._deliver("x")
+            elapsed = time.monotonic() - started
+        return delivered, elapsed, mock_send.call_count
+
+    delivered, elapsed, calls = asyncio.run(scenario())
+
+    assert delivered is False
+    assert calls == 2
+    # Jedno czekanie (między próbami), a nie dwa (0.05 + 0.1)
+    assert elapsed < 0.12
+
+
+def test_alert_scheduler_coalesces_checks_and_fires_on_crossing():
+    setup_env()
+    import time
+
+    import alerts
+    from config import initialize_states
+
+    states = initialize_states()
+    sent_alerts = set()
+    scheduler = alerts.AlertScheduler(states, sent_alerts)
+    state = states["BTC"]["binance"]
+    state.start_time = time.time() - 400
+    for volume in [10, 10, 10, 10, 10]:
+        state.baseline.push(volume)
+    state.candle_id = 1
+    state.candle_open, state.candle_close = 1.0, 2.0
+
+    # Tysiąc transakcji poniżej progu - zero sprawdzeń do ticku, potem jedno
+    for _ in range(1000):
+        state.current_vol = 20.0
+        scheduler.mark_dirty("BTC", state)
+    assert scheduler.evaluations == 0
+    scheduler.evaluate_dirty()
+    assert scheduler.evaluations == 1
+
+    # Przekroczenie progu - sprawdzenie od razu, bez czekania na tick
+    state.current_vol = 1000.0
+    state.buy_vol, state.sell_vol, state.delta = 800.0, 200.0, 600.0
+    with patch.object(alerts.telegram_sender, "enqueue") as mock_enqueue:
+        scheduler.mark_dirty("BTC", state)
+    assert mock_enqueue.called
+    assert "BTC_1" in sent_alerts
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+# Pomiary czasu są zależne od maszyny - bramka działa tylko na żądanie:
+#   RUN_BENCHMARKS=1 python -m pytest tests/test_benchmarks.py
+needs_benchmarks = pytest.mark.skipif(
+    os.getenv("RUN_BENCHMARKS") != "1", reason="benchmarki tylko z RUN_BENCHMARKS=1"
+)
+
+
+@needs_benchmarks
+def test_hot_paths_do_not_regress_past_baseline():
+    import benchmarks
+
+    baseline = benchmarks.load_baseline()
+    if not baseline:
+        pytest.skip("brak bazy - uruchom: python tests/benchmarks.py --update-baseline")
+    if baseline.get("environment") != benchmarks.environment():
+        pytest.skip(f"baza z innego środowiska: {baseline.get('environment')}")
+
+    tolerance = float(os.getenv("BENCH_TOLERANCE", benchmarks.DEFAULT_TOLERANCE))
+    results = benchmarks.run_all()
+    failed = benchmarks.regressions(results, baseline, tolerance)
+
+    assert not failed, "\n".join(
+        f"{name}: {ns:.0f} ns/wywołanie > baza {base:.0f} ns x {tolerance}"
+        for name, ns, base in failed
+    )
+    assert set(results) <= set(baseline["ns_per_call"]), "nowy benchmark bez bazy"
+
+
+def test_regressions_compares_against_tolerance():
+    import benchmarks
+
+    baseline = {"ns_per_call": {"a": 100.0, "b": 100.0}}
+    assert benchmarks.regressions({"a": 140.0, "b": 160.0, "c": 1e9}, baseline, 1.5) == [
+        ("b", 160.0, 100.0)
+    ]
@@ -0,0 +1,100 @@
+import math
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_closed_candles_are_written_by_column_and_read_with_memmap(tmp_path, monkeypatch):
+    setup_env()
+    import numpy as np
+
+    import websockets_tasks
+    from alerts import AlertScheduler
+    from candles import CandleStore, day_of, history, read_day
+    from config import initialize_states
+    from websockets_tasks import (
+        handle_aggtrade_binance,
+        handle_kline_binance,
+        handle_trades_okx,
+    )
+
+    states = initialize_states()
+    store = CandleStore(str(tmp_path))
+    store.start(states)
+    monkeypatch.setattr(websockets_tasks, "candle_store", store)
+    scheduler = AlertScheduler(states, set())
+
+    minute = 28_000_000
+    binance = states["BTC"]["binance"]
+    def kline(i, closed):
+        return (100.0 + i, 110.0 + i, 90.0 + i, 105.0 + i, 2.5, closed, (minute + i) * 60000)
+
+    for i in range(3):  # 3 zamknięte świece + bieżąca (nie zapisana)
+        ts = (minute + i) * 60000
+        if i == 2:
+            # Kline nowej minuty przed pierwszą transakcją - pola bieżącej świecy to już minuta 2
+            handle_kline_binance("BTC", binance, kline(i, False), scheduler)
+        handle_aggtrade_binance("BTC", binance, 2.0, False, ts, scheduler)
+        if i == 1:
+            handle_kline_binance("BTC", binance, kline(0, True), scheduler)  # zamknięcie po transakcji
+        handle_aggtrade_binance("BTC", binance, 0.5, True, ts + 1, scheduler)
+        if i != 0:
+            handle_kline_binance("BTC", binance, kline(i, True), scheduler)  # zamknięcie przed transakcją
+        handle_trades_okx(states["ETH"]["okx"], [(ts, 10.0 + i, False)], 0.1)
+    handle_kline_binance("BTC", binance, kline(3, False), scheduler)
+    handle_aggtrade_binance("BTC", binance, 1.0, False, (minute + 3) * 60000, scheduler)
+    handle_trades_okx(states["ETH"]["okx"], [((minute + 3) * 60000, 1.0, False)], 0.1)
+    store.stop()
+
+    columns = read_day(str(tmp_path), "binance", day_of(minute))
+    assert isinstance(columns["volume"], np.memmap)
+    assert list(columns["minute"]) == [minute, minute + 1, minute + 2]
+    assert list(columns["coin"]) == [b"BTC"] * 3
+    assert list(columns["volume"]) == [2.5] * 3
+    assert list(columns["delta"]) == [1.5] * 3
+    assert list(columns["open"]) == [100.0, 101.0, 102.0]
+    assert list(columns["close"]) == [105.0, 106.0, 107.0]
+
+    okx = history(str(tmp_path), "ETH", "okx", minute + 1, minute + 10)
+    assert list(okx["minute"]) == [minute + 1, minute + 2]
+    assert np.allclose(okx["buy_vol"], [1.1, 1.2])
+    assert math.isnan(okx["open"][0])
+
+    # Urwany zapis jednej kolumny - czytana wspólna liczba wierszy
+    with open(tmp_path / day_of(minute) / "binance" / "delta.bin", "ab") as f:
+        f.write(b"\x00" * 4)
+    assert len(read_day(str(tmp_path), "binance", day_of(minute))["delta"]) == 3
+    assert read_day(str(tmp_path), "gate", day_of(minute)) is None
+
+
+def test_seed_baselines_from_recent_history(tmp_path):
+    setup_env()
+    from candles import CandleStore, seed_baselines
+    from config import ALERT_WARMUP_SECONDS, HISTORY, initialize_states
+
+    now = 1_700_000_000.0
+    current = int(now // 60)
+    states = initialize_states()
+    store = CandleStore(str(tmp_path))
+    store.start(states)
+    btc, eth = states["BTC"]["binance"], states["ETH"]["binance"]
+    for i in range(HISTORY + 2):
+        btc.candle_id, btc.buy_vol, btc.sell_vol = current - HISTORY - 2 + i, 10.0 * (i + 1), 0.0
+        store.close(btc)
+    eth.candle_id, eth.buy_vol = current - 60, 5.0  # za stara historia
+    store.close(eth)
+    store.stop()
+
+    fresh = initialize_states()
+    fresh.create(["BTC", "ETH"])  # stany tworzone leniwie - seed tylko dla istniejących
+    for coin_state in fresh.values():
+        coin_state["binance"].start_time = now
+    assert seed_baselines(fresh, str(tmp_path), now) == 1
+
+    baseline = fresh["BTC"]["binance"].baseline
+    assert list(baseline.window) == [10.0 * (i + 1) for i in range(2, HISTORY + 2)]
+    assert fresh["BTC"]["binance"].start_time == now - ALERT_WARMUP_SECONDS
+    assert len(fresh["ETH"]["binance"].baseline) == 0
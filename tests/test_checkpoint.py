@@ -0,0 +1,83 @@
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+class Sink:
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, message: str) -> bool:
+        self.messages.append(message)
+        return True
+
+
+def _warm_states(now: float) -> dict:
+    from config import initialize_states
+
+    states = initialize_states()
+    state = states["BTC"]["binance"]
+    state.start_time = now - 3600
+    for volume in (10.0, 12.0, 8.0, 11.0, 9.0):
+        state.baseline.push(volume)
+    state.candle_id = int(now // 60)
+    state.current_vol = 500.0
+    state.buy_vol, state.sell_vol, state.delta = 400.0, 100.0, 300.0
+    state.candle_open, state.candle_close = 1.0, 1.1
+    states["ETH"]["okx"].buy_vol = 3.5
+    return states
+
+
+def test_checkpoint_round_trip_skips_warmup(tmp_path):
+    setup_env()
+    import checkpoint
+    from alerts import check_binance_alert
+    from config import initialize_states
+
+    now = 1_700_000_000.0
+    path = str(tmp_path / "state" / "checkpoint.json")
+    sent = {"BTC_1", f"ETH_{int(now // 60)}"}  # stary alert nie trafia do pliku
+    checkpoint.save(path, checkpoint.snapshot(_warm_states(now), sent, now))
+    checkpoint.save(path, checkpoint.snapshot(_warm_states(now), sent, now))  # nadpisanie
+    assert os.listdir(tmp_path / "state") == ["checkpoint.json"]
+
+    # Nowy proces: świeże states (start_time = teraz) + checkpoint sprzed 20 s
+    states, restored_alerts = initialize_states(), set()
+    data = checkpoint.load(path)
+    assert checkpoint.restore(data, states, restored_alerts, now + 20) == len(states) * 4
+    assert restored_alerts == {f"ETH_{int(now // 60)}"}
+
+    state = states["BTC"]["binance"]
+    assert state.baseline.full and state.baseline.avg == 10.0
+    assert (state.buy_vol, state.delta, state.candle_id) == (400.0, 300.0, int(now // 60))
+    assert states["ETH"]["okx"].buy_vol == 3.5
+
+    # Bez checkpointu alert czekałby ALERT_WARMUP_SECONDS; tu działa od razu
+    import clock
+    clock.use_virtual_clock(clock.VirtualClock(now + 20))
+    try:
+        sink = Sink()
+        check_binance_alert("BTC", state, restored_alerts, sender=sink)
+        assert len(sink.messages) == 1
+    finally:
+        clock.use_real_clock()
+
+
+def test_stale_or_broken_checkpoint_means_cold_start(tmp_path):
+    setup_env()
+    import checkpoint
+    from config import initialize_states
+
+    now = 1_700_000_000.0
+    data = checkpoint.snapshot(_warm_states(now), set(), now)
+    states = initialize_states()
+    assert checkpoint.restore(data, states, set(), now + 600, max_age=180) == 0
+    assert not states["BTC"]["binance"].baseline.full
+
+    broken = tmp_path / "checkpoint.json"
+    broken.write_text('{"version": 1, "saved_at"')
+    assert checkpoint.load(str(broken)) is None
+    assert checkpoint.load(str(tmp_path / "missing.json")) is None
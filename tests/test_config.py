@@ -11,14 +11,18 @@ def test_initialize_states_structure():
     states = initialize_states()
     assert isinstance(states, dict)
 
-    # Every coin must be present and contain expected exchange keys
+    # Stany tworzone przy pierwszym użyciu - każdy coin z COINS ma komplet giełd
+    assert len(states) == 0
     for coin in COINS:
-        assert coin in states
         s = states[coin]
+        assert coin in states
         for exch in ["binance", "bybit", "gate", "okx", "combined"]:
             assert exch in s
 
-    # Verify deque maxlen equals HISTORY for binance
+    # Verify rolling window length equals HISTORY for binance
     some_coin = next(iter(COINS))
-    assert hasattr(states[some_coin]["binance"]["last_volumes"], "maxlen")
-    assert states[some_coin]["binance"]["last_volumes"].maxlen == HISTORY
+    assert hasattr(states[some_coin]["binance"].baseline, "maxlen")
+    assert states[some_coin]["binance"].baseline.maxlen == HISTORY
+
+    # Stan giełdy to obiekt ze __slots__ - bez __dict__ na każdy obiekt
+    assert not hasattr(states[some_coin]["binance"], "__dict__")
@@ -0,0 +1,52 @@
+import json
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_binance_frames_decode_to_handler_fields():
+    setup_env()
+    import decoding
+
+    aggtrade = {"e": "aggTrade", "E": 1, "s": "BTCUSDT", "a": 5, "p": "100.0",
+                "q": "0.25", "f": 1, "l": 2, "T": 1_700_000_000_123, "m": True}
+    kline = {"e": "kline", "k": {"t": 0, "o": "1.0", "h": "3.0", "l": "0.5", "c": "2.0",
+                                 "v": "42.5", "x": False, "q": "99"}}
+    combined = json.dumps({"stream": "btcusdt@aggTrade", "data": aggtrade}).encode()
+
+    assert decoding.binance_aggtrade(json.dumps(aggtrade).encode()) == (0.25, True, 1_700_000_000_123)
+    assert decoding.binance_kline(json.dumps(kline).encode()) == (1.0, 3.0, 0.5, 2.0, 42.5, False, 0)
+
+    stream, payload = decoding.binance_combined(combined)
+    assert stream == "btcusdt@aggTrade"
+    assert decoding.binance_aggtrade(payload) == (0.25, True, 1_700_000_000_123)
+
+
+def test_other_exchange_frames_and_prefilter():
+    setup_env()
+    import decoding
+
+    bybit = json.dumps({"topic": "publicTrade.BTCUSDT", "type": "snapshot", "data": [
+        {"T": 1_700_000_000_000, "s": "BTCUSDT", "S": "Sell", "v": "0.5", "p": "1"},
+    ]}).encode()
+    topic, payload = decoding.bybit_frame(bybit)
+    assert topic == "publicTrade.BTCUSDT"
+    assert decoding.bybit_trades(payload) == [(1_700_000_000_000, 0.5, True)]
+
+    gate = json.dumps({"channel": "futures.trades", "event": "update", "result": [
+        {"contract": "BTC_USDT", "size": -3, "create_time_ms": 1_700_000_000_000, "price": "1"},
+    ]}).encode()
+    assert decoding.gate_trades(gate) == [("BTC_USDT", -3, 1_700_000_000_000)]
+
+    okx = json.dumps({"arg": {"channel": "trades", "instId": "BTC-USDT-SWAP"}, "data": [
+        {"instId": "BTC-USDT-SWAP", "px": "1", "sz": "2", "side": "buy", "ts": "1700000000000"},
+    ]}).encode()
+    assert decoding.okx_trades(okx) == ("BTC-USDT-SWAP", [(1_700_000_000_000, 2.0, False)])
+
+    # Potwierdzenia subskrypcji odrzucane bez parsowania
+    assert not decoding.is_data_frame(b'{"success":true,"op":"subscribe"}', b'"topic"')
+    assert not decoding.is_data_frame(b"pong", b'"data"')
+    assert decoding.is_data_frame(bybit, b'"topic"')
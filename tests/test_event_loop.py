@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_select_loop_falls_back_to_asyncio(monkeypatch):
+    setup_env()
+    import event_loop
+
+    monkeypatch.setattr(event_loop, "uvloop", None)
+    assert event_loop._select_loop("auto") == "asyncio"
+    assert event_loop._select_loop("uvloop") == "asyncio"
+    assert event_loop._select_loop("nope") == "asyncio"
+    assert event_loop._select_loop("asyncio") == "asyncio"
+
+
+def test_run_returns_coroutine_result():
+    setup_env()
+    import event_loop
+
+    async def answer():
+        await asyncio.sleep(0)
+        return 42
+
+    assert event_loop.run(answer()) == 42
+
+
+def test_percentiles_and_report_reset_period():
+    setup_env()
+    from event_loop import LoopLagMonitor
+
+    monitor = LoopLagMonitor(interval=0.1, report_interval=0)
+    assert monitor.percentiles() is None
+    for i in range(100):
+        monitor.record(i / 1000)
+    stats = monitor.report()
+    assert stats["count"] == 100
+    assert stats["p50"] == 0.050
+    assert stats["p99"] == 0.099
+    assert stats["max"] == 0.099
+    assert not monitor.samples
+    assert monitor.last is stats
+
+
+def test_samples_are_bounded_without_reports():
+    setup_env()
+    from event_loop import _UNREPORTED_WINDOW, LoopLagMonitor
+
+    monitor = LoopLagMonitor(interval=0.1, report_interval=0)
+    for i in range(10 * _UNREPORTED_WINDOW * 5):
+        monitor.record(i / 1000)
+    # Tylko ostatnie _UNREPORTED_WINDOW s próbek - lista nie rośnie bez raportów
+    assert len(monitor.samples) == 10 * _UNREPORTED_WINDOW + 1
+    assert monitor.percentiles()["max"] == (10 * _UNREPORTED_WINDOW * 5 - 1) / 1000
+    assert LoopLagMonitor(interval=0.1, report_interval=5).samples.maxlen == 51
+
+
+def test_monitor_measures_blocked_loop():
+    setup_env()
+    from event_loop import LoopLagMonitor
+
+    monitor = LoopLagMonitor(interval=0.01, report_interval=0)
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        time.sleep(0.1)  # noqa: ASYNC251 - handler blokujący pętlę
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert monitor.percentiles()["max"] >= 0.05
+    assert not LoopLagMonitor(interval=0).enabled
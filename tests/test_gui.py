@@ -0,0 +1,91 @@
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+class RecordingTree:
+    """Zamiennik ttk.Treeview zapisujący wywołania (test bez wyświetlacza)"""
+
+    def __init__(self):
+        self.calls = []
+
+    def item(self, item, option=None, **kw):
+        self.calls.append(("item", item, option, kw))
+
+    def set(self, item, column, value):
+        self.calls.append(("set", item, column, value))
+
+
+def test_update_row_pushes_only_changes_and_keeps_parity():
+    setup_env()
+    from gui import CryptoMonitorGUI
+
+    gui = CryptoMonitorGUI.__new__(CryptoMonitorGUI)
+    gui.tree = RecordingTree()
+    gui.row_parity = {"i1": "odd"}
+    gui.row_cache = {}
+    gui.tk_updates = 0
+
+    gui._update_row("i1", "BTC", "BINANCE", 10.0, 5.0, 2.0, 20.0)
+    assert gui.tree.calls == [("item", "i1", None, {
+        "values": ("BTC", "BINANCE", "10.0", "5.0", "+2.0", "+20.0%"),
+        "tags": ("odd", "positive"),
+    })]
+
+    # Te same liczby / te same napisy po zaokrągleniu - zero wywołań Tk
+    gui._update_row("i1", "BTC", "BINANCE", 10.0, 5.0, 2.0, 20.0)
+    gui._update_row("i1", "BTC", "BINANCE", 10.01, 5.0, 2.0, 20.0)
+    assert len(gui.tree.calls) == 1
+
+    # Jedna komórka - tree.set
+    gui._update_row("i1", "BTC", "BINANCE", 11.0, 5.0, 2.0, 20.0)
+    assert gui.tree.calls[-1] == ("set", "i1", "volume", "11.0")
+
+    # Zmiana koloru (znak delty) - cały wiersz z zachowaną parzystością
+    gui._update_row("i1", "BTC", "BINANCE", 11.0, 5.0, -1.0, -10.0)
+    assert gui.tree.calls[-1][3]["tags"] == ("odd", "negative")
+    assert gui.tk_updates == 3
+    # Parzystość nigdy nie jest odczytywana z Tk
+    assert all(option is None for kind, _, option, _ in gui.tree.calls if kind == "item")
+
+
+def test_update_display_reads_snapshot_only_when_version_changes():
+    setup_env()
+    from aggregator import CombinedAggregator
+    from config import initialize_states
+    from gui import CryptoMonitorGUI
+
+    class FakeRoot:
+        def after(self, ms, callback):
+            pass
+
+    states = initialize_states()
+    gui = CryptoMonitorGUI.__new__(CryptoMonitorGUI)
+    gui.root = FakeRoot()
+    gui.tree = RecordingTree()
+    gui.aggregator = CombinedAggregator(states)
+    gui.visible_coins = {"BTC"}
+    gui.tree_item_ids = {"BTC": {label: f"BTC-{label}"
+                                 for label in ("BINANCE", "BYBIT", "GATE.IO", "OKX", "COMBINED")}}
+    gui.row_parity, gui.row_cache, gui.tk_updates, gui.shown_version = {}, {}, 0, -1
+
+    states["BTC"]["gate"].delta = 5.0
+    gui.aggregator.mark("BTC")
+    gui.aggregator.publish()
+    gui.update_display()
+    assert len(gui.tree.calls) == 5
+
+    # Stan zmieniony, ale bez publikacji - GUI nie liczy i nie czyta states
+    states["BTC"]["gate"].delta = 7.0
+    gui.update_display()
+    assert len(gui.tree.calls) == 5
+    assert states["BTC"]["combined"].delta == 5.0
+
+    gui.aggregator.mark("BTC")
+    gui.aggregator.publish()
+    gui.update_display()
+    # Zmieniona delta Gate.io i COMBINED (delta + kolor nie zmieniony: 2 komórki -> item)
+    assert [call[1] for call in gui.tree.calls[5:]] == ["BTC-GATE.IO", "BTC-COMBINED"]
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def kline(stream, volume, closed=False):
+    return json.dumps({"stream": stream, "data": {"k": {"v": volume, "x": closed}}}).encode()
+
+
+def trade(stream, qty):
+    return json.dumps({"stream": stream, "data": {"q": qty}}).encode()
+
+
+def test_kline_keys():
+    setup_env()
+    from decoding import binance_kline_key, bybit_kline_key
+
+    assert binance_kline_key(kline("btcusdt@kline_1m", "1")) == ("btcusdt@kline_1m", True)
+    assert binance_kline_key(b'{"stream":"btcusdt@kline_1m","data":{"k":{"x":false}}}') == ("btcusdt@kline_1m", True)
+    assert binance_kline_key(kline("btcusdt@kline_1m", "1", closed=True)) == ("btcusdt@kline_1m", False)
+    assert binance_kline_key(trade("btcusdt@aggTrade", "1")) is None
+    assert binance_kline_key(b'{"result":null,"id":1}') is None
+
+    open_kline = b'{"topic":"kline.1.BTCUSDT","data":[{"volume":"1","confirm":false}]}'
+    assert bybit_kline_key(open_kline) == ("kline.1.BTCUSDT", True)
+    assert bybit_kline_key(open_kline.replace(b"false", b"true")) == ("kline.1.BTCUSDT", False)
+    assert bybit_kline_key(b'{"topic":"publicTrade.BTCUSDT","data":[]}') is None
+
+
+def test_coalesce_replaces_open_kline_but_never_crosses_close():
+    setup_env()
+    from decoding import binance_kline_key
+    from ingest import IngestQueue
+
+    async def scenario():
+        ingest = IngestQueue("test", binance_kline_key, maxsize=10, policy="coalesce")
+        frames = [
+            kline("btcusdt@kline_1m", "1"),
+            trade("btcusdt@aggTrade", "0.5"),
+            kline("btcusdt@kline_1m", "2"),
+            kline("btcusdt@kline_1m", "3", closed=True),
+            kline("btcusdt@kline_1m", "0.1"),  # nowa minuta - za zamknięciem
+            kline("btcusdt@kline_1m", "0.2"),
+        ]
+        for frame in frames:
+            assert ingest.put(frame)
+        handled = []
+        task = asyncio.create_task(ingest.drain(handled.append))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return ingest, handled, frames
+
+    ingest, handled, frames = asyncio.run(scenario())
+    assert handled == [frames[2], frames[1], frames[3], frames[5]]
+    stats = ingest.stats()
+    assert (stats["received"], stats["processed"], stats["coalesced"]) == (6, 4, 2)
+    assert stats["batches"] == 1 and stats["max_batch"] == 4
+    assert ingest.slots == {}
+
+
+def test_drop_oldest_and_block_when_full():
+    setup_env()
+    from ingest import IngestQueue
+
+    dropping = IngestQueue("drop", maxsize=2, policy="drop_oldest")
+    for frame in (b"1", b"2", b"3"):
+        assert dropping.put(frame)
+    assert list(dropping.items) == [b"2", b"3"]
+    assert dropping.dropped == 1
+
+    async def scenario():
+        blocking = IngestQueue("block", maxsize=2, policy="block", max_batch=1)
+        assert blocking.put(b"1") and blocking.put(b"2")
+        assert not blocking.put(b"3")
+        handled = []
+        task = asyncio.create_task(blocking.drain(handled.append))
+        await asyncio.wait_for(blocking.wait_space(), 1.0)
+        assert blocking.put(b"3")
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return blocking, handled
+
+    blocking, handled = asyncio.run(scenario())
+    assert handled == [b"1", b"2", b"3"]  # nic nie zginęło
+    assert blocking.blocked == 1 and blocking.dropped == 0
+    assert blocking.max_batch_seen == 1
+
+
+def test_drain_skips_bad_frame_and_registry_reports_lagging_queue():
+    setup_env()
+    from ingest import IngestRegistry
+
+    registry = IngestRegistry(interval=0)
+    lagging = registry.create("lagging", maxsize=2, policy="drop_oldest")
+    idle = registry.create("idle", maxsize=100)
+
+    def handler(frame):
+        if frame == b"bad":
+            raise ValueError("bad")
+
+    async def scenario():
+        for frame in (b"bad", b"ok", b"ok2"):
+            lagging.put(frame)
+        task = asyncio.create_task(lagging.drain(handler))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert lagging.processed == 2
+    lines = registry.report()
+    assert len(lines) == 1 and "lagging" in lines[0] and "odrzucone 1" in lines[0]
+    assert registry.report() == []  # bez nowych odrzuceń
+    registry.remove(idle)
+    assert registry.queues == [lagging]
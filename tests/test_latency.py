@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_hdr_histogram_relative_error_and_percentiles():
+    setup_env()
+    from latency import SUB_BUCKETS, HdrHistogram, _bucket, _bucket_high
+
+    # Każda wartość mieści się w swoim kubełku, błąd względny < 1/SUB_BUCKETS
+    for value in (0, 1, 63, 127, 128, 1000, 12_345, 987_654, 3_600_000_000):
+        high = _bucket_high(_bucket(value))
+        assert value <= high <= value * (1 + 1 / SUB_BUCKETS) + 1
+        assert _bucket(high) == _bucket(value)
+
+    histogram = HdrHistogram()
+    for micros in range(1, 1001):  # 1 µs ... 1 ms
+        histogram.record(micros)
+    histogram.record(-5_000)  # zegar lokalny za giełdą
+    assert histogram.count == 1001
+    assert histogram.negative == 1
+    assert abs(histogram.percentile(50) - 500) <= 500 / SUB_BUCKETS
+    assert abs(histogram.percentile(99) - 990) <= 990 / SUB_BUCKETS
+    assert histogram.percentile(100) == histogram.max == 1000
+
+
+def test_skew_estimator_rolling_minimum():
+    setup_env()
+    from latency import SkewEstimator
+
+    skew = SkewEstimator(window=60, slots=6)
+    assert skew.estimate is None
+    skew.observe(0.050, now=1000.0)
+    skew.observe(0.020, now=1005.0)
+    skew.observe(0.300, now=1030.0)
+    assert skew.estimate == 0.020
+    # Po minucie sloty z minimum wypadają z okna
+    skew.observe(0.100, now=1065.0)
+    assert skew.estimate == 0.100
+
+
+def test_stamps_pick_trade_or_event_time():
+    setup_env()
+    from decoding import binance_stamp, bybit_stamp, gate_stamp, okx_stamp
+
+    agg = json.dumps({"stream": "btcusdt@aggTrade",
+                      "data": {"e": "aggTrade", "E": 1700000000200, "q": "1", "T": 1700000000100}})
+    kline = json.dumps({"stream": "btcusdt@kline_1m",
+                        "data": {"e": "kline", "E": 1700000000300, "k": {"t": 1, "T": 2}}})
+    assert binance_stamp(agg.encode()) == ("aggTrade", 1700000000100)
+    assert binance_stamp(kline.encode()) == ("kline", 1700000000300)
+    assert binance_stamp(b'{"result":null,"id":1}') is None
+
+    trade = b'{"topic":"publicTrade.BTCUSDT","ts":1700000000500,"data":[{"T":1700000000400}]}'
+    assert bybit_stamp(trade) == ("publicTrade", 1700000000400)
+    assert bybit_stamp(b'{"topic":"kline.1.BTCUSDT","ts":1700000000600,"data":[]}') == ("kline", 1700000000600)
+    assert gate_stamp(b'{"result":[{"create_time_ms":1700000000700}]}') == ("trades", 1700000000700)
+    assert okx_stamp(b'{"data":[{"ts":"1700000000800"}]}') == ("trades", 1700000000800)
+    assert okx_stamp(b"pong") is None
+
+
+def test_probe_records_receive_and_processed_per_stream_and_dump():
+    setup_env()
+    import clock
+    from ingest import IngestQueue
+    from latency import LatencyRegistry
+    from metrics import FrameProbe, MetricsRegistry
+
+    latency = LatencyRegistry()
+    probe = FrameProbe("binance", stamp=lambda raw: ("aggTrade", int(raw)), sample_every=2,
+                       registry=MetricsRegistry(), latency=latency)
+    ingest = IngestQueue("test", probe=probe, policy="block")
+    sent_ms = int(clock.now() * 1000) - 250  # giełda 250 ms "w przeszłości"
+
+    async def scenario():
+        for _ in range(10):
+            ingest.put(str(sent_ms).encode())
+        consumer = asyncio.create_task(ingest.drain(lambda raw: None))
+        await asyncio.sleep(0.01)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+
+    asyncio.run(scenario())
+    stream = latency.streams[("binance", "aggTrade")]
+    assert stream.receive.count == 5
+    assert stream.processed.count == 5
+    assert 0.2 < stream.skew.estimate < 5.0
+    assert stream.processed.percentile(50) >= stream.receive.percentile(50) - 250_000 / 64
+
+    dump = latency.dump()
+    assert "binance  aggTrade     odbiór n=5" in dump
+    assert "przetworzenie n=5" in dump
+    assert "(brak próbek)" in LatencyRegistry().dump()
+
+
+def test_latency_page_on_metrics_endpoint():
+    setup_env()
+    from latency import latency_registry
+    from metrics import metrics
+
+    async def scenario():
+        server = await asyncio.start_server(metrics._handle, "127.0.0.1", 0)
+        async with server:
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /latency HTTP/1.1\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    response = asyncio.run(scenario())
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert latency_registry.dump().splitlines()[0].encode() in response
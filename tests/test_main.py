@@ -0,0 +1,112 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_import_main_does_not_load_tkinter():
+    setup_env()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, main; sys.exit('tkinter' in sys.modules)"],
+        cwd=root, env=os.environ.copy(), capture_output=True, text=True, check=False,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_parse_coins():
+    setup_env()
+    import pytest
+
+    from config import COINS
+    from main import parse_coins
+
+    assert parse_coins("btc, ETH") == ["BTC", "ETH"]
+    assert parse_coins("") == []
+    assert parse_coins("all") == list(COINS)
+    with pytest.raises(ValueError):
+        parse_coins("BTC,NOPE")
+
+
+class FakeManager:
+    def __init__(self):
+        self.coins = []
+        self.closed = False
+
+    async def subscribe(self, coin):
+        self.coins.append(coin)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_headless_subscribes_coins_and_stops_on_sigterm(monkeypatch):
+    setup_env()
+    import main
+
+    started = []
+
+    async def fake_run_websockets(headless=False, workers=0):
+        started.append(headless)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            started.append("closed")
+
+    managers = [FakeManager(), FakeManager()]
+    monkeypatch.setattr(main, "run_websockets", fake_run_websockets)
+    monkeypatch.setattr(main, "subscription_managers", managers)
+    monkeypatch.setattr(main, "active_other_exchanges", set())
+
+    async def scenario():
+        asyncio.get_running_loop().call_later(0.1, os.kill, os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(main.run_headless(["BTC", "ETH"]), timeout=5)
+
+    asyncio.run(scenario())
+
+    assert started == [True, "closed"]
+    assert all(m.coins == ["BTC", "ETH"] and m.closed for m in managers)
+
+
+def test_readded_coin_is_counted_by_one_connection_only(monkeypatch):
+    setup_env()
+    import json
+
+    import main
+    from config import COINS
+    from websockets_tasks import build_binance_routes, dispatch_binance_frame
+
+    async def fake_combined(streams, routes, scheduler):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(main, "combined_task_binance", fake_combined)
+    monkeypatch.setattr(main, "BINANCE_COMBINED_STREAMS", True)
+    monkeypatch.setattr(main, "binance_connections", [])
+    monkeypatch.setattr(main, "binance_tasks", {})
+    spec = COINS["BTC"]
+    # Połączenie ze startu - jego streamy zostają subskrybowane po usunięciu coina
+    startup = build_binance_routes(["BTC", "ETH"], main.states)
+    main.binance_connections.append(startup)
+    frame = json.dumps({"stream": "btcusdt@aggTrade",
+                        "data": {"q": "1.5", "m": False, "T": 1700000000000}}).encode()
+
+    async def scenario():
+        await main.remove_coin("BTC")
+        main.add_coin("BTC", spec)  # np. zmieniony wpis = usunięcie i ponowne dodanie
+        for routes in main.binance_connections:  # oba połączenia dostają tę samą ramkę
+            dispatch_binance_frame(frame, routes, main.alert_scheduler)
+        for tasks in main.binance_tasks.values():
+            for task in tasks:
+                task.cancel()
+
+    asyncio.run(scenario())
+
+    assert "btcusdt@aggTrade" not in startup
+    assert sum("btcusdt@aggTrade" in routes for routes in main.binance_connections) == 1
+    assert main.states["BTC"]["binance"].buy_vol == 1.5
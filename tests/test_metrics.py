@@ -0,0 +1,132 @@
+import asyncio
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_int_value_reads_numbers_and_quoted_numbers():
+    setup_env()
+    from decoding import int_value
+
+    assert int_value(b'{"stream":"x","data":{"e":"aggTrade","E":1700000000123,"q":"1"}}', b'"E"') == 1700000000123
+    assert int_value(b'{"data":[{"instId":"BTC-USDT-SWAP","ts":"1700000000456"}]}', b'"ts"') == 1700000000456
+    assert int_value(b'{"result":[{"create_time_ms": 1700000000789}]}', b'"create_time_ms"') == 1700000000789
+    assert int_value(b'{"result":null,"id":1}', b'"E"') is None
+    assert int_value(b'{"E":"abc"}', b'"E"') is None
+
+
+def test_render_counters_gauges_and_cumulative_histogram():
+    setup_env()
+    from metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    frames = registry.counter("spike_frames_total", "Ramki", exchange="binance")
+    assert registry.counter("spike_frames_total", "Ramki", exchange="binance") is frames
+    frames.value += 3
+    depth = [7]
+    registry.gauge("spike_depth", "Głębokość", lambda: depth[0], queue="a")
+    histogram = registry.histogram("spike_seconds", "Czas", (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    text = registry.render()
+    assert '# TYPE spike_frames_total counter\nspike_frames_total{exchange="binance"} 3\n' in text
+    assert 'spike_depth{queue="a"} 7\n' in text
+    # le = granica włącznie, kubełki skumulowane
+    assert 'spike_seconds_bucket{le="0.1"} 2\n' in text
+    assert 'spike_seconds_bucket{le="1.0"} 3\n' in text
+    assert 'spike_seconds_bucket{le="+Inf"} 4\n' in text
+    assert "spike_seconds_count 4\n" in text
+
+    depth[0] = 2  # gauge czytany dopiero przy renderowaniu
+    assert 'spike_depth{queue="a"} 2\n' in registry.render()
+
+    try:
+        registry.histogram("spike_frames_total", "Ramki")
+        raise AssertionError("inny typ tej samej metryki")
+    except ValueError:
+        pass
+
+
+def test_probe_samples_every_nth_frame_from_ingest_queue():
+    setup_env()
+    import clock
+    from ingest import IngestQueue
+    from metrics import FrameProbe, MetricsRegistry
+
+    registry = MetricsRegistry()
+    parsed = []
+    probe = FrameProbe("binance", parse=parsed.append, stamp=lambda raw: ("aggTrade", int(raw)),
+                       sample_every=4, registry=registry)
+    handled = []
+    ingest = IngestQueue("test", probe=probe, policy="block")
+    now_ms = int(clock.now() * 1000)
+
+    async def scenario():
+        for i in range(10):
+            ingest.put(str(now_ms - 200 + i).encode())
+        consumer = asyncio.create_task(ingest.drain(handled.append))
+        await asyncio.sleep(0.01)
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert len(handled) == 10
+    assert probe.messages.value == 10
+    # Pomiar co 4. ramkę (4. i 8.) - tylko te ramki są parsowane drugi raz
+    assert parsed == [handled[3], handled[7]]
+    assert probe.handler_seconds.count == 2
+    assert probe.exchange_latency.count == 2
+    assert 0.1 < probe.exchange_latency.sum / 2 < 5.0
+
+
+def test_metrics_endpoint_serves_text_format():
+    setup_env()
+    from metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    registry.counter("spike_reconnects_total", "Zerwane połączenia", exchange="okx").inc()
+
+    async def get(server, path):
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def scenario():
+        server = await asyncio.start_server(registry._handle, "127.0.0.1", 0)
+        async with server:
+            return await get(server, "/metrics"), await get(server, "/")
+
+    metrics_response, other = asyncio.run(scenario())
+    assert metrics_response.startswith(b"HTTP/1.1 200 OK")
+    assert b'spike_reconnects_total{exchange="okx"} 1\n' in metrics_response
+    assert other.startswith(b"HTTP/1.1 404")
+
+
+def test_binance_dispatch_counts_frames_per_coin():
+    setup_env()
+    import json
+
+    from alerts import AlertScheduler
+    from config import initialize_states
+    from metrics import metrics
+    from websockets_tasks import build_binance_routes, dispatch_binance_frame
+
+    states = initialize_states()
+    scheduler = AlertScheduler(states, set())
+    routes = build_binance_routes(["BTC"], states)
+    frames = routes["btcusdt@aggTrade"][3]
+    before = frames.value
+    frame = json.dumps({"stream": "btcusdt@aggTrade",
+                        "data": {"q": "1.5", "m": False, "T": 1700000000000}}).encode()
+    dispatch_binance_frame(frame, routes, scheduler)
+    dispatch_binance_frame(frame, routes, scheduler)
+    assert frames.value == before + 2
+    assert 'spike_coin_frames_total{coin="BTC",exchange="binance"}' in metrics.render()
@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_app_consumes_all_mock_exchanges_end_to_end(monkeypatch):
+    setup_env()
+    import websockets_tasks
+    from alerts import AlertScheduler
+    from config import initialize_states
+    from mock_exchange import MockExchange
+    from subscriptions import create_subscription_managers
+
+    async def scenario():
+        mock = MockExchange(rate=200.0, seed=1)
+        async with mock.serve("127.0.0.1", 0) as server:
+            base = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            monkeypatch.setattr(websockets_tasks, "BINANCE_COMBINED_WS_URL", f"{base}/stream?streams=")
+            monkeypatch.setattr(websockets_tasks, "BINANCE_URL_STREAMS", 2)  # reszta przez SUBSCRIBE
+
+            states = initialize_states()
+            scheduler = AlertScheduler(states, set())
+            routes = websockets_tasks.build_binance_routes(["BTC", "ETH"], states)
+            tasks = [asyncio.create_task(
+                websockets_tasks.combined_task_binance(list(routes), routes, scheduler)
+            )]
+
+            managers = create_subscription_managers(states)
+            paths = {"bybit": "/v5/public/linear", "gate": "/v4/ws/usdt", "okx": "/ws/v5/public"}
+            for manager in managers:
+                manager.url = base + paths[manager.exchange]
+                await manager.subscribe("BTC")
+
+            await asyncio.sleep(1.0)
+            for manager in managers:
+                await manager.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return states, mock
+
+    states, mock = asyncio.run(scenario())
+
+    assert mock.sent_trades > 0
+    for coin in ("BTC", "ETH"):
+        binance = states[coin]["binance"]
+        assert binance.buy_vol + binance.sell_vol > 0  # aggTrade (ETH przez SUBSCRIBE)
+        assert binance.current_vol > 0  # kline
+    for exchange in ("bybit", "gate", "okx"):
+        state = states["BTC"][exchange]
+        assert state.buy_vol + state.sell_vol > 0, exchange
+    assert states["BTC"]["bybit"].current_vol > 0  # kline Bybit
+    assert states["ETH"]["okx"].buy_vol == 0  # niesubskrybowany
@@ -0,0 +1,62 @@
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_recorder_writes_rotated_files_readable_in_order(tmp_path):
+    setup_env()
+    import time
+
+    from recorder import FrameRecorder, capture_files, read_frames
+
+    rec = FrameRecorder(directory=str(tmp_path), rotate_bytes=2000)
+    rec.start()
+    frames = [
+        ("binance" if i % 3 else "okx", b'{"stream":"x","i":%d}' % i) for i in range(300)
+    ]
+    # Kilka paczek - rotacja jest sprawdzana przed zapisem każdej paczki
+    for start in range(0, 300, 100):
+        for stream, raw in frames[start:start + 100]:
+            rec.record(stream, raw)
+        deadline = time.monotonic() + 5
+        while rec.recorded < start + 100 and time.monotonic() < deadline:
+            time.sleep(0.005)
+    rec.close()
+
+    files = capture_files(str(tmp_path))
+    assert len(files) > 1  # rotacja po rozmiarze
+    assert files == rec.files
+    assert rec.recorded == 300
+
+    read = list(read_frames(files, chunk_size=64))  # małe bloki - rekordy na granicy bloków
+    assert [(stream, raw) for _, stream, raw in read] == frames
+    timestamps = [ts for ts, _, _ in read]
+    assert timestamps == sorted(timestamps)
+
+
+def test_read_frames_skips_truncated_tail(tmp_path):
+    setup_env()
+    import gzip
+
+    from recorder import _HEADER, read_frames
+
+    path = tmp_path / "cut.frames.gz"
+    with gzip.open(path, "wb") as f:
+        f.write(_HEADER.pack(1.0, 3, 2) + b"okx" + b"{}")
+        f.write(_HEADER.pack(2.0, 3, 100) + b"okx" + b"{")  # urwany rekord
+
+    assert list(read_frames([str(path)])) == [(1.0, "okx", b"{}")]
+
+
+def test_disabled_recorder_ignores_frames():
+    setup_env()
+    from recorder import FrameRecorder
+
+    rec = FrameRecorder(directory="")
+    rec.start()
+    rec.record("binance", b"{}")
+    assert rec.thread is None
+    assert rec.queue.qsize() == 0
@@ -0,0 +1,98 @@
+import json
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def write_capture(path, records):
+    import gzip
+
+    from recorder import _HEADER
+
+    with gzip.open(path, "wb") as f:
+        for recv_ts, stream, payload in records:
+            raw = json.dumps(payload).encode()
+            name = stream.encode()
+            f.write(_HEADER.pack(recv_ts, len(name), len(raw)) + name + raw)
+
+
+def kline(volume, closed, open_=1.0, close=1.0):
+    return {"k": {"o": str(open_), "h": "2", "l": "0.5", "c": str(close),
+                  "v": str(volume), "x": closed}}
+
+
+def spike_capture(t0):
+    """6 spokojnych świec BTC, potem świeca z 100x wolumenem i przewagą kupujących"""
+    records = []
+    for minute in range(7):
+        ts = t0 + minute * 60
+        trade = {"q": "1", "m": minute % 2 == 0, "T": int(ts * 1000)}
+        records.append((ts + 1, "binance:btcusdt@aggTrade", trade))
+        if minute < 6:
+            records.append((ts + 59, "binance:btcusdt@kline_1m", kline(10, True)))
+
+    ts = t0 + 6 * 60
+    for i in range(10):
+        trade = {"q": "90", "m": False, "T": int((ts + 10 + i) * 1000)}
+        records.append((ts + 10 + i, "binance", {"stream": "btcusdt@aggTrade", "data": trade}))
+    records.append((ts + 30, "binance:btcusdt@kline_1m", kline(1000, False, 1.0, 1.5)))
+    # Ramka innej giełdy i śmieci - nie mogą przerwać odtwarzania
+    records.append((ts + 31, "okx", {"arg": {"instId": "BTC-USDT-SWAP"},
+                                     "data": [{"ts": str(int(ts * 1000)), "sz": "1", "side": "buy"}]}))
+    records.append((ts + 32, "binance:btcusdt@kline_1m", {"bad": 1}))
+    return records
+
+
+def test_replay_is_deterministic_and_uses_virtual_clock(tmp_path):
+    setup_env()
+    import time
+
+    from replay import Replayer
+
+    t0 = 1_700_000_000.0  # dawno temu - zegar systemowy nie może wpływać na wynik
+    capture = tmp_path / "day.frames.gz"
+    write_capture(capture, spike_capture(t0))
+
+    first = Replayer(str(capture), coins=["BTC"])
+    alerts = first.run()
+    again = Replayer(str(capture), coins=["BTC"]).run()
+
+    assert alerts == again
+    assert len(alerts) == 1
+    alert_ts, message = alerts[0]
+    assert t0 + 360 <= alert_ts <= t0 + 391  # po rozgrzewce, w świecy skoku
+    assert "ALERT WZROSTOWY - BTC" in message
+    assert time.strftime("%H:%M:%S", time.localtime(alert_ts)) in message
+    assert first.errors == 1
+    assert first.states["BTC"]["okx"].buy_vol > 0
+
+
+def test_replay_respects_warmup(tmp_path):
+    setup_env()
+    from replay import Replayer
+
+    # Ten sam skok, ale nagranie zaczyna się 5 minut przed nim - rozgrzewka trwa
+    records = [r for r in spike_capture(1_700_000_000.0) if r[0] >= 1_700_000_000.0 + 60]
+    capture = tmp_path / "short.frames.gz"
+    write_capture(capture, records)
+
+    assert Replayer(str(capture), coins=["BTC"]).run() == []
+
+
+def test_replay_skips_exchanges_without_coin_symbol(tmp_path):
+    setup_env()
+    from config import COINS
+    from replay import Replayer
+
+    COINS.add("BINONLY", {"binance": "binonlyusdt"})  # wpis tylko z Binance
+    try:
+        capture = tmp_path / "partial.frames.gz"
+        write_capture(capture, spike_capture(1_700_000_000.0))
+        replayer = Replayer(str(capture), coins=["BTC", "BINONLY"])
+        assert len(replayer.run()) == 1
+        assert replayer.states["BTC"]["okx"].buy_vol > 0
+    finally:
+        COINS.remove("BINONLY")
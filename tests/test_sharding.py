@@ -0,0 +1,127 @@
+import asyncio
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_split_coins_balances_shards():
+    setup_env()
+    from sharding import split_coins
+
+    shards = split_coins(["A", "B", "C", "D", "E"], 2)
+    assert shards == [["A", "C", "E"], ["B", "D"]]
+    assert split_coins(["A"], 4) == [["A"]]  # bez pustych procesów
+
+
+def test_shared_table_round_trip():
+    setup_env()
+    from sharding import SharedStateTable
+    from state import new_coin_state
+
+    worker_states = {"BTC": new_coin_state(100.0), "ETH": new_coin_state(100.0)}
+    main_states = {"BTC": new_coin_state(0.0), "ETH": new_coin_state(0.0)}
+    btc = worker_states["BTC"]["binance"]
+    btc.candle_id = 28_000_000
+    btc.current_vol = 12.5
+    btc.buy_vol, btc.sell_vol, btc.delta = 8.0, 4.0, 4.0
+    btc.candle_open, btc.candle_close = 100.0, 101.0
+    for volume in (1.0, 2.0, 3.0):
+        btc.baseline.push(volume)
+
+    owner = SharedStateTable(["BTC", "ETH"])
+    worker = SharedStateTable(["BTC", "ETH"], name=owner.name)
+    try:
+        assert owner.read_into(main_states) == []
+        worker.write("BTC", worker_states["BTC"])
+        assert owner.read_into(main_states) == ["BTC"]
+        assert owner.read_into(main_states) == []  # bez nowych zapisów
+
+        mirror = main_states["BTC"]["binance"]
+        assert mirror.candle_id == 28_000_000
+        assert (mirror.current_vol, mirror.buy_vol, mirror.sell_vol) == (12.5, 8.0, 4.0)
+        assert (mirror.candle_open, mirror.candle_close) == (100.0, 101.0)
+        assert mirror.start_time == 100.0
+        assert list(mirror.baseline.window) == [1.0, 2.0, 3.0]
+        assert mirror.baseline.avg == 2.0
+        assert main_states["BTC"]["bybit"].candle_id is None
+    finally:
+        worker.close()
+        owner.close()
+
+
+def test_reader_skips_row_during_write():
+    setup_env()
+    from sharding import COL_SEQ, SharedStateTable
+    from state import new_coin_state
+
+    states = {"BTC": new_coin_state(0.0)}
+    written = new_coin_state(0.0)
+    written["binance"].current_vol = 5.0
+    table = SharedStateTable(["BTC"])
+    try:
+        table.write("BTC", written)
+        table.data[0, COL_SEQ] += 1  # wiersz Binance: zapis w toku
+        assert table.read_into(states) == ["BTC"]  # pozostałe giełdy
+        assert states["BTC"]["binance"].current_vol == 0.0
+        table.data[0, COL_SEQ] += 1  # zapis zakończony
+        assert table.read_into(states) == ["BTC"]
+        assert states["BTC"]["binance"].current_vol == 5.0
+    finally:
+        table.close()
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.marked = set()
+
+    def mark_dirty(self, coin, state):
+        self.marked.add(coin)
+
+
+def test_workers_ingest_mock_exchange_end_to_end(monkeypatch):
+    setup_env()
+    from config import initialize_states
+    from mock_exchange import MockExchange
+    from sharding import ShardedIngest
+
+    async def scenario():
+        mock = MockExchange(rate=200.0, seed=1)
+        async with mock.serve("127.0.0.1", 0) as server:
+            base = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            # Procesy robocze (spawn) czytają adresy z config przy imporcie
+            monkeypatch.setenv("BINANCE_COMBINED_WS_URL", f"{base}/stream?streams=")
+            monkeypatch.setenv("BYBIT_WS_URL", f"{base}/v5/public/linear")
+            monkeypatch.setenv("CHECKPOINT_PATH", "")
+
+            states = initialize_states()
+            scheduler = RecordingScheduler()
+            ingest = ShardedIngest(states, scheduler, workers=2, coins=["BTC", "ETH"])
+            ingest.start()
+            task = asyncio.create_task(ingest.run())
+            ingest.subscribe("BTC")
+            try:
+                for _ in range(200):
+                    await asyncio.sleep(0.1)
+                    if (states["ETH"]["binance"].buy_vol + states["ETH"]["binance"].sell_vol > 0
+                            and states["BTC"]["bybit"].buy_vol + states["BTC"]["bybit"].sell_vol > 0):
+                        break
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await asyncio.to_thread(ingest.stop)
+            return states, scheduler, ingest
+
+    states, scheduler, ingest = asyncio.run(scenario())
+
+    assert ingest.shards == [["BTC"], ["ETH"]]
+    assert scheduler.marked == {"BTC", "ETH"}
+    for coin in ("BTC", "ETH"):
+        binance = states[coin]["binance"]
+        assert binance.buy_vol + binance.sell_vol > 0
+        assert binance.current_vol > 0  # kline
+    assert states["BTC"]["bybit"].buy_vol + states["BTC"]["bybit"].sell_vol > 0
+    assert states["ETH"]["bybit"].buy_vol == 0  # niesubskrybowany
+    assert all(process.exitcode == 0 for process in ingest.processes)
@@ -0,0 +1,51 @@
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_rolling_baseline_keeps_running_average_and_threshold():
+    setup_env()
+    from state import RollingBaseline
+
+    baseline = RollingBaseline(maxlen=3, multiplier=7.5)
+    volumes = [1.0, 2.0, 3.0, 4.0, 5.0, 0.1, 0.2, 0.7]
+
+    for i, volume in enumerate(volumes):
+        baseline.push(volume)
+        window = volumes[max(0, i - 2):i + 1]
+        expected = sum(window) / len(window)
+        assert abs(baseline.avg - expected) < 1e-12
+        assert abs(baseline.threshold - 7.5 * expected) < 1e-12
+
+    assert baseline.full
+    assert len(baseline) == 3
+
+
+def test_exchange_state_avg_vol_reads_baseline():
+    setup_env()
+    from state import ExchangeState
+
+    state = ExchangeState()
+    assert state.avg_vol == 0.0
+    state.baseline.push(4.0)
+    state.baseline.push(6.0)
+    assert state.avg_vol == 5.0
+
+
+def test_rolling_baseline_load_replaces_window():
+    setup_env()
+    from state import RollingBaseline
+
+    baseline = RollingBaseline(maxlen=3, multiplier=2.0)
+    baseline.push(100.0)
+    baseline.load([1.0, 2.0, 6.0])
+    assert list(baseline.window) == [1.0, 2.0, 6.0]
+    assert baseline.avg == 3.0
+    assert baseline.threshold == 6.0
+    assert baseline.full
+    baseline.load([])
+    assert baseline.avg == 0.0
+    assert not baseline.full
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+
+
+def encode(frame: dict) -> bytes:
+    return json.dumps(frame).encode()
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_bybit_subscribe_messages_are_chunked():
+    setup_env()
+    from config import COINS, initialize_states
+    from subscriptions import BybitSubscriptionManager
+
+    manager = BybitSubscriptionManager(initialize_states())
+    coins = list(COINS)[:6]
+    messages = manager.subscribe_messages(coins)
+
+    # 6 coinów x 2 tematy = 12 tematów, max 10 w jednym żądaniu
+    assert [len(m["args"]) for m in messages] == [10, 2]
+    assert all(m["op"] == "subscribe" for m in messages)
+
+
+class FakeWebSocket:
+    """Zamiennik połączenia - zapisuje wysłane wiadomości, recv czeka w nieskończoność"""
+
+    def __init__(self, url):
+        self.url = url
+        self.sent = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def send(self, msg):
+        self.sent.append(msg)
+
+    async def recv(self, decode=None):
+        await asyncio.Event().wait()
+
+
+def test_subscribe_and_unsubscribe_route_frames_without_reconnect(monkeypatch):
+    setup_env()
+    import subscriptions
+    from config import COINS, initialize_states
+
+    sockets = []
+
+    def fake_connect(url):
+        ws = FakeWebSocket(url)
+        sockets.append(ws)
+        return ws
+
+    monkeypatch.setattr(subscriptions.websockets, "connect", fake_connect)
+    states = initialize_states()
+
+    async def scenario():
+        gate = subscriptions.GateSubscriptionManager(states)
+        okx = subscriptions.OkxSubscriptionManager(states)
+        await gate.subscribe("BTC")
+        await okx.subscribe("BTC")
+        while len(sockets) < 2 or gate.ws is None or okx.ws is None:
+            await asyncio.sleep(0)
+
+        await gate.subscribe("ETH")
+        assert len(sockets) == 2  # kolejny coin na tym samym połączeniu
+
+        gate.handle_message(encode({
+            "channel": "futures.trades",
+            "event": "update",
+            "result": [
+                {"contract": COINS["BTC"]["gate"], "size": 100, "create_time_ms": 1_700_000_000_000},
+                {"contract": COINS["ETH"]["gate"], "size": -50, "create_time_ms": 1_700_000_000_000},
+            ],
+        }))
+        okx.handle_message(encode({
+            "arg": {"channel": "trades", "instId": COINS["BTC"]["okx"]},
+            "data": [{"sz": "10", "side": "sell", "ts": "1700000000000"}],
+        }))
+
+        await gate.unsubscribe("ETH")
+        gate.handle_message(encode({
+            "channel": "futures.trades",
+            "event": "update",
+            "result": [{"contract": COINS["ETH"]["gate"], "size": -50, "create_time_ms": 1_700_000_000_000}],
+        }))
+
+        await gate.close()
+        await okx.close()
+
+    asyncio.run(scenario())
+
+    gate_ws, okx_ws = sockets
+    gate_sent = [json.loads(m) for m in gate_ws.sent]
+    assert [(m["event"], m["payload"]) for m in gate_sent] == [
+        ("subscribe", [COINS["BTC"]["gate"]]),
+        ("subscribe", [COINS["ETH"]["gate"]]),
+        ("unsubscribe", [COINS["ETH"]["gate"]]),
+    ]
+    assert all(m["channel"] == "futures.trades" for m in gate_sent)
+    assert [json.loads(m) for m in okx_ws.sent] == [
+        {"op": "subscribe", "args": [{"channel": "trades", "instId": COINS["BTC"]["okx"]}]},
+    ]
+
+    assert states["BTC"]["gate"].buy_vol == 100 * COINS["BTC"]["gate_contract_size"]
+    assert states["ETH"]["gate"].sell_vol == 50 * COINS["ETH"]["gate_contract_size"]
+    assert states["BTC"]["okx"].sell_vol == 10 * COINS["BTC"]["okx_contract_size"]
+
+
+def test_bad_frame_does_not_drop_shared_connection(monkeypatch):
+    setup_env()
+    import subscriptions
+    from config import COINS, initialize_states
+
+    frames = [
+        encode({"arg": {"channel": "trades"}, "data": []}),  # brak instId
+        encode({
+            "arg": {"channel": "trades", "instId": COINS["BTC"]["okx"]},
+            "data": [{"sz": "5", "side": "buy", "ts": "1700000000000"}],
+        }),
+    ]
+    sockets = []
+
+    class ScriptedWebSocket(FakeWebSocket):
+        async def recv(self, decode=None):
+            if frames:
+                return frames.pop(0)
+            await asyncio.Event().wait()
+
+    def fake_connect(url):
+        ws = ScriptedWebSocket(url)
+        sockets.append(ws)
+        return ws
+
+    monkeypatch.setattr(subscriptions.websockets, "connect", fake_connect)
+    states = initialize_states()
+
+    async def scenario():
+        okx = subscriptions.OkxSubscriptionManager(states)
+        await okx.subscribe("BTC")
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await okx.close()
+
+    asyncio.run(scenario())
+
+    assert len(sockets) == 1
+    assert states["BTC"]["okx"].buy_vol == 5 * COINS["BTC"]["okx_contract_size"]
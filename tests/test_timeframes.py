@@ -0,0 +1,77 @@
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+class Sink:
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, message: str) -> bool:
+        self.messages.append(message)
+        return True
+
+
+def test_higher_timeframes_are_built_from_minute_closes():
+    setup_env()
+    from timeframes import TimeframeCandle
+
+    candle = TimeframeCandle(5, history=2)
+    # Minuty 100..104 = jedna świeca 5m (100 // 5 = 20)
+    for minute in range(100, 104):
+        candle.add_minute(minute, 2.0, 1.0, 10.0 + minute)
+    assert candle.current(104, 5.0, 0.0, 0.0) == (17.0, 13.0, 4.0, 110.0)
+
+    candle.add_minute(104, 5.0, 0.0, 0.0)  # ostatnia minuta zamyka świecę
+    assert list(candle.baseline.window) == [17.0]
+    assert candle.current(105, 1.0, 1.0, 7.0) == (2.0, 1.0, 1.0, 7.0)
+
+    # Luka: minuty 105-106, potem brak transakcji do minuty 112 - świeca 105-109 zamykana później
+    candle.add_minute(105, 1.0, 0.0, 1.0)
+    candle.add_minute(106, 1.0, 0.0, 1.0)
+    candle.add_minute(112, 4.0, 0.0, 1.0)
+    assert list(candle.baseline.window) == [17.0, 2.0]
+    assert candle.current(113, 0.0, 0.0, 3.0) == (4.0, 4.0, 0.0, 1.0)
+
+
+def test_timeframe_rule_fires_once_per_timeframe_candle(monkeypatch):
+    setup_env()
+    import websockets_tasks
+    from alerts import AlertScheduler
+    from config import initialize_states
+    from timeframes import MultiTimeframe
+
+    states = initialize_states()
+    frames = MultiTimeframe({"1m": 1, "5m": 5}, {"5m": {"multiplier": 3.0, "history": 2, "delta_pct": 20}})
+    frames.start(states)
+    monkeypatch.setattr(websockets_tasks, "timeframes", frames)
+    sink = Sink()
+    sent = set()
+    scheduler = AlertScheduler(states, sent, sender=sink, frames=frames)
+
+    state = states["BTC"]["binance"]
+    state.start_time = 0.0
+    minute = 28_000_000  # początek świecy 5m
+    # Dwie spokojne świece 5m: 1 + 1 na minutę
+    for m in range(minute, minute + 10):
+        websockets_tasks.handle_aggtrade_binance("BTC", state, 1.0, False, m * 60000, scheduler)
+        websockets_tasks.handle_aggtrade_binance("BTC", state, 1.0, True, m * 60000 + 1, scheduler)
+    candle = frames.get(state, "5m")
+    assert len(candle.baseline) == 1  # ostatnia minuta drugiej świecy jeszcze otwarta
+
+    # Trzecia świeca 5m: mocne kupno rozłożone na kilka minut (żadna minuta osobno nie skacze)
+    state.candle_open, state.candle_close = 1.0, 1.2
+    for m in range(minute + 10, minute + 13):
+        websockets_tasks.handle_aggtrade_binance("BTC", state, 12.0, False, m * 60000 + 2, scheduler)
+        assert candle.baseline.full and candle.baseline.avg == 10.0  # 2 świece po 10
+        scheduler.evaluate_dirty()
+    assert len(sink.messages) == 1
+    assert "Interwał: <b>5m</b>" in sink.messages[0]
+    assert f"BTC_5m_{minute + 10}" in sent
+
+    websockets_tasks.handle_aggtrade_binance("BTC", state, 12.0, False, (minute + 13) * 60000, scheduler)
+    scheduler.evaluate_dirty()
+    assert len(sink.messages) == 1  # ta sama świeca 5m
@@ -0,0 +1,127 @@
+import json
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def _spec(symbol: str, **extra) -> dict:
+    return {"binance": symbol.lower() + "usdt", **extra}
+
+
+def test_load_specs_validates_entries(tmp_path):
+    setup_env()
+    from universe import SymbolUniverse, load_specs
+
+    path = tmp_path / "coins.json"
+    path.write_text(json.dumps({
+        "BTC": {"binance": "btcusdt", "okx": "BTC-USDT-SWAP", "okx_contract_size": 0.01},
+        "NEW": {"bybit": "NEWUSDT"},  # bez Binance - tylko na żądanie
+    }))
+    universe = SymbolUniverse.load(str(path))
+    assert list(universe) == ["BTC", "NEW"]
+    assert universe.listed("binance") == ["BTC"]
+    assert universe.listed("bybit") == ["NEW"]
+
+    for bad in ({"X": {}}, {"X": {"gate": "X_USDT"}}, ["BTC"]):
+        path.write_text(json.dumps(bad))
+        try:
+            load_specs(str(path))
+            raise AssertionError(f"błędny wpis przyjęty: {bad}")
+        except (TypeError, ValueError):
+            pass
+
+
+def test_dense_ids_are_reused_and_diff():
+    setup_env()
+    from universe import SymbolUniverse
+
+    universe = SymbolUniverse({"A": _spec("A"), "B": _spec("B"), "C": _spec("C")})
+    assert [universe.ids[coin] for coin in "ABC"] == [0, 1, 2]
+
+    version = universe.version
+    assert universe.remove("B") == 1
+    assert universe.names == ["A", None, "C"]
+    assert universe.add("D", _spec("D")) == 1  # najmniejsze wolne id
+    assert universe.add("E", _spec("E")) == 3
+    assert universe.version == version + 3
+
+    added, removed = universe.diff({"A": _spec("A"), "C": _spec("C", bybit="CUSDT"), "F": _spec("F")})
+    assert sorted(added) == ["C", "F"]
+    assert sorted(removed) == ["C", "D", "E"]
+
+
+def test_coin_states_are_created_lazily_with_listeners():
+    setup_env()
+    from state import CoinStates
+    from universe import SymbolUniverse
+
+    states = CoinStates(SymbolUniverse({"A": _spec("A"), "B": _spec("B")}))
+    created = []
+    states.listeners.append(lambda coin, coin_state: created.append((coin, coin_state)))
+    assert len(states) == 0
+    assert states.get("A") is None  # get() nie tworzy stanu
+
+    coin_state = states["A"]
+    assert states["A"] is coin_state
+    assert created == [("A", coin_state)]
+    assert list(states) == ["A"]
+
+    states.create(["A", "B"])
+    assert [coin for coin, _ in created] == ["A", "B"]
+    try:
+        states["ZZZ"]
+        raise AssertionError("stan coina spoza universe")
+    except KeyError:
+        pass
+
+
+def test_alert_engine_rows_follow_coin_ids():
+    setup_env()
+    import numpy as np
+
+    from alert_engine import COL_VOL, AlertEngine
+    from state import CoinStates
+    from universe import SymbolUniverse
+
+    universe = SymbolUniverse({"A": _spec("A"), "B": _spec("B")})
+    states = CoinStates(universe)
+    engine = AlertEngine(states, (), exchanges=("binance",), universe=universe)
+    states.listeners.append(lambda coin, _: engine.add_coin(coin))
+
+    states["B"]["binance"].current_vol = 7.0  # pierwsze użycie - wiersz w silniku
+    engine.sync(["B"])
+    assert engine.data.shape[0] >= 2
+    assert engine.data[universe.ids["B"], COL_VOL] == 7.0
+
+    engine.remove_coin("B")
+    universe.remove("B")
+    assert not engine.data[1].any()
+    universe.add("C", _spec("C"))  # id 1 wraca do użycia
+    states["C"]["binance"].current_vol = 3.0
+    engine.sync(["C"])
+    assert engine.data[1, COL_VOL] == 3.0
+
+    for coin in "DEFG":  # tablica rośnie przez podwajanie
+        universe.add(coin, _spec(coin))
+    states.create("DEFG")
+    assert engine.data.shape[0] >= len(universe.names)
+    assert np.count_nonzero(engine.data[:, COL_VOL]) == 1
+    assert engine.evaluate(0.0) == set()
+
+
+def test_binance_routes_skip_coins_without_binance_symbol():
+    setup_env()
+    from config import COINS, TF_BINANCE, initialize_states
+    from websockets_tasks import build_binance_routes
+
+    COINS.add("ONLYBYBIT", {"bybit": "ONLYBYBITUSDT"})
+    try:
+        states = initialize_states()
+        routes = build_binance_routes(["BTC", "ONLYBYBIT"], states)
+        assert sorted(routes) == ["btcusdt@aggTrade", f"btcusdt@kline_{TF_BINANCE}"]
+        assert "ONLYBYBIT" not in states
+    finally:
+        COINS.remove("ONLYBYBIT")
@@ -0,0 +1,164 @@
+import itertools
+import json
+import os
+
+
+def setup_env():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+def test_split_binance_streams_uses_fewest_connections():
+    setup_env()
+    from websockets_tasks import split_binance_streams
+
+    streams = [f"s{i}@aggTrade" for i in range(2500)]
+    groups = split_binance_streams(streams, max_streams=1024)
+
+    assert [len(g) for g in groups] == [1024, 1024, 452]
+    assert list(itertools.chain.from_iterable(groups)) == streams
+
+
+def test_dispatch_binance_frame_routes_by_stream():
+    setup_env()
+    from alerts import AlertScheduler
+    from config import COINS, initialize_states
+    from websockets_tasks import build_binance_routes, dispatch_binance_frame
+
+    states = initialize_states()
+    scheduler = AlertScheduler(states, set())
+    routes = build_binance_routes(COINS, states)
+    assert len(routes) == 2 * len(COINS)
+
+    symbol = COINS["BTC"]["binance"]
+    frame = json.dumps({
+        "stream": f"{symbol}@aggTrade",
+        "data": {"q": "1.5", "m": False, "T": 1_700_000_000_000},
+    }).encode()
+    dispatch_binance_frame(frame, routes, scheduler)
+
+    assert states["BTC"]["binance"].buy_vol == 1.5
+    assert states["ETH"]["binance"].buy_vol == 0.0
+
+    # Odpowiedź na SUBSCRIBE nie ma pola "stream" - ignorowana
+    dispatch_binance_frame(b'{"result":null,"id":1}', routes, scheduler)
+
+
+def test_combined_task_survives_bad_frame(monkeypatch):
+    setup_env()
+    import asyncio
+
+    import websockets_tasks
+    from alerts import AlertScheduler
+    from config import COINS, initialize_states
+
+    states = initialize_states()
+    routes = websockets_tasks.build_binance_routes(COINS, states)
+    symbol = COINS["BTC"]["binance"]
+    frames = [
+        json.dumps({"stream": f"{symbol}@aggTrade", "data": {"q": "oops", "m": False, "T": 1}}).encode(),
+        json.dumps({"stream": f"{symbol}@aggTrade", "data": {"q": "2.0", "m": False, "T": 1}}).encode(),
+    ]
+    connects = []
+
+    class FakeWS:
+        async def __aenter__(self):
+            connects.append(1)
+            return self
+
+        async def __aexit__(self, *args):
+            return False
+
+        async def send(self, msg):
+            pass
+
+        async def recv(self, decode=None):
+            if frames:
+                return frames.pop(0)
+            await asyncio.sleep(0.05)  # ramki przetwarza osobna coroutine (IngestQueue)
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(websockets_tasks.websockets, "connect", lambda url: FakeWS())
+
+    async def scenario():
+        try:
+            scheduler = AlertScheduler(states, set())
+            await websockets_tasks.combined_task_binance(list(routes), routes, scheduler)
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+
+    # Zła ramka pominięta, kolejna przetworzona na tym samym połączeniu
+    assert connects == [1]
+    assert states["BTC"]["binance"].buy_vol == 2.0
+
+
+def _per_trade_reference(trades, contract_size):
+    """Stan po przetwarzaniu transakcji po jednej (dawna pętla handlerów Gate.io/OKX)"""
+    candle_id, current, buy, sell, pushed = None, 0.0, 0.0, 0.0, []
+    for ts, qty, is_sell in trades:
+        qty *= contract_size
+        if candle_id is None:
+            candle_id = ts // 60000
+        elif ts // 60000 != candle_id:
+            pushed.append(current)
+            current, buy, sell, candle_id = 0.0, 0.0, 0.0, ts // 60000
+        current += qty
+        if is_sell:
+            sell += qty
+        else:
+            buy += qty
+    return candle_id, current, buy, sell, pushed
+
+
+def test_batched_trade_handlers_match_per_trade_processing():
+    setup_env()
+    import random
+
+    from state import ExchangeState
+    from websockets_tasks import candle_sums, handle_trades_gate, handle_trades_okx
+
+    rng = random.Random(7)
+    minute = 28_333_333
+    # Rollover w środku ramki i transakcja spóźniona (poprzednia minuta) - osobne kubełki
+    timestamps = [minute * 60000 + i * 500 for i in range(150)]
+    timestamps[130] = (minute - 1) * 60000
+    trades = [(ts, rng.randint(1, 50), rng.random() < 0.4) for ts in timestamps]
+
+    assert [bucket[0] for bucket in candle_sums(trades)] == [minute, minute + 1, minute - 1, minute + 1]
+    assert candle_sums([]) == []
+
+    okx = ExchangeState()
+    handle_trades_okx(okx, trades, 0.01)
+    gate = ExchangeState()
+    handle_trades_gate(gate, [(ts, -size if is_sell else size) for ts, size, is_sell in trades], 0.01)
+
+    candle_id, current, buy, sell, pushed = _per_trade_reference(trades, 0.01)
+    for state in (okx, gate):
+        assert state.candle_id == candle_id
+        assert abs(state.current_vol - current) < 1e-9
+        assert abs(state.buy_vol - buy) < 1e-9
+        assert abs(state.sell_vol - sell) < 1e-9
+        assert abs(state.delta - (buy - sell)) < 1e-9
+        assert [round(v, 9) for v in state.baseline.window] == [round(v, 9) for v in pushed[-state.baseline.maxlen:]]
+
+
+def test_bybit_batch_keeps_kline_volume_and_rolls_trades():
+    setup_env()
+    from state import ExchangeState
+    from websockets_tasks import handle_trades_bybit
+
+    state = ExchangeState()
+    state.current_vol = 42.0  # z kline Bybit - transakcje go nie zmieniają
+    minute = 28_333_333
+    handle_trades_bybit(state, [
+        (minute * 60000, 1.0, False),
+        (minute * 60000 + 1, 2.0, True),
+        ((minute + 1) * 60000, 0.5, False),
+        ((minute + 1) * 60000 + 1, 0.25, True),
+    ])
+    assert state.candle_id == minute + 1
+    assert (state.buy_vol, state.sell_vol, state.delta) == (0.5, 0.25, 0.25)
+    assert state.current_vol == 42.0
+    assert len(state.baseline) == 0
@@ -0,0 +1,130 @@
+"""
+Wyższe interwały (5m, 15m, 1h...) budowane z tych samych strumieni transakcji co świece 1m.
+
+Transakcje aktualizują tylko stan 1m (ExchangeState), jak dotąd. Przy zamknięciu
+minuty (handler przechodzi do nowej minuty) jej sumy są dodawane do bieżącej świecy
+każdego interwału - koszt O(liczba interwałów) raz na minutę, zero na transakcję.
+Bieżąca świeca interwału = zamknięte minuty + bieżąca minuta ze stanu 1m (current()).
+Bez dodatkowych subskrypcji - wszystko z już odbieranych ramek.
+"""
+
+from config import ALERT_TIMEFRAMES, ALERT_VOLUME_MULTIPLIER, HISTORY, TIMEFRAMES
+from state import EXCHANGES, CoinStates, RollingBaseline
+
+
+class TimeframeCandle:
+    """
+    Świeca jednego interwału dla coina na giełdzie - sumy zamkniętych minut.
+    baseline = średni wolumen ostatnich zamkniętych świec tego interwału.
+    """
+
+    __slots__ = ("baseline", "buy_vol", "minutes", "open", "sell_vol", "tf_id")
+
+    def __init__(self, minutes: int, history: int = HISTORY,
+                 multiplier: float = ALERT_VOLUME_MULTIPLIER):
+        self.minutes = minutes
+        self.tf_id = None  # numer świecy interwału: minuta // minutes (None = brak zamkniętych minut)
+        self.buy_vol = 0.0
+        self.sell_vol = 0.0
+        self.open = 0.0
+        self.baseline = RollingBaseline(history, multiplier)
+
+    def add_minute(self, minute: int, buy_vol: float, sell_vol: float, open_: float) -> None:
+        """Dodaje zamkniętą minutę; ostatnia minuta interwału zamyka świecę"""
+        tf_id = minute // self.minutes
+        if tf_id != self.tf_id:
+            if self.tf_id is not None:
+                # Świeca bez transakcji w ostatniej minucie - zamykana dopiero teraz
+                self.baseline.push(self.buy_vol + self.sell_vol)
+            self.tf_id = tf_id
+            self.buy_vol = 0.0
+            self.sell_vol = 0.0
+            self.open = open_
+
+        self.buy_vol += buy_vol
+        self.sell_vol += sell_vol
+
+        if (minute + 1) % self.minutes == 0:
+            self.baseline.push(self.buy_vol + self.sell_vol)
+            self.tf_id = None
+
+    def current(self, minute: int, buy_vol: float, sell_vol: float, open_: float) -> tuple:
+        """(wolumen, kupno, sprzedaż, open) bieżącej świecy interwału z bieżącą minutą 1m"""
+        if self.tf_id is not None and self.tf_id == minute // self.minutes:
+            buy_vol += self.buy_vol
+            sell_vol += self.sell_vol
+            open_ = self.open
+        return buy_vol + sell_vol, buy_vol, sell_vol, open_
+
+    def start_minute(self, minute: int) -> int:
+        """Pierwsza minuta bieżącej świecy interwału (identyfikator alertu)"""
+        return minute - minute % self.minutes
+
+
+class MultiTimeframe:
+    """
+    Świece wszystkich interwałów dla każdego ExchangeState.
+
+    Interwały z regułą w ALERT_TIMEFRAMES mają okno i mnożnik z reguły,
+    pozostałe - HISTORY i ALERT_VOLUME_MULTIPLIER.
+    """
+
+    def __init__(self, timeframes: dict = TIMEFRAMES, rules: dict = ALERT_TIMEFRAMES):
+        unknown = set(rules) - set(timeframes)
+        if unknown:
+            raise ValueError(f"ALERT_TIMEFRAMES: interwały spoza TIMEFRAMES: {', '.join(sorted(unknown))}")
+        self.timeframes = dict(timeframes)
+        self.rules = dict(rules)
+        self.enabled = False  # True po start()
+        self.candles = {}  # ExchangeState -> {interwał: TimeframeCandle}
+
+    def start(self, states: dict) -> None:
+        """Tworzy świece interwałów dla wszystkich stanów (i dla stanów tworzonych później)"""
+        for coin, coin_state in states.items():
+            self.add(coin, coin_state)
+        if isinstance(states, CoinStates):
+            states.listeners.append(self.add)
+        self.enabled = True
+
+    def add(self, coin: str, coin_state: dict) -> None:
+        """Świece interwałów coina (też dla stanów tworzonych po starcie - CoinStates.listeners)"""
+        for exchange in EXCHANGES:
+            self.candles[coin_state[exchange]] = {
+                name: self._new_candle(name, minutes)
+                for name, minutes in self.timeframes.items()
+            }
+
+    def remove(self, coin_state: dict) -> None:
+        """Usuwa świece interwałów coina usuniętego z listy"""
+        for exchange in EXCHANGES:
+            self.candles.pop(coin_state[exchange], None)
+
+    def _new_candle(self, name: str, minutes: int) -> TimeframeCandle:
+        rule = self.rules.get(name, {})
+        return TimeframeCandle(minutes, rule.get("history", HISTORY),
+                               rule.get("multiplier", ALERT_VOLUME_MULTIPLIER))
+
+    def close_minute(self, state) -> None:
+        """Zamknięta minuta stanu 1m (wołane przed wyzerowaniem buy/sell)"""
+        candles = self.candles.get(state)
+        if candles is None or state.candle_id is None:
+            return
+        minute, buy_vol, sell_vol, open_ = (state.candle_id, state.buy_vol, state.sell_vol,
+                                            state.candle_open)
+        for candle in candles.values():
+            candle.add_minute(minute, buy_vol, sell_vol, open_)
+
+    def get(self, state, name: str) -> TimeframeCandle | None:
+        candles = self.candles.get(state)
+        return None if candles is None else candles.get(name)
+
+    def current(self, state, name: str) -> tuple | None:
+        """(wolumen, kupno, sprzedaż, open) bieżącej świecy interwału albo None"""
+        candle = self.get(state, name)
+        if candle is None or state.candle_id is None:
+            return None
+        return candle.current(state.candle_id, state.buy_vol, state.sell_vol, state.candle_open)
+
+
+# Wspólna instancja dla handlerów i AlertScheduler (start() w main.py)
+timeframes = MultiTimeframe()
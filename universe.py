@@ -0,0 +1,95 @@
+"""
+Lista coinów (universe) z pliku danych - nazwa -> symbole giełd i wielkości kontraktów.
+
+Plik JSON (COINS_FILE, domyślnie coins.json obok config.py):
+    {"BTC": {"binance": "btcusdt", "bybit": "BTCUSDT", "gate": "BTC_USDT",
+             "okx": "BTC-USDT-SWAP", "gate_contract_size": 0.0001, "okx_contract_size": 0.01}}
+Symbol giełdy jest opcjonalny - coin bez "gate" nie jest subskrybowany na Gate.io,
+bez "binance" nie ma stałego streamu Binance (tylko na żądanie z GUI / --coins).
+
+SymbolUniverse to dict (COINS[coin]["binance"] działa jak dotąd) z gęstymi
+identyfikatorami: ids[coin] -> 0..N-1, names[id] -> coin. Usunięty coin zwalnia
+id, a następny dodany dostaje najmniejsze wolne - tablice indeksowane id
+(AlertEngine) nie rosną przy wymianie coinów. Zmiany w trakcie działania:
+add()/remove() (main.py przeładowuje plik co COINS_RELOAD_INTERVAL).
+"""
+
+import heapq
+import json
+
+EXCHANGE_FIELDS = ("binance", "bybit", "gate", "okx")
+# Giełdy z kontraktami - wielkość kontraktu wymagana, gdy jest symbol
+_CONTRACT_SIZES = {"gate": "gate_contract_size", "okx": "okx_contract_size"}
+
+
+def validate_spec(coin: str, spec: dict) -> dict:
+    """Sprawdza wpis coina; ValueError/TypeError z nazwą coina przy błędzie"""
+    if not isinstance(spec, dict):
+        raise TypeError(f"Coin {coin}: wpis musi być obiektem JSON")
+    if not any(spec.get(exchange) for exchange in EXCHANGE_FIELDS):
+        raise ValueError(f"Coin {coin}: brak symbolu dla którejkolwiek giełdy")
+    for exchange, field in _CONTRACT_SIZES.items():
+        if spec.get(exchange) and not isinstance(spec.get(field), (int, float)):
+            raise ValueError(f"Coin {coin}: brak {field} dla symbolu {spec[exchange]}")
+    return spec
+
+
+def load_specs(path: str) -> dict:
+    """Wpisy coinów z pliku JSON (kolejność z pliku)"""
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    if not isinstance(specs, dict):
+        raise TypeError(f"{path}: oczekiwano obiektu coin -> symbole")
+    return {coin: validate_spec(coin, spec) for coin, spec in specs.items()}
+
+
+class SymbolUniverse(dict):
+    """Coiny (nazwa -> wpis) z gęstymi identyfikatorami i wersją zmieniającą się przy add/remove"""
+
+    def __init__(self, specs: dict | None = None):
+        super().__init__()
+        self.ids = {}
+        self.names = []  # id -> coin (None = wolne id)
+        self.free = []  # kopiec wolnych id
+        self.version = 0
+        for coin, spec in (specs or {}).items():
+            self.add(coin, spec)
+
+    @classmethod
+    def load(cls, path: str) -> "SymbolUniverse":
+        return cls(load_specs(path))
+
+    def add(self, coin: str, spec: dict) -> int:
+        """Dodaje coin (albo podmienia wpis istniejącego); zwraca jego id"""
+        validate_spec(coin, spec)
+        self[coin] = spec
+        coin_id = self.ids.get(coin)
+        if coin_id is None:
+            if self.free:
+                coin_id = heapq.heappop(self.free)
+                self.names[coin_id] = coin
+            else:
+                coin_id = len(self.names)
+                self.names.append(coin)
+            self.ids[coin] = coin_id
+        self.version += 1
+        return coin_id
+
+    def remove(self, coin: str) -> int:
+        """Usuwa coin i zwalnia jego id (KeyError dla nieznanego coina)"""
+        coin_id = self.ids.pop(coin)
+        del self[coin]
+        self.names[coin_id] = None
+        heapq.heappush(self.free, coin_id)
+        self.version += 1
+        return coin_id
+
+    def listed(self, exchange: str) -> list:
+        """Coiny z symbolem na danej giełdzie"""
+        return [coin for coin, spec in self.items() if spec.get(exchange)]
+
+    def diff(self, specs: dict) -> tuple:
+        """(dodane, usunięte) względem nowych wpisów; zmieniony wpis = usunięty i dodany"""
+        removed = [coin for coin, spec in self.items() if specs.get(coin) != spec]
+        added = [coin for coin, spec in specs.items() if self.get(coin) != spec]
+        return added, removed
@@ -4,334 +4,393 @@ WebSocket taski dla każdej giełdy - przetwarzanie streamów danych
 
 import asyncio
 import json
-import time
+
 import websockets
 
+from alerts import AlertScheduler
+from candles import candle_store
 from config import (
-    COINS, BINANCE_WS_URL, BYBIT_WS_URL, GATE_WS_URL, OKX_WS_URL,
-    TF_BINANCE, TF_BYBIT
+    BINANCE_COMBINED_WS_URL,
+    BINANCE_MAX_STREAMS,
+    BINANCE_URL_STREAMS,
+    BINANCE_WS_URL,
+    COINS,
+    TF_BINANCE,
+)
+from decoding import (
+    binance_aggtrade,
+    binance_combined,
+    binance_kline,
+    binance_kline_key,
+    binance_stamp,
+    is_data_frame,
 )
-from alerts import check_binance_alert
+from ingest import ingest_registry
+from latency import latency_registry
+from metrics import FrameProbe, metrics
+from recorder import recorder
+from state import ExchangeState
+from timeframes import timeframes
+
+
+def close_minute(state: ExchangeState) -> None:
+    """
+    Zamknięcie świecy 1m - wołane przez handlery transakcji przy pierwszej transakcji
+    nowej minuty, przed wyzerowaniem buy/sell. Raz na minutę, nie na transakcję.
+    """
+    if candle_store.enabled:
+        candle_store.close(state)
+    if timeframes.enabled:
+        timeframes.close_minute(state)
 
 
 # ======================== BINANCE (ZAWSZE AKTYWNE) ========================
 
-async def kline_task_binance(coin: str, states: dict, sent_alerts: set) -> None:
+def handle_kline_binance(coin: str, state: ExchangeState, kline: tuple,
+                         scheduler: AlertScheduler) -> None:
+    """
+    Przetworzenie jednej aktualizacji świecy z Binance.
+    kline = (open, high, low, close, volume, is_closed, początek ms) - patrz decoding.binance_kline
+    """
+    open_, high, low, close, vol, is_closed, start = kline
+
+    # Aktualizuj dane świecy
+    state.current_vol = vol
+    state.candle_open = open_
+    state.candle_close = close
+    state.candle_high = high
+    state.candle_low = low
+
+    if is_closed:
+        state.baseline.push(vol)
+
+        # Resetuj flagę alertu dla nowej świecy
+        state.alert_triggered = False
+
+        # OHLC zamkniętej świecy do historii - dopasowane po minucie, nie z pól bieżącej świecy
+        if candle_store.enabled:
+            candle_store.close_kline(state, start // 60000, (open_, high, low, close))
+
+    # Oznacz coin do sprawdzenia alertu (AlertScheduler)
+    scheduler.mark_dirty(coin, state)
+
+
+def handle_aggtrade_binance(coin: str, state: ExchangeState, qty: float, is_sell: bool,
+                            ts: int, scheduler: AlertScheduler) -> None:
+    """Przetworzenie jednej transakcji aggTrade z Binance"""
+    candle = ts // 60000
+
+    if state.candle_id is None:
+        state.candle_id = candle
+    elif candle != state.candle_id:
+        close_minute(state)
+        state.buy_vol = 0.0
+        state.sell_vol = 0.0
+        state.candle_id = candle
+        state.alert_triggered = False
+
+    if is_sell:
+        state.sell_vol += qty
+    else:
+        state.buy_vol += qty
+
+    state.delta = state.buy_vol - state.sell_vol
+
+    # Oznacz coin do sprawdzenia alertu (AlertScheduler)
+    scheduler.mark_dirty(coin, state)
+
+
+async def kline_task_binance(coin: str, states: dict, scheduler: AlertScheduler) -> None:
     """
     Monitoruje świece (klines) na Binance.
     Aktualizuje current_vol, OHLC, średnią wolumenu.
     """
     symbol = COINS[coin]["binance"]
-    url = f"{BINANCE_WS_URL}{symbol}@kline_{TF_BINANCE}"
+    stream = f"{symbol}@kline_{TF_BINANCE}"
+    url = f"{BINANCE_WS_URL}{stream}"
     state = states[coin]["binance"]
+    frames = coin_frames_counter("binance", coin)
+    reconnects = reconnects_counter("binance")
 
     while True:
         try:
             async with websockets.connect(url) as ws:
                 while True:
-                    msg = await ws.recv()
-                    data = json.loads(msg)
-                    k = data["k"]
-
-                    vol = float(k["v"])
-                    is_closed = k["x"]
-
-                    # Aktualizuj dane świecy
-                    state["current_vol"] = vol
-                    state["current_candle_open"] = float(k["o"])
-                    state["current_candle_close"] = float(k["c"])
-                    state["current_candle_high"] = float(k["h"])
-                    state["current_candle_low"] = float(k["l"])
-
-                    if is_closed:
-                        state["last_volumes"].append(vol)
-                        if len(state["last_volumes"]) > 0:
-                            state["avg_vol"] = sum(state["last_volumes"]) / len(
-                                state["last_volumes"]
-                            )
-
-                        # Resetuj flagę alertu dla nowej świecy
-                        state["alert_triggered"] = False
-
-                    # Sprawdź warunki alertu
-                    check_binance_alert(coin, state, sent_alerts)
+                    msg = await ws.recv(decode=False)
+                    if recorder.enabled:
+                        recorder.record(f"binance:{stream}", msg)
+                    frames.value += 1
+                    handle_kline_binance(coin, state, binance_kline(msg), scheduler)
 
         except Exception as e:
             print(f"❌ Błąd kline Binance dla {coin}: {e}")
+            reconnects.value += 1
             await asyncio.sleep(5)
 
 
-async def aggtrade_task_binance(coin: str, states: dict, sent_alerts: set) -> None:
+async def aggtrade_task_binance(coin: str, states: dict, scheduler: AlertScheduler) -> None:
     """
     Monitoruje aggregate trades na Binance.
     Aktualizuje buy_vol, sell_vol, delta dla każdego candle.
     """
     symbol = COINS[coin]["binance"]
-    url = f"{BINANCE_WS_URL}{symbol}@aggTrade"
+    stream = f"{symbol}@aggTrade"
+    url = f"{BINANCE_WS_URL}{stream}"
     state = states[coin]["binance"]
+    frames = coin_frames_counter("binance", coin)
+    reconnects = reconnects_counter("binance")
 
     while True:
         try:
             async with websockets.connect(url) as ws:
                 while True:
-                    msg = await ws.recv()
-                    data = json.loads(msg)
+                    msg = await ws.recv(decode=False)
+                    if recorder.enabled:
+                        recorder.record(f"binance:{stream}", msg)
+                    frames.value += 1
+                    qty, is_sell, ts = binance_aggtrade(msg)
+                    handle_aggtrade_binance(coin, state, qty, is_sell, ts, scheduler)
 
-                    qty = float(data["q"])
-                    is_sell = data["m"]
+        except Exception as e:
+            print(f"❌ Błąd aggtrade Binance dla {coin}: {e}")
+            reconnects.value += 1
+            await asyncio.sleep(5)
 
-                    candle = int(data["T"]) // 60000
 
-                    if state["candle_id"] is None:
-                        state["candle_id"] = candle
-                    elif candle != state["candle_id"]:
-                        state["buy_vol"] = 0.0
-                        state["sell_vol"] = 0.0
-                        state["candle_id"] = candle
-                        state["alert_triggered"] = False
+# ======================== BINANCE (COMBINED STREAM) ========================
 
-                    if is_sell:
-                        state["sell_vol"] += qty
-                    else:
-                        state["buy_vol"] += qty
+def build_binance_routes(coins, states: dict) -> dict:
+    """
+    Buduje mapę nazwa streamu -> (handler, coin, stan, licznik ramek coina).
+    Dwa streamy na coin: kline i aggTrade. Coiny bez symbolu Binance są pomijane.
+    """
+    routes = {}
+    for coin in coins:
+        symbol = COINS[coin].get("binance")
+        if not symbol:
+            continue
+        state = states[coin]["binance"]
+        frames = coin_frames_counter("binance", coin)
+        routes[f"{symbol}@kline_{TF_BINANCE}"] = (_route_kline_binance, coin, state, frames)
+        routes[f"{symbol}@aggTrade"] = (_route_aggtrade_binance, coin, state, frames)
+    return routes
 
-                    state["delta"] = state["buy_vol"] - state["sell_vol"]
 
-                    # Sprawdź warunki alertu po każdej transakcji
-                    check_binance_alert(coin, state, sent_alerts)
+def coin_frames_counter(exchange: str, coin: str):
+    """Licznik ramek coina na giełdzie - tworzony raz przy budowie routingu"""
+    return metrics.counter("spike_coin_frames_total", "Ramki z danymi coina",
+                           exchange=exchange, coin=coin)
 
-        except Exception as e:
-            print(f"❌ Błąd aggtrade Binance dla {coin}: {e}")
-            await asyncio.sleep(5)
 
+def reconnects_counter(exchange: str):
+    return metrics.counter("spike_reconnects_total", "Zerwane połączenia WebSocket", exchange=exchange)
 
-# ======================== BYBIT (NA ŻĄDANIE) ========================
 
-async def kline_task_bybit(coin: str, states: dict, active_other_exchanges: set) -> None:
-    """Monitoruje świece na Bybit"""
-    symbol = COINS[coin]["bybit"]
-    state = states[coin]["bybit"]
+def split_binance_streams(streams: list, max_streams: int = BINANCE_MAX_STREAMS) -> list:
+    """Dzieli listę streamów na najmniejszą liczbę połączeń (max_streams na połączenie)"""
+    return [streams[i:i + max_streams] for i in range(0, len(streams), max_streams)]
 
-    while coin in active_other_exchanges:
-        try:
-            async with websockets.connect(BYBIT_WS_URL) as ws:
-                subscribe_msg = {
-                    "op": "subscribe",
-                    "args": [f"kline.{TF_BYBIT}.{symbol}"]
-                }
-                await ws.send(json.dumps(subscribe_msg))
-
-                while coin in active_other_exchanges:
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
-                        data = json.loads(msg)
-
-                        if "topic" in data and data["topic"].startswith("kline"):
-                            kline_data = data["data"][0]
-
-                            vol = float(kline_data["volume"])
-                            is_closed = kline_data["confirm"]
-
-                            state["current_vol"] = vol
-
-                            if is_closed:
-                                state["last_volumes"].append(vol)
-                                if len(state["last_volumes"]) > 0:
-                                    state["avg_vol"] = sum(state["last_volumes"]) / len(
-                                        state["last_volumes"]
-                                    )
-                    except asyncio.TimeoutError:
-                        continue
-        except Exception as e:
-            print(f"❌ Błąd kline Bybit dla {coin}: {e}")
-            await asyncio.sleep(5)
 
+def _route_kline_binance(coin: str, state: ExchangeState, payload,
+                         scheduler: AlertScheduler) -> None:
+    handle_kline_binance(coin, state, binance_kline(payload), scheduler)
 
-async def trade_task_bybit(coin: str, states: dict, active_other_exchanges: set) -> None:
-    """Monitoruje trades na Bybit"""
-    symbol = COINS[coin]["bybit"]
-    state = states[coin]["bybit"]
 
-    while coin in active_other_exchanges:
-        try:
-            async with websockets.connect(BYBIT_WS_URL) as ws:
-                subscribe_msg = {
-                    "op": "subscribe",
-                    "args": [f"publicTrade.{symbol}"]
-                }
-                await ws.send(json.dumps(subscribe_msg))
-
-                while coin in active_other_exchanges:
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
-                        data = json.loads(msg)
-
-                        if "topic" in data and data["topic"] == f"publicTrade.{symbol}":
-                            trades = data["data"]
-
-                            for trade in trades:
-                                qty = float(trade["v"])
-                                side = trade["S"]
-
-                                ts = trade["T"]
-                                candle = ts // 60000
-
-                                if state["candle_id"] is None:
-                                    state["candle_id"] = candle
-                                elif candle != state["candle_id"]:
-                                    state["buy_vol"] = 0.0
-                                    state["sell_vol"] = 0.0
-                                    state["candle_id"] = candle
-
-                                if side == "Sell":
-                                    state["sell_vol"] += qty
-                                else:
-                                    state["buy_vol"] += qty
-
-                                state["delta"] = state["buy_vol"] - state["sell_vol"]
-                    except asyncio.TimeoutError:
-                        continue
-        except Exception as e:
-            print(f"❌ Błąd trade Bybit dla {coin}: {e}")
-            await asyncio.sleep(5)
+def _route_aggtrade_binance(coin: str, state: ExchangeState, payload,
+                            scheduler: AlertScheduler) -> None:
+    qty, is_sell, ts = binance_aggtrade(payload)
+    handle_aggtrade_binance(coin, state, qty, is_sell, ts, scheduler)
 
 
-# ======================== GATE.IO (NA ŻĄDANIE) ========================
+def dispatch_binance_frame(raw: bytes, routes: dict, scheduler: AlertScheduler) -> None:
+    """Kieruje surową ramkę combined streamu do właściwego handlera (pole stream)"""
+    if not is_data_frame(raw, b'"stream"'):
+        return  # np. odpowiedź na SUBSCRIBE ({"result": null, "id": 1})
+
+    stream, payload = binance_combined(raw)
+    route = routes.get(stream)
+    if route is None:
+        return
+
+    handler, coin, state, frames = route
+    frames.value += 1
+    handler(coin, state, payload, scheduler)
 
-def process_trade_gate(coin: str, states: dict, trade_data: dict) -> None:
-    """Przetworzenie jednej transakcji z Gate.io"""
-    state = states[coin]["gate"]
-    contract_size = COINS[coin]["gate_contract_size"]
 
+async def combined_task_binance(streams: list, routes: dict, scheduler: AlertScheduler) -> None:
+    """
+    Monitoruje wiele streamów Binance przez jedno połączenie /stream.
+    Część streamów trafia do URL, reszta jest dosubskrybowana metodą SUBSCRIBE
+    (limit długości URL i limit 10 wiadomości/s od klienta).
+    Ramki przechodzą przez IngestQueue - odczyt nie czeka na handlery.
+    Streamy usunięte z routes (coin usunięty w trakcie działania) są pomijane od
+    następnego połączenia; bez żadnego streamu task się kończy.
+    """
+    probe = FrameProbe("binance", parse=binance_combined, stamp=binance_stamp,
+                       latency=latency_registry)
+    ingest = ingest_registry.create(f"Binance ({len(streams)} streamów)", binance_kline_key,
+                                    probe=probe)
+    consumer = asyncio.create_task(
+        ingest.drain(lambda raw: dispatch_binance_frame(raw, routes, scheduler))
+    )
     try:
-        size = trade_data["size"]
-        timestamp = trade_data["create_time_ms"]
+        await _combined_connection_binance(streams, routes, ingest)
+    finally:
+        consumer.cancel()
+        await asyncio.gather(consumer, return_exceptions=True)
+        ingest_registry.remove(ingest)
 
-        is_buy = size > 0
-        size_coin = abs(size) * contract_size
 
-        current_candle = (timestamp // 60000) * 60000
+async def _combined_connection_binance(streams: list, routes: dict, ingest) -> None:
+    """Utrzymuje połączenie combined streamu i wkłada ramki do kolejki"""
+    put = ingest.put
+    reconnects = reconnects_counter("binance")
+    while True:
+        active = [stream for stream in streams if stream in routes]
+        if not active:
+            return
+        url = BINANCE_COMBINED_WS_URL + "/".join(active[:BINANCE_URL_STREAMS])
+        remaining = active[BINANCE_URL_STREAMS:]
+        try:
+            async with websockets.connect(url) as ws:
+                for req_id, start in enumerate(
+                    range(0, len(remaining), BINANCE_URL_STREAMS), start=1
+                ):
+                    subscribe_msg = {
+                        "method": "SUBSCRIBE",
+                        "params": remaining[start:start + BINANCE_URL_STREAMS],
+                        "id": req_id
+                    }
+                    await ws.send(json.dumps(subscribe_msg))
+                    await asyncio.sleep(0.2)
 
-        if state["candle_start"] is None:
-            state["candle_start"] = current_candle
-        elif current_candle != state["candle_start"]:
-            state["last_volumes"].append(state["current_vol"])
-            if len(state["last_volumes"]) > 0:
-                state["avg_vol"] = sum(state["last_volumes"]) / len(state["last_volumes"])
+                while True:
+                    msg = await ws.recv(decode=False)
+                    if recorder.enabled:
+                        recorder.record("binance", msg)
+                    if not put(msg):
+                        await ingest.wait_space()  # polityka block - TCP spowalnia nadawcę
+                        put(msg)
 
-            state["current_vol"] = 0.0
-            state["buy_vol"] = 0.0
-            state["sell_vol"] = 0.0
-            state["candle_start"] = current_candle
+        except Exception as e:
+            print(f"❌ Błąd combined stream Binance ({len(streams)} streamów): {e}")
+            reconnects.value += 1
+            await asyncio.sleep(5)
 
-        state["current_vol"] += size_coin
 
-        if is_buy:
-            state["buy_vol"] += size_coin
+# ======================== SUMY TRANSAKCJI Z RAMKI ========================
+# Ramki Bybit/Gate.io/OKX niosą listy transakcji (setki w czasie skoków). Handlery
+# najpierw sumują kupno/sprzedaż kolejnych transakcji tej samej świecy, a stan
+# zmieniają raz na kubełek. Nowy kubełek przy każdej zmianie świecy (także wstecz),
+# więc rollover i close_minute działają jak przy przetwarzaniu transakcji po jednej.
+
+def candle_sums(trades: list) -> list:
+    """[(ts, qty, is_sell), ...] -> [(świeca, kupno, sprzedaż), ...] w kolejności ramki"""
+    buckets = []
+    candle = None
+    buy = sell = 0.0
+    for ts, qty, is_sell in trades:
+        trade_candle = ts // 60000
+        if trade_candle != candle:
+            if candle is not None:
+                buckets.append((candle, buy, sell))
+            candle = trade_candle
+            buy = sell = 0.0
+        if is_sell:
+            sell += qty
+        else:
+            buy += qty
+    if candle is not None:
+        buckets.append((candle, buy, sell))
+    return buckets
+
+
+def signed_candle_sums(trades: list) -> list:
+    """[(ts, size), ...] (size < 0 = sprzedaż) -> [(świeca, kupno, sprzedaż), ...] jak candle_sums"""
+    buckets = []
+    candle = None
+    buy = sell = 0.0
+    for ts, size in trades:
+        trade_candle = ts // 60000
+        if trade_candle != candle:
+            if candle is not None:
+                buckets.append((candle, buy, sell))
+            candle = trade_candle
+            buy = sell = 0.0
+        if size > 0:
+            buy += size
         else:
-            state["sell_vol"] += size_coin
+            sell -= size
+    if candle is not None:
+        buckets.append((candle, buy, sell))
+    return buckets
 
-        state["delta"] = state["buy_vol"] - state["sell_vol"]
 
-    except Exception as e:
-        print(f"❌ Błąd przetwarzania transakcji Gate.io dla {coin}: {e}")
+def _add_candle_sums(state: ExchangeState, buckets: list, scale: float) -> None:
+    """
+    Kubełki transakcji Gate.io/OKX - te giełdy nie mają streamu świec, więc wolumen
+    świecy (current_vol) i okno średniej liczone są z transakcji.
+    """
+    for candle, buy, sell in buckets:
+        if state.candle_id is None:
+            state.candle_id = candle
+        elif candle != state.candle_id:
+            close_minute(state)
+            state.baseline.push(state.current_vol)
+
+            state.current_vol = 0.0
+            state.buy_vol = 0.0
+            state.sell_vol = 0.0
+            state.candle_id = candle
+            state.alert_triggered = False
+
+        buy *= scale
+        sell *= scale
+        state.current_vol += buy + sell
+        state.buy_vol += buy
+        state.sell_vol += sell
+        state.delta = state.buy_vol - state.sell_vol
 
 
-async def trades_task_gate(coin: str, states: dict, active_other_exchanges: set) -> None:
-    """Monitoruje trades na Gate.io"""
-    symbol = COINS[coin]["gate"]
+# ======================== BYBIT (NA ŻĄDANIE) ========================
+# Połączenia dla Bybit, Gate.io i OKX utrzymuje subscriptions.py,
+# tutaj są tylko handlery danych.
 
-    while coin in active_other_exchanges:
-        try:
-            async with websockets.connect(GATE_WS_URL) as ws:
-                sub_msg = {
-                    "time": int(time.time()),
-                    "channel": "futures.trades",
-                    "event": "subscribe",
-                    "payload": [symbol]
-                }
-
-                await ws.send(json.dumps(sub_msg))
-
-                while coin in active_other_exchanges:
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
-                        data = json.loads(msg)
-
-                        if data.get("event") == "update" and "result" in data:
-                            for trade in data["result"]:
-                                process_trade_gate(coin, states, trade)
-                    except asyncio.TimeoutError:
-                        continue
-        except Exception as e:
-            print(f"❌ Błąd Gate.io dla {coin}: {e}")
-            await asyncio.sleep(5)
+def handle_kline_bybit(state: ExchangeState, vol: float, is_closed: bool) -> None:
+    """Przetworzenie jednej aktualizacji świecy z Bybit"""
+    state.current_vol = vol
+
+    if is_closed:
+        state.baseline.push(vol)
+        state.alert_triggered = False
+
+
+def handle_trades_bybit(state: ExchangeState, trades: list) -> None:
+    """Przetworzenie listy transakcji publicTrade z Bybit: [(ts, qty, is_sell), ...]"""
+    for candle, buy, sell in candle_sums(trades):
+        if state.candle_id is None:
+            state.candle_id = candle
+        elif candle != state.candle_id:
+            close_minute(state)
+            state.buy_vol = 0.0
+            state.sell_vol = 0.0
+            state.candle_id = candle
+            state.alert_triggered = False
+
+        state.buy_vol += buy
+        state.sell_vol += sell
+        state.delta = state.buy_vol - state.sell_vol
+
+
+# ======================== GATE.IO (NA ŻĄDANIE) ========================
+
+def handle_trades_gate(state: ExchangeState, trades: list, contract_size: float) -> None:
+    """Przetworzenie transakcji jednego kontraktu z Gate.io: [(ts, size), ...], size w kontraktach"""
+    _add_candle_sums(state, signed_candle_sums(trades), contract_size)
 
 
 # ======================== OKX (NA ŻĄDANIE) ========================
 
-async def trade_task_okx(coin: str, states: dict, active_other_exchanges: set) -> None:
-    """Monitoruje trades na OKX"""
-    symbol = COINS[coin]["okx"]
-    contract_size = COINS[coin]["okx_contract_size"]
-    state = states[coin]["okx"]
-
-    subscribe_msg = {
-        "op": "subscribe",
-        "args": [{
-            "channel": "trades",
-            "instId": symbol
-        }]
-    }
-
-    while coin in active_other_exchanges:
-        try:
-            async with websockets.connect(OKX_WS_URL) as ws:
-                await ws.send(json.dumps(subscribe_msg))
-
-                while coin in active_other_exchanges:
-                    try:
-                        msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
-                        data = json.loads(msg)
-
-                        if "event" in data:
-                            continue
-
-                        if "data" in data:
-                            trades = data["data"]
-                            for trade in trades:
-                                contracts = float(trade["sz"])
-                                qty = contracts * contract_size
-
-                                side = trade["side"]
-
-                                ts = int(trade["ts"])
-                                candle = ts // 60000
-
-                                if state["candle_id"] is None:
-                                    state["candle_id"] = candle
-                                elif candle != state["candle_id"]:
-                                    state["last_volumes"].append(state["current_vol"])
-                                    if len(state["last_volumes"]) > 0:
-                                        state["avg_vol"] = sum(state["last_volumes"]) / len(
-                                            state["last_volumes"]
-                                        )
-
-                                    state["current_vol"] = 0.0
-                                    state["buy_vol"] = 0.0
-                                    state["sell_vol"] = 0.0
-                                    state["candle_id"] = candle
-
-                                state["current_vol"] += qty
-
-                                if side == "sell":
-                                    state["sell_vol"] += qty
-                                else:
-                                    state["buy_vol"] += qty
-
-                                state["delta"] = state["buy_vol"] - state["sell_vol"]
-                    except asyncio.TimeoutError:
-                        continue
-        except Exception as e:
-            print(f"❌ Błąd OKX dla {coin}: {e}")
-            await asyncio.sleep(5)
+def handle_trades_okx(state: ExchangeState, trades: list, contract_size: float) -> None:
+    """Przetworzenie listy transakcji OKX: [(ts, contracts, is_sell), ...]"""
+    _add_candle_sums(state, candle_sums(trades), contract_size)